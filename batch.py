@@ -0,0 +1,42 @@
+import os
+import sys
+import argparse
+import logging
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from flux_1.batch.batch_runner import BatchRunner
+from flux_1.cache.prompt_cache import PromptCache
+from flux_1.config.offload_policy import OffloadPolicy
+from flux_1.flux import Flux1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the images of the jobs in a JSONL file, resuming where an earlier run stopped.')
+    parser.add_argument('--jobs', type=str, required=True, help='JSONL file with one job per line: {"prompt": ..., "seed": ..., "width": ..., "height": ..., "steps": ..., "guidance": ..., "sampler": ..., "sigma_schedule": ..., "output": ...}. Only "prompt" is required.')
+    parser.add_argument('--output_dir', type=str, default="batch_output", help='Directory for the images and the manifest (Default is "batch_output")')
+    parser.add_argument('--model', type=str, default="schnell", help='The model to use ("schnell" or "dev"). Default is "schnell".')
+    parser.add_argument('--seed', type=int, default=0, help='Base seed, jobs without a seed get this seed plus their line number (Default is 0)')
+    parser.add_argument('--batch_size', type=int, default=4, help='Num of images denoised together in one batch (Default is 4)')
+    parser.add_argument('--path', type=str, default=None, help='Local path of a model saved with save.py, used instead of --model')
+    parser.add_argument('--offload', type=str, default="keep-all", choices=["keep-all", "sequential-offload", "encoders-only-once"], help='When to load and free the model components to save memory (Default is "keep-all")')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
+    parser.add_argument('--prompt_cache_dir', type=str, default=None, help='Directory to persist prompt embeddings across runs (Default is in-memory only)')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    jobs = BatchRunner.read_jobs(args.jobs, base_seed=args.seed)
+
+    prompt_cache = PromptCache(path=args.prompt_cache_dir)
+    if args.path is not None:
+        flux = Flux1.from_saved_model(args.path, prompt_cache=prompt_cache, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload))
+    else:
+        flux = Flux1.from_alias(args.model, prompt_cache=prompt_cache, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload))
+
+    summary = BatchRunner(flux, output_dir=args.output_dir, batch_size=args.batch_size).run(jobs)
+    print(f"Generated {summary['generated']} images ({summary['skipped']} jobs skipped) in {summary['time']:.1f}s, {summary['images_per_minute']:.2f} images/min")
+
+
+if __name__ == '__main__':
+    main()
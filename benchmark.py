@@ -0,0 +1,97 @@
+import os
+import sys
+import argparse
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from flux_1.benchmark.stage_benchmark import StageBenchmark, PRECISIONS
+from flux_1.config.model_config import ModelConfig
+from flux_1.flux import Flux1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time each stage of the generation and record its peak memory over a grid of settings.')
+    parser.add_argument('--model', type=str, default="schnell", help='The model to use ("schnell" or "dev"). Default is "schnell".')
+    parser.add_argument('--path', type=str, default=None, help='Local path of a model saved with save.py, used instead of --model')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
+    parser.add_argument('--random', action='store_true', help='Use randomly initialized models with only a few layers instead of the real weights, e.g. to run on a CPU')
+    parser.add_argument('--random_blocks', type=int, default=1, help='Number of transformer, T5 and CLIP layers of each kind in the random models (Default is 1)')
+    parser.add_argument('--resolutions', type=int, nargs='+', default=[512, 1024], help='Square image resolutions (Default is 512 1024)')
+    parser.add_argument('--steps', type=int, nargs='+', default=[4], help='Inference steps (Default is 4)')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1], help='Batch sizes (Default is 1)')
+    parser.add_argument('--precisions', type=str, nargs='+', default=["bfloat16"], choices=list(PRECISIONS), help='Precisions (Default is bfloat16)')
+    parser.add_argument('--t5_lengths', type=int, nargs='+', default=None, help='T5 sequence lengths to pad the prompt to, e.g. 64 128 256 to measure trimmed padding, --block_cache_thresholds uses the first one (Default is the full length of the model)')
+    parser.add_argument('--t5_padding_prompt_lengths', type=int, nargs='+', default=None, help='Instead of timing the stages, generate an image from prompts of these numbers of tokens with trimmed and with full T5 padding, and write the PSNR between them for each bucket, e.g. 16 100 200')
+    parser.add_argument('--block_cache_thresholds', type=float, nargs='+', default=None, help='Instead of timing the stages, generate an image with the block cache at each of these thresholds and without it, and write the reused steps and the PSNR against the full computation, e.g. 0.1 0.2 0.4')
+    parser.add_argument('--compile', action='store_true', help='Run the transformer step and the VAE decoder compiled with mx.compile')
+    parser.add_argument('--precompute_modulations', action='store_true', help='Compute the modulations of all steps in one pass before denoising, timed as its own stage')
+    parser.add_argument('--output', type=str, default="benchmark.json", help='JSON file the results are written to (Default is "benchmark.json")')
+    parser.add_argument('--compare', type=str, default=None, help='JSON file of an earlier run. Stages that got slower or use more memory are reported, and the exit code is 1 if there are any')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative slowdown tolerated by --compare (Default is 0.1)')
+
+    args = parser.parse_args()
+
+    if args.random:
+        benchmark = StageBenchmark.random(
+            ModelConfig.from_alias(args.model),
+            num_transformer_blocks=args.random_blocks,
+            num_single_transformer_blocks=args.random_blocks,
+            num_t5_blocks=args.random_blocks,
+            num_clip_layers=args.random_blocks,
+        )
+    elif args.path is not None:
+        benchmark = StageBenchmark.from_flux(Flux1.from_saved_model(args.path, quantize=args.quantize))
+    else:
+        benchmark = StageBenchmark.from_flux(Flux1.from_alias(args.model, quantize=args.quantize))
+
+    if args.t5_padding_prompt_lengths is not None:
+        report = benchmark.compare_t5_padding(args.resolutions, args.steps, args.t5_padding_prompt_lengths)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        for result in report["results"]:
+            print(
+                f"{result['resolution']}px/{result['steps']}steps, {result['prompt_tokens']} tokens: "
+                f"{result['t5_length']} tokens {result['trimmed_time']:.2f}s, {result['full_length']} tokens {result['full_time']:.2f}s, "
+                f"embedding error {100 * result['embedding_error']:.2f}%, PSNR {result['psnr']:.2f}dB"
+            )
+        return
+
+    if args.block_cache_thresholds is not None:
+        report = benchmark.compare_block_cache(args.resolutions, args.steps, args.block_cache_thresholds, args.t5_lengths[0] if args.t5_lengths else None)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        for result in report["results"]:
+            print(
+                f"{result['resolution']}px/{result['steps']}steps, threshold {result['threshold']}: reused steps {result['reused_steps']}, "
+                f"{result['cached_time']:.2f}s against {result['full_time']:.2f}s, PSNR {result['psnr']:.2f}dB"
+            )
+        return
+
+    report = benchmark.run_grid(
+        args.resolutions,
+        args.steps,
+        args.batch_sizes,
+        args.precisions,
+        args.t5_lengths,
+        compiled=args.compile,
+        precomputed_modulations=args.precompute_modulations,
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        stages = ", ".join(f"{name} {time:.3f}s" for name, time in result["stages"].items())
+        print(f"{StageBenchmark.result_key(result)}: {stages}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            regressions = StageBenchmark.compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
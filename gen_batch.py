@@ -22,26 +22,15 @@ import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
+from flux_1.cache.prompt_cache import PromptCache
 from flux_1.config.config import Config
+from flux_1.config.offload_policy import OffloadPolicy
 from flux_1.flux import Flux1
+from flux_1.generation.pipeline_executor import PipelineExecutor
+from flux_1.generation.pipeline_job import PipelineJob
 from flux_1.post_processing.image_util import ImageUtil
 
 
-def gen_image(flux, prompt_text, output_prefix, steps, height, width, guidance, input_seed=None):
-    image = flux.generate_image(
-        seed=input_seed,
-        prompt=prompt_text,
-        config=Config(
-            num_inference_steps=steps,
-            height=height,
-            width=width,
-            guidance=guidance,
-        )
-    )
-
-    ImageUtil.save_image(image, f"{output_prefix}_{input_seed}.png")
-
-
 def main():
     parser = argparse.ArgumentParser(description='Generate an image based on a prompt.')
     # parser.add_argument('--prompt', type=str, help='The textual description of the image to generate.')
@@ -52,11 +41,24 @@ def main():
     parser.add_argument('--width', type=int, default=1024, help='Image width (Default is 1024)')
     parser.add_argument('--steps', type=int, default=4, help='Inference Steps')
     parser.add_argument('--guidance', type=float, default=3.5, help='Guidance Scale (Default is 3.5)')
+    parser.add_argument('--path', type=str, default=None, help='Local path of a model saved with save.py, used instead of --model')
+    parser.add_argument('--offload', type=str, default="keep-all", choices=["keep-all", "sequential-offload", "encoders-only-once"], help='When to load and free the model components to save memory (Default is "keep-all")')
+    parser.add_argument('--offload_path', type=str, default=None, help='Directory to write converted weights to, so that offloaded components reload quickly')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
     parser.add_argument('--num_output', type=int, default=1, help='Num of output images')
+    parser.add_argument('--prompt_cache_dir', type=str, default=None, help='Directory to persist prompt embeddings across runs (Default is in-memory only)')
+    parser.add_argument('--batch_size', type=int, default=4, help='Num of images denoised together in one batch (Default is 4)')
+    parser.add_argument('--sequential', action='store_true', help='Tokenize, generate and save one job after another, instead of tokenizing ahead and saving in writer threads')
+    parser.add_argument('--queue_size', type=int, default=2, help='Num of batches that can wait between two pipeline stages (Default is 2)')
+    parser.add_argument('--num_writers', type=int, default=2, help='Num of threads converting and writing the images (Default is 2)')
 
     args = parser.parse_args()
 
-    flux = Flux1.from_alias(args.model)
+    prompt_cache = PromptCache(path=args.prompt_cache_dir)
+    if args.path is not None:
+        flux = Flux1.from_saved_model(args.path, prompt_cache=prompt_cache, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload))
+    else:
+        flux = Flux1.from_alias(args.model, prompt_cache=prompt_cache, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload), offload_path=args.offload_path)
 
     # prompt_text = args.prompt
     prompt_text = """
@@ -187,17 +189,44 @@ young woman with medium bright orange hair in casual dress sitting at a table in
 
     ]
 
-    for i in range(len(prompt_text_list)):
-    # for i in range(6):
-        prompt_text = prompt_text_list[i]
-        now = datetime.datetime.now()
-        print(f"== {i+1} out of {len(prompt_text_list)} -- {now} ====\n{prompt_text}\n======\n")
-
-        for j in range(0, args.num_output):
-            input_seed = int(time.time()) if args.seed is None else args.seed
-            output_prefix = f"{args.output_prefix}_{i}"
-            print(f"=== generating {j+1} out of {args.num_output} with seed {input_seed} as {output_prefix} ===")
-            gen_image(flux, prompt_text, output_prefix, args.steps, args.height, args.width, args.guidance, input_seed)
+    # Every image of the run gets its own seed, also when several runs start within the same second
+    base_seed = time.time_ns() // 1000 % 2**31 if args.seed is None else args.seed
+    config = Config(
+        num_inference_steps=args.steps,
+        height=args.height,
+        width=args.width,
+        guidance=args.guidance,
+    )
+
+    def jobs():
+        for i in range(len(prompt_text_list)):
+        # for i in range(6):
+            prompt_text = prompt_text_list[i]
+            now = datetime.datetime.now()
+            print(f"== {i+1} out of {len(prompt_text_list)} -- {now} ====\n{prompt_text}\n======\n")
+
+            prompt_seed = base_seed + i * args.num_output
+            for j in range(0, args.num_output, args.batch_size):
+                input_seeds = [prompt_seed + k for k in range(j, min(j + args.batch_size, args.num_output))]
+                output_prefix = f"{args.output_prefix}_{i}"
+                print(f"=== generating {j+1}-{j+len(input_seeds)} out of {args.num_output} with seeds {input_seeds} as {output_prefix} ===")
+                yield PipelineJob(
+                    seeds=input_seeds,
+                    prompts=[prompt_text],
+                    config=config,
+                    output_paths=[f"{output_prefix}_{input_seed}.png" for input_seed in input_seeds],
+                )
+
+    # The pipeline generates the jobs one after another too, it only overlaps the tokenization and the writing with them
+    if args.sequential:
+        for job in jobs():
+            images = flux.generate_images(seeds=job.seeds, prompts=job.prompts, config=job.config)
+            for image, path in zip(images, job.output_paths):
+                ImageUtil.save_image(image, path)
+    else:
+        stats = PipelineExecutor(flux, queue_size=args.queue_size, num_writers=args.num_writers).run(jobs())
+        stage_times = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stats["stage_times"].items())
+        print(f"Generated {stats['images']} images in {stats['wall_time']:.1f}s ({stage_times})")
 
 
 if __name__ == '__main__':
@@ -5,9 +5,14 @@ import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
+import_start_time = time.perf_counter()
 from flux_1.config.config import Config
+from flux_1.config.offload_policy import OffloadPolicy
 from flux_1.flux import Flux1
 from flux_1.post_processing.image_util import ImageUtil
+from flux_1.profiling.module_profiler import ModuleProfiler
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+import_time = time.perf_counter() - import_start_time
 
 
 def main():
@@ -20,26 +25,109 @@ def main():
     parser.add_argument('--width', type=int, default=1024, help='Image width (Default is 1024)')
     parser.add_argument('--steps', type=int, default=4, help='Inference Steps')
     parser.add_argument('--guidance', type=float, default=3.5, help='Guidance Scale (Default is 3.5)')
+    parser.add_argument('--sampler', type=str, default="euler", choices=["euler", "heun", "dpm++2m"], help='The sampler taking the denoising steps (Default is "euler"). "heun" runs the transformer twice per step')
+    parser.add_argument('--sigma_schedule', type=str, default="linear", choices=["linear", "karras", "beta"], help='How the noise levels of the steps are spaced (Default is "linear")')
+    parser.add_argument('--sigmas', type=float, nargs='+', default=None, help='Custom decreasing noise levels in (0, 1], one step each, used instead of --steps and --sigma_schedule')
+    parser.add_argument('--init_image', type=str, default=None, help='Path of an image to start from (image-to-image). The output has its resolution, rounded down to a multiple of 16')
+    parser.add_argument('--strength', type=float, default=0.6, help='How much the init image is changed, between 0 and 1 (Default is 0.6)')
+    parser.add_argument('--vae_tiling', action='store_true', help='Encode and decode the image in tiles to bound memory at high resolutions')
+    parser.add_argument('--path', type=str, default=None, help='Local path of a model saved with save.py, or of a directory laid out like the Hugging Face repo of --model, used instead of downloading')
+    parser.add_argument('--manifest', type=str, default=None, help='JSON file mapping model names ("schnell", "dev" or the repo id) to local model directories (Default is $FLUX_MODEL_MANIFEST)')
+    parser.add_argument('--offline', action='store_true', help='Never contact the Hugging Face hub, fail if the model is neither given, in the manifest nor in the local cache (also $HF_HUB_OFFLINE=1)')
+    parser.add_argument('--startup_times', action='store_true', help='Print the time spent on imports, resolving the model, loading the tokenizers and loading the weights')
+    parser.add_argument('--offload', type=str, default="keep-all", choices=["keep-all", "sequential-offload", "encoders-only-once"], help='When to load and free the model components to save memory (Default is "keep-all")')
+    parser.add_argument('--offload_path', type=str, default=None, help='Directory to write converted weights to, so that offloaded components reload quickly')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
+    parser.add_argument('--trim_t5_padding', action='store_true', help='Experimental: pad the prompt only to the next of 64, 128, 256 or 512 tokens instead of the full T5 length of the model. The effect on the images has not been measured with the real weights yet')
+    parser.add_argument('--trim_t5_padding_compare', action='store_true', help='Also generate the image with full T5 padding and print the difference (PSNR) and both times')
+    parser.add_argument('--block_cache_threshold', type=float, default=None, help='Reuse the transformer block outputs of the previous step while the input changed less than this in total, e.g. 0.1 (Default is no reuse)')
+    parser.add_argument('--block_cache_steps', type=int, nargs='+', default=None, help='Reuse the transformer block outputs of the previous step on these steps, instead of deciding by threshold')
+    parser.add_argument('--block_cache_compare', action='store_true', help='Also generate the image without reusing block outputs and print the difference (PSNR) and both times')
+    parser.add_argument('--compile', action='store_true', help='Compile the transformer step and the VAE decoder with mx.compile, and print the compile and steady state times')
+    parser.add_argument('--precompute_modulations', action='store_true', help='Compute the timestep conditioning and normalization modulations of all steps in one pass before denoising')
+    parser.add_argument('--profile', type=str, default=None, help='Profile every model forward and write a Chrome trace (chrome://tracing or Perfetto) to this path')
 
     args = parser.parse_args()
 
     seed = int(time.time()) if args.seed is None else args.seed
 
-    flux = Flux1.from_alias(args.model)
-
-    image = flux.generate_image(
-        seed=seed,
-        prompt=args.prompt,
-        config=Config(
-            num_inference_steps=args.steps,
-            height=args.height,
-            width=args.width,
-            guidance=args.guidance,
+    if args.path is not None and os.path.exists(os.path.join(args.path, SavedModelMetadata.FILE)):
+        flux = Flux1.from_saved_model(args.path, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload))
+    else:
+        flux = Flux1.from_alias(
+            args.model,
+            quantize=args.quantize,
+            offload_policy=OffloadPolicy.from_name(args.offload),
+            offload_path=args.offload_path,
+            local_path=args.path,
+            manifest_path=args.manifest,
+            offline=args.offline,
         )
+    if args.startup_times:
+        startup_times = {"imports": import_time, **flux.startup_times}
+        print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_times.items()) + f", total {sum(startup_times.values()):.2f}s")
+
+    config = Config(
+        num_inference_steps=args.steps,
+        height=args.height,
+        width=args.width,
+        guidance=args.guidance,
+        vae_tiling=args.vae_tiling,
+        block_cache_threshold=args.block_cache_threshold,
+        block_cache_steps=args.block_cache_steps,
+        sampler=args.sampler,
+        sigma_schedule=args.sigma_schedule,
+        sigmas=args.sigmas,
+        trim_t5_padding=args.trim_t5_padding,
+        compiled=args.compile,
+        precomputed_modulations=args.precompute_modulations,
     )
 
+    profiler = ModuleProfiler.for_flux(flux) if args.profile is not None else None
+    if profiler is not None:
+        profiler.enable()
+
+    start_time = time.perf_counter()
+    if args.init_image is not None:
+        image = flux.generate_image_from_image(
+            seed=seed,
+            prompt=args.prompt,
+            image_path=args.init_image,
+            strength=args.strength,
+            config=config,
+        )
+    else:
+        image = flux.generate_image(
+            seed=seed,
+            prompt=args.prompt,
+            config=config,
+        )
+
+    generation_time = time.perf_counter() - start_time
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.save_chrome_trace(args.profile)
+
     ImageUtil.save_image(image, args.output)
 
+    if args.block_cache_compare and args.init_image is None:
+        start_time = time.perf_counter()
+        full_image = flux.generate_image(seed=seed, prompt=args.prompt, config=config.with_block_cache(threshold=None, steps=None))
+        full_time = time.perf_counter() - start_time
+        print(f"Block cache: {generation_time:.1f}s, full computation: {full_time:.1f}s, PSNR {ImageUtil.psnr(image, full_image):.2f}dB")
+
+    if args.trim_t5_padding_compare and args.init_image is None:
+        start_time = time.perf_counter()
+        padded_image = flux.generate_image(seed=seed, prompt=args.prompt, config=config.with_trim_t5_padding(False))
+        padded_time = time.perf_counter() - start_time
+        print(f"Trimmed T5 padding: {generation_time:.1f}s, full padding: {padded_time:.1f}s, PSNR {ImageUtil.psnr(image, padded_image):.2f}dB")
+
+    if args.compile:
+        for component, report in flux.compile_report().items():
+            for shape, times in report.items():
+                print(f"{component} {shape}: first call {times['first_call_time']:.2f}s, steady state {times['steady_state_time'] or 0:.2f}s over {times['steady_state_calls']} calls")
+
 
 if __name__ == '__main__':
     main()
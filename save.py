@@ -0,0 +1,23 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from flux_1.flux import Flux1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Save a converted (and optionally quantized) model for fast loading.')
+    parser.add_argument('--path', type=str, required=True, help='The directory to save the model to.')
+    parser.add_argument('--model', type=str, default="schnell", help='The model to save ("schnell" or "dev"). Default is "schnell".')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
+
+    args = parser.parse_args()
+
+    flux = Flux1.from_alias(args.model, quantize=args.quantize)
+    flux.save_model(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import argparse
+import logging
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from flux_1.config.offload_policy import OffloadPolicy
+from flux_1.flux import Flux1
+from flux_1.server.generation_server import GenerationServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep a model loaded and serve image generation requests.')
+    parser.add_argument('--model', type=str, default="schnell", help='The model to use ("schnell" or "dev"). Default is "schnell".')
+    parser.add_argument('--path', type=str, default=None, help='Local path of a model saved with save.py, used instead of --model')
+    parser.add_argument('--manifest', type=str, default=None, help='JSON file mapping model names ("schnell", "dev" or the repo id) to local model directories (Default is $FLUX_MODEL_MANIFEST)')
+    parser.add_argument('--offline', action='store_true', help='Never contact the Hugging Face hub, fail if the model is neither in the manifest nor in the local cache (also $HF_HUB_OFFLINE=1)')
+    parser.add_argument('--quantize', type=int, choices=[4, 8], default=None, help='Quantize the transformer and T5 weights to 4 or 8 bits (Default is no quantization)')
+    parser.add_argument('--offload', type=str, default="keep-all", choices=["keep-all", "sequential-offload", "encoders-only-once"], help='When to load and free the model components to save memory (Default is "keep-all")')
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='Host to listen on (Default is 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (Default is 8000)')
+    parser.add_argument('--socket', type=str, default=None, help='Listen on this Unix socket instead of host and port')
+    parser.add_argument('--output_dir', type=str, default="server_output", help='Directory the generated images are written to (Default is "server_output")')
+    parser.add_argument('--max_batch_size', type=int, default=4, help='Maximum number of compatible requests generated together (Default is 4)')
+    parser.add_argument('--max_wait', type=float, default=0.05, help='Seconds to wait for more compatible requests before starting a batch (Default is 0.05)')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.path is not None:
+        flux = Flux1.from_saved_model(args.path, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload))
+    else:
+        flux = Flux1.from_alias(args.model, quantize=args.quantize, offload_policy=OffloadPolicy.from_name(args.offload), manifest_path=args.manifest, offline=args.offline)
+    logging.info("Model loaded: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in flux.startup_times.items()))
+
+    server = GenerationServer(
+        flux,
+        output_dir=args.output_dir,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait,
+    )
+    server.serve(host=args.host, port=args.port, socket_path=args.socket)
+
+
+if __name__ == '__main__':
+    main()
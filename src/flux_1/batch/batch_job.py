@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import Path
+
+from flux_1.config.config import Config
+
+
+class BatchJob:
+
+    def __init__(
+            self,
+            prompt: str,
+            seed: int,
+            width: int = 1024,
+            height: int = 1024,
+            steps: int = 4,
+            guidance: float = 3.5,
+            sampler: str = "euler",
+            sigma_schedule: str = "linear",
+            output: str | None = None,
+    ):
+        self.prompt = prompt
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.steps = steps
+        self.guidance = guidance
+        self.sampler = sampler
+        self.sigma_schedule = sigma_schedule
+        self.output = output
+
+    @staticmethod
+    def from_dict(data: dict, default_seed: int) -> "BatchJob":
+        return BatchJob(
+            prompt=data["prompt"],
+            seed=int(data.get("seed", default_seed)),
+            width=int(data.get("width", 1024)),
+            height=int(data.get("height", 1024)),
+            steps=int(data.get("steps", 4)),
+            guidance=float(data.get("guidance", 3.5)),
+            sampler=data.get("sampler", "euler"),
+            sigma_schedule=data.get("sigma_schedule", "linear"),
+            output=data.get("output"),
+        )
+
+    @property
+    def key(self) -> tuple:
+        return (self.prompt, self.seed, *self.batch_key)
+
+    @property
+    def batch_key(self) -> tuple:
+        return self.width, self.height, self.steps, self.guidance, self.sampler, self.sigma_schedule
+
+    def output_path(self, output_dir: Path, model: str) -> Path:
+        if self.output is not None:
+            return output_dir / self.output
+
+        # Derived from everything that affects the image, including the model and its quantization, so reruns find
+        # the outputs of earlier runs with the same settings, and never those of other settings in the same directory
+        digest = hashlib.sha1(repr((model, *self.key)).encode()).hexdigest()[:12]
+        return output_dir / f"{digest}_{self.seed}.png"
+
+    def config(self) -> Config:
+        return Config(
+            num_inference_steps=self.steps,
+            width=self.width,
+            height=self.height,
+            guidance=self.guidance,
+            sampler=self.sampler,
+            sigma_schedule=self.sigma_schedule,
+        )
@@ -0,0 +1,119 @@
+import json
+import logging
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from flux_1.batch.batch_job import BatchJob
+from flux_1.flux import Flux1
+from flux_1.post_processing.image_writer import ImageWriter
+
+log = logging.getLogger(__name__)
+
+
+class BatchRunner:
+    MANIFEST_FILE = "manifest.jsonl"
+
+    def __init__(self, flux: Flux1, output_dir: str, batch_size: int = 4):
+        self.flux = flux
+        self.output_dir = Path(output_dir)
+        self.batch_size = batch_size
+        # Quantized weights give slightly different images, so they are told apart like in the prompt cache
+        self.model = flux.model_config.alias if flux.quantize is None else f"{flux.model_config.alias}-q{flux.quantize}"
+
+    @staticmethod
+    def read_jobs(path: str, base_seed: int = 0) -> list[BatchJob]:
+        jobs = []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    # Jobs without a seed get distinct ones, so that repeated prompts give different images
+                    jobs.append(BatchJob.from_dict(json.loads(line), default_seed=base_seed + len(jobs)))
+        return jobs
+
+    def run(self, jobs: list[BatchJob]) -> dict:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        pending = self._pending(jobs)
+        batches = self._batches(pending)
+        log.info(f"{len(jobs)} jobs, {len(pending)} to generate in {len(batches)} batches")
+
+        generated = 0
+        start_time = time.perf_counter()
+        with ImageWriter(overwrite=True) as writer, open(self.output_dir / BatchRunner.MANIFEST_FILE, "a") as manifest:
+            written = None
+            for i, batch in enumerate(batches):
+                batch_start_time = time.perf_counter()
+                images = self.flux.generate_images(
+                    seeds=[job.seed for job in batch],
+                    prompts=[job.prompt for job in batch],
+                    config=batch[0].config(),
+                )
+                futures = [writer.submit(image, job.output_path(self.output_dir, self.model)) for job, image in zip(batch, images)]
+                batch_time = time.perf_counter() - batch_start_time
+
+                # The images are written while the next batch is generated
+                if written is not None:
+                    self._write_manifest(manifest, *written)
+                written = (batch, futures, batch_time)
+                generated += len(batch)
+                log.info(f"Batch {i + 1}/{len(batches)}: {len(batch)} images in {batch_time:.1f}s")
+
+            if written is not None:
+                self._write_manifest(manifest, *written)
+            write_stats = writer.stats()
+
+        total_time = time.perf_counter() - start_time
+        return {
+            "jobs": len(jobs),
+            "skipped": len(jobs) - len(pending),
+            "generated": generated,
+            "time": total_time,
+            "images_per_minute": 60 * generated / total_time if total_time > 0 else 0.0,
+            "write_megabytes_per_second": write_stats["megabytes_per_second"],
+        }
+
+    def _write_manifest(self, manifest, batch: list[BatchJob], futures: list[Future], batch_time: float) -> None:
+        # The manifest doubles as the checkpoint, a batch is only recorded once all its images are written
+        for job, future in zip(batch, futures):
+            manifest.write(json.dumps({
+                "output": str(future.result()),
+                "model": self.model,
+                "prompt": job.prompt,
+                "seed": job.seed,
+                "width": job.width,
+                "height": job.height,
+                "steps": job.steps,
+                "guidance": job.guidance,
+                "sampler": job.sampler,
+                "sigma_schedule": job.sigma_schedule,
+                "batch_size": len(batch),
+                "time": batch_time / len(batch),
+            }) + "\n")
+        manifest.flush()
+
+    def _pending(self, jobs: list[BatchJob]) -> list[BatchJob]:
+        pending = []
+        seen = set()
+        for job in jobs:
+            if job.key in seen:
+                log.info(f"Skipping duplicate job for seed {job.seed}: {job.prompt[:40]}")
+                continue
+            seen.add(job.key)
+            if job.output_path(self.output_dir, self.model).exists():
+                continue
+            pending.append(job)
+        return pending
+
+    def _batches(self, jobs: list[BatchJob]) -> list[list[BatchJob]]:
+        # Jobs are grouped by everything a batch has to share, and sorted by prompt within a group so
+        # that repeated prompts end up in the same batches and hit the prompt cache
+        groups = {}
+        for job in jobs:
+            groups.setdefault(job.batch_key, []).append(job)
+
+        batches = []
+        for group in groups.values():
+            group.sort(key=lambda job: (job.prompt, job.seed))
+            for i in range(0, len(group), self.batch_size):
+                batches.append(group[i:i + self.batch_size])
+        return batches
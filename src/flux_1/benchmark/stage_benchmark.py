@@ -0,0 +1,377 @@
+import platform
+import time
+
+import mlx.core as mx
+from mlx.utils import tree_map
+
+from flux_1.cache.block_cache import BlockCache
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.flux import Flux1
+from flux_1.models.text_encoder.clip_encoder.clip_encoder import CLIPEncoder
+from flux_1.models.text_encoder.t5_encoder.t5_encoder import T5Encoder
+from flux_1.models.transformer.transformer import Transformer
+from flux_1.models.vae.vae import VAE
+from flux_1.post_processing.image_util import ImageUtil
+from flux_1.tokenizer.clip_tokenizer import TokenizerCLIP
+from flux_1.tokenizer.t5_tokenizer import TokenizerT5
+from flux_1.tokenizer.tokenizer import Tokenizer
+
+PRECISIONS = {"bfloat16": mx.bfloat16, "float16": mx.float16, "float32": mx.float32}
+
+
+class StageBenchmark:
+    PROMPT = "Luxury food photograph"
+
+    def __init__(
+            self,
+            model_config: ModelConfig,
+            transformer: Transformer,
+            vae: VAE,
+            t5_text_encoder: T5Encoder,
+            clip_text_encoder: CLIPEncoder,
+            t5_tokenizer=None,
+            clip_tokenizer=None,
+            description: str = "",
+    ):
+        self.model_config = model_config
+        self.transformer = transformer
+        self.vae = vae
+        self.t5_text_encoder = t5_text_encoder
+        self.clip_text_encoder = clip_text_encoder
+        self.t5_tokenizer = t5_tokenizer
+        self.clip_tokenizer = clip_tokenizer
+        self.description = description
+
+    @staticmethod
+    def from_flux(flux: Flux1) -> "StageBenchmark":
+        return StageBenchmark(
+            model_config=flux.model_config,
+            transformer=flux.transformer,
+            vae=flux.vae,
+            t5_text_encoder=flux.t5_text_encoder,
+            clip_text_encoder=flux.clip_text_encoder,
+            t5_tokenizer=flux.t5_tokenizer,
+            clip_tokenizer=flux.clip_tokenizer,
+            description=f"{flux.model_config.alias}" + (f"-q{flux.quantize}" if flux.quantize else ""),
+        )
+
+    @staticmethod
+    def random(
+            model_config: ModelConfig = ModelConfig.FLUX1_SCHNELL,
+            num_transformer_blocks: int = 1,
+            num_single_transformer_blocks: int = 1,
+            num_t5_blocks: int = 1,
+            num_clip_layers: int = 1,
+    ) -> "StageBenchmark":
+        # Full width layers but only a few of them, so that per layer costs are realistic and it all fits on a CPU
+        transformer_weights = {"time_text_embed": {"guidance_embedder": {}}} if model_config == ModelConfig.FLUX1_DEV else {"time_text_embed": {}}
+        return StageBenchmark(
+            model_config=model_config,
+            transformer=Transformer(
+                transformer_weights,
+                num_transformer_blocks=num_transformer_blocks,
+                num_single_transformer_blocks=num_single_transformer_blocks,
+            ),
+            vae=VAE({}),
+            t5_text_encoder=T5Encoder({}, num_blocks=num_t5_blocks),
+            clip_text_encoder=CLIPEncoder({}, num_encoder_layers=num_clip_layers),
+            description=f"random-{model_config.alias}-{num_transformer_blocks}x{num_single_transformer_blocks}",
+        )
+
+    def run_grid(
+            self,
+            resolutions: list[int],
+            steps: list[int],
+            batch_sizes: list[int],
+            precisions: list[str],
+            t5_lengths: list[int] | None = None,
+            compiled: bool = False,
+            precomputed_modulations: bool = False,
+    ) -> dict:
+        results = []
+        default_precision = Config.precision
+        # The weights are cast for each precision, and back to the dtypes they were loaded with afterwards
+        dtypes = [tree_map(lambda x: x.dtype, model.parameters()) for model in self._models()]
+        try:
+            for precision in precisions:
+                # Both the weights and the activations, which the models cast to Config.precision
+                Config.precision = PRECISIONS[precision]
+                self._set_precision(Config.precision)
+                for resolution in resolutions:
+                    for num_steps in steps:
+                        for batch_size in batch_sizes:
+                            for t5_length in t5_lengths or [None]:
+                                result = self.run(resolution, num_steps, batch_size, t5_length, compiled, precomputed_modulations)
+                                result["precision"] = precision
+                                results.append(result)
+        finally:
+            Config.precision = default_precision
+            self._restore_dtypes(dtypes)
+        return {
+            "model": self.description,
+            "device": str(mx.default_device()),
+            "platform": platform.platform(),
+            "mlx": mx.__version__,
+            "results": results,
+        }
+
+    def run(
+            self,
+            resolution: int,
+            num_steps: int,
+            batch_size: int,
+            t5_length: int | None = None,
+            compiled: bool = False,
+            precomputed_modulations: bool = False,
+    ) -> dict:
+        config = Config(
+            num_inference_steps=num_steps,
+            width=resolution,
+            height=resolution,
+            compiled=compiled,
+            precomputed_modulations=precomputed_modulations,
+        )
+        config = RuntimeConfig(config, self.model_config)
+        stages = {}
+        peak_memory = {}
+
+        def measure(name: str, fn):
+            StageBenchmark._reset_peak_memory()
+            start = time.perf_counter()
+            output = fn()
+            mx.eval(output)
+            stages[name] = time.perf_counter() - start
+            peak_memory[name] = StageBenchmark._get_peak_memory()
+            return output
+
+        t5_tokens, clip_tokens = self._tokenize(batch_size, measure, t5_length or self.model_config.max_sequence_length)
+        prompt_embeds = measure("t5_encode", lambda: self.t5_text_encoder.forward(t5_tokens))
+        pooled_prompt_embeds = measure("clip_encode", lambda: self.clip_text_encoder.forward(clip_tokens))
+
+        latents = Flux1.create_latents(list(range(batch_size)), config)
+        modulations = None
+        if config.precomputed_modulations:
+            modulations = measure("modulations", lambda: self.transformer.precompute_modulations(pooled_prompt_embeds, config))
+        step_times = []
+        for t in range(num_steps):
+            noise = measure("transformer_step", lambda: self.transformer.predict(
+                t=t,
+                prompt_embeds=prompt_embeds,
+                pooled_prompt_embeds=pooled_prompt_embeds,
+                hidden_states=latents,
+                config=config,
+                modulations=modulations,
+                compiled=config.compiled,
+            ))
+            step_times.append(stages["transformer_step"])
+            latents = latents + noise * (config.sigma_values[t + 1] - config.sigma_values[t])
+
+        # The first step also pays for one-off work such as the rotary embeddings, so it is reported separately
+        stages["transformer_first_step"] = step_times[0]
+        stages["transformer_step"] = sum(step_times[1:]) / (len(step_times) - 1) if len(step_times) > 1 else step_times[0]
+        stages["transformer_total"] = sum(step_times)
+
+        unpacked = Flux1._unpack_latents(latents, config.height, config.width)
+        decoded = measure("vae_decode", lambda: self.vae.decode(unpacked, compiled=config.compiled))
+        measure("to_image", lambda: ImageUtil.to_images(decoded))
+        stages["total"] = sum(time for name, time in stages.items() if name not in ("transformer_first_step", "transformer_step"))
+
+        result = {
+            "resolution": resolution,
+            "steps": num_steps,
+            "batch_size": batch_size,
+            "stages": stages,
+            "step_times": step_times,
+            "peak_memory": peak_memory,
+        }
+        if t5_length is not None:
+            result["t5_length"] = t5_length
+        return result
+
+    def compare_t5_padding(self, resolutions: list[int], steps: list[int], prompt_lengths: list[int], seed: int = 0) -> dict:
+        # The same image generated from a prompt of each number of tokens, padded to its bucket and to the full T5 length
+        full_length = self.model_config.max_sequence_length
+        results = []
+        for resolution in resolutions:
+            for num_steps in steps:
+                config = RuntimeConfig(Config(num_inference_steps=num_steps, width=resolution, height=resolution), self.model_config)
+                for num_tokens in prompt_lengths:
+                    t5_length = TokenizerT5.length_bucket(num_tokens, full_length)
+                    if t5_length == full_length:
+                        # Prompts that need the full length are not trimmed
+                        continue
+                    token_ids, clip_tokens = self._prompt_token_ids(num_tokens)
+                    pooled_prompt_embeds = self.clip_text_encoder.forward(clip_tokens)
+                    prompt_embeds, images, times = {}, {}, {}
+                    for length in (t5_length, full_length):
+                        start = time.perf_counter()
+                        prompt_embeds[length] = self.t5_text_encoder.forward(self._pad(token_ids, length))
+                        images[length] = self._generate(prompt_embeds[length], pooled_prompt_embeds, config, seed)
+                        times[length] = time.perf_counter() - start
+
+                    # Only the embeddings of the prompt tokens, the padding ones differ in number
+                    trimmed, full = prompt_embeds[t5_length][:, :num_tokens], prompt_embeds[full_length][:, :num_tokens]
+                    results.append({
+                        "resolution": resolution,
+                        "steps": num_steps,
+                        "prompt_tokens": num_tokens,
+                        "t5_length": t5_length,
+                        "full_length": full_length,
+                        "embedding_error": (mx.abs(trimmed - full).mean() / mx.abs(full).mean()).item(),
+                        "psnr": ImageUtil.psnr(images[t5_length], images[full_length]),
+                        "trimmed_time": times[t5_length],
+                        "full_time": times[full_length],
+                    })
+        return {
+            "model": self.description,
+            "device": str(mx.default_device()),
+            "platform": platform.platform(),
+            "mlx": mx.__version__,
+            "results": results,
+        }
+
+    def compare_block_cache(
+            self,
+            resolutions: list[int],
+            steps: list[int],
+            thresholds: list[float],
+            t5_length: int | None = None,
+            seed: int = 0,
+    ) -> dict:
+        # The same image generated with the block cache at each threshold and with every step computed fully
+        token_ids, clip_tokens = self._prompt_token_ids(16)
+        prompt_embeds = self.t5_text_encoder.forward(self._pad(token_ids, t5_length or self.model_config.max_sequence_length))
+        pooled_prompt_embeds = self.clip_text_encoder.forward(clip_tokens)
+        mx.eval(prompt_embeds, pooled_prompt_embeds)
+        results = []
+        for resolution in resolutions:
+            for num_steps in steps:
+                config = RuntimeConfig(Config(num_inference_steps=num_steps, width=resolution, height=resolution), self.model_config)
+                start = time.perf_counter()
+                full_image = self._generate(prompt_embeds, pooled_prompt_embeds, config, seed)
+                full_time = time.perf_counter() - start
+                for threshold in thresholds:
+                    block_cache = BlockCache(threshold=threshold)
+                    start = time.perf_counter()
+                    image = self._generate(prompt_embeds, pooled_prompt_embeds, config, seed, block_cache)
+                    results.append({
+                        "resolution": resolution,
+                        "steps": num_steps,
+                        "threshold": threshold,
+                        "reused_steps": block_cache.reused_steps,
+                        "psnr": ImageUtil.psnr(image, full_image),
+                        "cached_time": time.perf_counter() - start,
+                        "full_time": full_time,
+                    })
+        return {
+            "model": self.description,
+            "device": str(mx.default_device()),
+            "platform": platform.platform(),
+            "mlx": mx.__version__,
+            "results": results,
+        }
+
+    def _prompt_token_ids(self, num_tokens: int) -> (list[int], mx.array):
+        # T5 token ids of a prompt of exactly num_tokens tokens (the last one being the end token), and its CLIP tokens
+        if self.t5_tokenizer is not None:
+            prompt = " ".join([StageBenchmark.PROMPT] * num_tokens)
+            token_ids = Tokenizer._truncate(self.t5_tokenizer.token_ids([prompt])[0], num_tokens)
+            clip_tokens, _ = self.clip_tokenizer.tokenize([prompt])
+            return token_ids, clip_tokens
+
+        # Random models come without tokenizers, so the prompt is random token ids followed by the end token (1)
+        token_ids = mx.random.randint(2, 32128, (num_tokens - 1,), key=mx.random.key(num_tokens)).tolist() + [1]
+        clip_tokens = mx.random.randint(0, 49408, (1, TokenizerCLIP.MAX_TOKEN_LENGTH), key=mx.random.key(num_tokens))
+        return token_ids, clip_tokens
+
+    def _pad(self, token_ids: list[int], length: int) -> mx.array:
+        pad_token_id = 0 if self.t5_tokenizer is None else self.t5_tokenizer.tokenizer.pad_token_id
+        return mx.array([token_ids + [pad_token_id] * (length - len(token_ids))], dtype=mx.int32)
+
+    def _generate(
+            self,
+            prompt_embeds: mx.array,
+            pooled_prompt_embeds: mx.array,
+            config: RuntimeConfig,
+            seed: int,
+            block_cache: BlockCache | None = None,
+    ):
+        latents = Flux1.create_latents([seed], config)
+        for t in range(config.num_inference_steps):
+            noise = self.transformer.predict(
+                t=t,
+                prompt_embeds=prompt_embeds,
+                pooled_prompt_embeds=pooled_prompt_embeds,
+                hidden_states=latents,
+                config=config,
+                block_cache=block_cache,
+            )
+            latents = latents + noise * (config.sigma_values[t + 1] - config.sigma_values[t])
+            mx.eval(latents)
+        decoded = self.vae.decode(Flux1._unpack_latents(latents, config.height, config.width))
+        return ImageUtil.to_images(decoded)[0]
+
+    def _tokenize(self, batch_size: int, measure, t5_length: int) -> (mx.array, mx.array):
+        prompts = [f"{StageBenchmark.PROMPT} {i}" for i in range(batch_size)]
+        if self.t5_tokenizer is not None:
+            t5_tokens, _ = measure("t5_tokenize", lambda: self.t5_tokenizer.tokenize(prompts, t5_length))
+            clip_tokens, _ = measure("clip_tokenize", lambda: self.clip_tokenizer.tokenize(prompts))
+            return t5_tokens, clip_tokens
+
+        # Random models come without tokenizers, so the text encoders get random token ids of the right length
+        t5_tokens = mx.random.randint(0, 32128, (batch_size, t5_length))
+        clip_tokens = mx.random.randint(0, 49408, (batch_size, TokenizerCLIP.MAX_TOKEN_LENGTH))
+        return t5_tokens, clip_tokens
+
+    def _models(self) -> list:
+        return [self.transformer, self.vae, self.t5_text_encoder, self.clip_text_encoder]
+
+    def _set_precision(self, precision: mx.Dtype) -> None:
+        for model in self._models():
+            model.apply(lambda x: x.astype(precision) if mx.issubdtype(x.dtype, mx.floating) else x)
+
+            # Materialize the (lazy) weights now, so that neither the random init nor the cast is timed as a stage
+            mx.eval(model.parameters())
+
+    def _restore_dtypes(self, dtypes: list[dict]) -> None:
+        # Only the dtypes, weights that went through a narrower precision keep its rounding
+        for model, model_dtypes in zip(self._models(), dtypes):
+            model.update(tree_map(lambda x, dtype: x.astype(dtype), model.parameters(), model_dtypes))
+            mx.eval(model.parameters())
+
+    @staticmethod
+    def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list[str]:
+        regressions = []
+        baseline_results = {StageBenchmark.result_key(result): result for result in baseline["results"]}
+        for result in current["results"]:
+            key = StageBenchmark.result_key(result)
+            previous = baseline_results.get(key)
+            if previous is None:
+                continue
+            for metric in ("stages", "peak_memory"):
+                for name, value in result[metric].items():
+                    old = previous[metric].get(name)
+                    if old and value > old * (1 + tolerance):
+                        regressions.append(f"{key} {metric}.{name}: {old:.4g} -> {value:.4g} (+{100 * (value / old - 1):.1f}%)")
+        return regressions
+
+    @staticmethod
+    def result_key(result: dict) -> str:
+        key = f"{result['resolution']}px/{result['steps']}steps/batch{result['batch_size']}/{result['precision']}"
+        # Results at the full T5 length have no t5_length, which keeps them comparable with older runs
+        return key if "t5_length" not in result else f"{key}/t5-{result['t5_length']}"
+
+    @staticmethod
+    def _reset_peak_memory() -> None:
+        if hasattr(mx, "reset_peak_memory"):
+            mx.reset_peak_memory()
+        else:
+            mx.metal.reset_peak_memory()
+
+    @staticmethod
+    def _get_peak_memory() -> int:
+        if hasattr(mx, "get_peak_memory"):
+            return mx.get_peak_memory()
+        return mx.metal.get_peak_memory()
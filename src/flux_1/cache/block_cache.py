@@ -0,0 +1,52 @@
+import mlx.core as mx
+
+
+class BlockCache:
+
+    def __init__(self, threshold: float | None = None, steps: list[int] | None = None):
+        if threshold is None and steps is None:
+            raise ValueError("The block cache needs either a threshold or the steps to reuse")
+        self.threshold = threshold
+        self.steps = None if steps is None else set(steps)
+        self.residual = None
+        self.reused_steps = []
+        self._previous_input = None
+        self._accumulated_change = 0.0
+
+    @staticmethod
+    def from_config(config) -> "BlockCache | None":
+        if config.block_cache_threshold is None and config.block_cache_steps is None:
+            return None
+        return BlockCache(threshold=config.block_cache_threshold, steps=config.block_cache_steps)
+
+    def should_reuse(self, t: int, modulated_input: mx.array) -> bool:
+        if self.steps is not None:
+            # The steps to reuse are given, deciding needs no values, so the step is not synchronized with the host
+            reuse = self.residual is not None and t in self.steps
+        else:
+            reuse = self._below_threshold(modulated_input)
+        if reuse:
+            self.reused_steps.append(t)
+        return reuse
+
+    def _below_threshold(self, modulated_input: mx.array) -> bool:
+        previous_input = self._previous_input
+        self._previous_input = modulated_input
+        if self.residual is None or previous_input is None:
+            return False
+
+        # Steps are skipped until the relative change of the input, summed since the last full step, exceeds the threshold.
+        # This is the only point the cache waits for the device, and only once there is a residual to reuse. It also
+        # evaluates the input kept for the next step
+        change = mx.abs(modulated_input - previous_input).mean() / mx.abs(previous_input).mean()
+        self._accumulated_change += change.item()
+        if self._accumulated_change < self.threshold:
+            return True
+        self._accumulated_change = 0.0
+        return False
+
+    def update(self, residual: mx.array) -> None:
+        # The kept arrays are scheduled right away without waiting for them, a lazy array cannot be evaluated later
+        # from another thread (generate_steps_async resumes the steps on executor threads)
+        self.residual = residual
+        mx.async_eval(*[array for array in (residual, self._previous_input) if array is not None])
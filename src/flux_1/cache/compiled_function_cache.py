@@ -0,0 +1,57 @@
+import threading
+import time
+from typing import Callable
+
+import mlx.core as mx
+
+
+class CompiledFunctionCache:
+
+    def __init__(self, fn: Callable, state: dict | None = None):
+        self.fn = fn
+        self.state = state
+        self._compiled = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key: tuple, *args):
+        # One compiled function per input shape, so that a new shape never invalidates the graph of another one
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                # The weights are inputs of the graph rather than constants baked into it, so that a compiled function
+                # sees later updates of them (e.g. the casts of the benchmark) and does not keep the old ones alive
+                compiled = mx.compile(self.fn, inputs=self.state)
+                self._compiled[key] = compiled
+                self._stats[key] = {"first_call_time": None, "calls": 0, "steady_state_time": 0.0}
+
+        start = time.perf_counter()
+        output = compiled(*args)
+        mx.eval(output)
+        elapsed = time.perf_counter() - start
+
+        # The first call also traces and compiles the graph, the others only run it
+        with self._lock:
+            stats = self._stats[key]
+            if stats["first_call_time"] is None:
+                stats["first_call_time"] = elapsed
+            else:
+                stats["calls"] += 1
+                stats["steady_state_time"] += elapsed
+        return output
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "/".join(str(part) for part in key): {
+                    "first_call_time": stats["first_call_time"],
+                    "steady_state_calls": stats["calls"],
+                    "steady_state_time": stats["steady_state_time"] / stats["calls"] if stats["calls"] else None,
+                }
+                for key, stats in self._stats.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+            self._stats.clear()
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import mlx.core as mx
+
+log = logging.getLogger(__name__)
+
+
+class PromptCache:
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, path: str | None = None):
+        self.max_bytes = max_bytes
+        self.path = None if path is None else Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(model_alias: str, max_sequence_length: int, prompt: str) -> str:
+        text = f"{model_alias}\n{max_sequence_length}\n{prompt}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[mx.array, mx.array] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, entry)
+            return entry
+
+    def put(self, key: str, prompt_embeds: mx.array, pooled_prompt_embeds: mx.array) -> None:
+        # Copied, a slice of a batch keeps the memory of the whole batch alive but is only counted for its own bytes
+        prompt_embeds = mx.contiguous(prompt_embeds)
+        pooled_prompt_embeds = mx.contiguous(pooled_prompt_embeds)
+        mx.eval(prompt_embeds, pooled_prompt_embeds)
+        entry = (prompt_embeds, pooled_prompt_embeds)
+        with self._lock:
+            self._insert(key, entry)
+        self._save_to_disk(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _insert(self, key: str, entry: (mx.array, mx.array)) -> None:
+        if key in self._entries:
+            self._size -= PromptCache._nbytes(self._entries.pop(key))
+        size = PromptCache._nbytes(entry)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= PromptCache._nbytes(evicted)
+
+    def _load_from_disk(self, key: str) -> tuple[mx.array, mx.array] | None:
+        if self.path is None:
+            return None
+        file_path = self.path / f"{key}.safetensors"
+        if not file_path.exists():
+            return None
+        try:
+            arrays = mx.load(str(file_path))
+            entry = arrays["prompt_embeds"], arrays["pooled_prompt_embeds"]
+            # Evaluated like the entries put in the cache, so that they can be used from any thread
+            mx.eval(*entry)
+            return entry
+        except Exception as e:
+            log.warning(f"Could not read cached prompt embedding {file_path}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, entry: (mx.array, mx.array)) -> None:
+        if self.path is None:
+            return
+        file_path = self.path / f"{key}.safetensors"
+        tmp_path = self.path / f"{key}.tmp.safetensors"
+        try:
+            mx.save_safetensors(str(tmp_path), {"prompt_embeds": entry[0], "pooled_prompt_embeds": entry[1]})
+            tmp_path.replace(file_path)
+        except Exception as e:
+            log.warning(f"Could not write cached prompt embedding {file_path}: {e}")
+
+    @staticmethod
+    def _nbytes(entry: (mx.array, mx.array)) -> int:
+        return sum(array.nbytes for array in entry)
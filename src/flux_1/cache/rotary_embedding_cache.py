@@ -0,0 +1,34 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import mlx.core as mx
+
+
+class RotaryEmbeddingCache:
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, create: Callable[[], mx.array]) -> mx.array:
+        with self._lock:
+            embeddings = self._entries.get(key)
+            if embeddings is not None:
+                self._entries.move_to_end(key)
+                return embeddings
+
+        embeddings = create()
+        mx.eval(embeddings)
+
+        with self._lock:
+            self._entries[key] = embeddings
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return embeddings
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,7 +1,12 @@
+import copy
 import logging
 
 import mlx.core as mx
 
+from flux_1.models.common.attention_backend import AttentionBackend
+from flux_1.sampling.samplers import Samplers
+from flux_1.sampling.sigma_schedule import SigmaSchedule
+
 log = logging.getLogger(__name__)
 
 
@@ -14,6 +19,19 @@ class Config:
             width: int = 1024,
             height: int = 1024,
             guidance: float = 4.0,
+            vae_tiling: bool = False,
+            vae_tile_size: int = 512,
+            vae_tile_overlap: int = 64,
+            block_cache_threshold: float | None = None,
+            block_cache_steps: list[int] | None = None,
+            sampler: str = "euler",
+            sigma_schedule: str = "linear",
+            sigmas: list[float] | None = None,
+            trim_t5_padding: bool = False,
+            compiled: bool = False,
+            precomputed_modulations: bool = False,
+            attention_backend: str = AttentionBackend.FUSED,
+            attention_chunk_size: int = AttentionBackend.DEFAULT_CHUNK_SIZE,
     ):
         if width % 16 != 0 or height % 16 != 0:
             log.warning("Width and height should be multiples of 16. Rounding down.")
@@ -21,3 +39,53 @@ class Config:
         self.height = 16 * (width // 16)
         self.num_inference_steps = num_inference_steps
         self.guidance = guidance
+        if vae_tile_size % 8 != 0 or vae_tile_overlap % 8 != 0:
+            raise ValueError("VAE tile size and overlap must be multiples of 8.")
+        if not 0 <= vae_tile_overlap < vae_tile_size:
+            raise ValueError("VAE tile overlap must be smaller than the tile size.")
+        self.vae_tiling = vae_tiling
+        self.vae_tile_size = vae_tile_size
+        self.vae_tile_overlap = vae_tile_overlap
+        if block_cache_threshold is not None and block_cache_threshold <= 0:
+            raise ValueError("The block cache threshold must be positive.")
+        self.block_cache_threshold = block_cache_threshold
+        self.block_cache_steps = block_cache_steps
+        if sampler not in Samplers.SAMPLERS:
+            raise ValueError(f"'{sampler}' is not a valid sampler, choose one of {', '.join(Samplers.SAMPLERS)}")
+        if sigma_schedule not in SigmaSchedule.SCHEDULES:
+            raise ValueError(f"'{sigma_schedule}' is not a valid sigma schedule, choose one of {', '.join(SigmaSchedule.SCHEDULES)}")
+        self.sampler = sampler
+        self.sigma_schedule = sigma_schedule
+
+        # Custom sigmas replace the schedule, one step per sigma
+        if sigmas is not None:
+            SigmaSchedule.validate(sigmas)
+            self.num_inference_steps = len(sigmas)
+        self.sigmas = sigmas
+        self.trim_t5_padding = trim_t5_padding
+        self.compiled = compiled
+        self.precomputed_modulations = precomputed_modulations
+        if attention_backend not in AttentionBackend.BACKENDS:
+            raise ValueError(f"'{attention_backend}' is not a valid attention backend, choose one of {', '.join(AttentionBackend.BACKENDS)}")
+        if attention_chunk_size < 1:
+            raise ValueError("The attention chunk size must be at least 1.")
+        self.attention_backend = attention_backend
+        self.attention_chunk_size = attention_chunk_size
+
+    def with_size(self, width: int, height: int) -> "Config":
+        # Stored the same (swapped) way as in the constructor above
+        config = copy.copy(self)
+        config.width = 16 * (height // 16)
+        config.height = 16 * (width // 16)
+        return config
+
+    def with_block_cache(self, threshold: float | None, steps: list[int] | None) -> "Config":
+        config = copy.copy(self)
+        config.block_cache_threshold = threshold
+        config.block_cache_steps = steps
+        return config
+
+    def with_trim_t5_padding(self, trim_t5_padding: bool) -> "Config":
+        config = copy.copy(self)
+        config.trim_t5_padding = trim_t5_padding
+        return config
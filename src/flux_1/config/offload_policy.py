@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class OffloadPolicy(Enum):
+    KEEP_ALL = "keep-all"
+    SEQUENTIAL_OFFLOAD = "sequential-offload"
+    ENCODERS_ONLY_ONCE = "encoders-only-once"
+
+    @staticmethod
+    def from_name(name: str) -> "OffloadPolicy":
+        for policy in OffloadPolicy:
+            if policy.value == name:
+                return policy
+        raise ValueError(f"'{name}' is not a valid offload policy")
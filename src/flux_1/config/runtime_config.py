@@ -3,6 +3,7 @@ import numpy as np
 
 from flux_1.config.config import Config
 from flux_1.config.model_config import ModelConfig
+from flux_1.sampling.sigma_schedule import SigmaSchedule
 
 
 class RuntimeConfig:
@@ -10,7 +11,10 @@ class RuntimeConfig:
     def __init__(self, config: Config, model_config: ModelConfig):
         self.config = config
         self.model_config = model_config
-        self.sigmas = self._create_sigmas(config, model_config)
+        sigmas = self._create_sigmas(config, model_config)
+        # Also kept on the host, so the samplers read the noise levels of a step without waiting for the device
+        self.sigma_values = sigmas.tolist()
+        self.sigmas = mx.array(sigmas)
 
     @property
     def height(self):
@@ -28,6 +32,54 @@ class RuntimeConfig:
     def num_inference_steps(self):
         return self.config.num_inference_steps
 
+    @property
+    def vae_tiling(self):
+        return self.config.vae_tiling
+
+    @property
+    def vae_tile_size(self):
+        return self.config.vae_tile_size
+
+    @property
+    def vae_tile_overlap(self):
+        return self.config.vae_tile_overlap
+
+    @property
+    def block_cache_threshold(self):
+        return self.config.block_cache_threshold
+
+    @property
+    def block_cache_steps(self):
+        return self.config.block_cache_steps
+
+    @property
+    def sampler(self):
+        return self.config.sampler
+
+    @property
+    def sigma_schedule(self):
+        return self.config.sigma_schedule
+
+    @property
+    def trim_t5_padding(self):
+        return self.config.trim_t5_padding
+
+    @property
+    def compiled(self):
+        return self.config.compiled
+
+    @property
+    def precomputed_modulations(self):
+        return self.config.precomputed_modulations
+
+    @property
+    def attention_backend(self):
+        return self.config.attention_backend
+
+    @property
+    def attention_chunk_size(self):
+        return self.config.attention_chunk_size
+
     @property
     def precision(self):
         return self.config.precision
@@ -37,26 +89,25 @@ class RuntimeConfig:
         return self.model_config.num_train_steps
 
     @staticmethod
-    def _create_sigmas(config, model):
-        sigmas = RuntimeConfig._create_sigmas_values(config.num_inference_steps)
+    def _create_sigmas(config, model) -> np.ndarray:
+        # Custom sigmas are used as given, without the resolution dependent shift of the dev model
+        if config.sigmas is not None:
+            return RuntimeConfig._to_sigmas(np.array(config.sigmas))
+
+        sigmas = SigmaSchedule.create(config.sigma_schedule, config.num_inference_steps)
         if model == ModelConfig.FLUX1_DEV:
             sigmas = RuntimeConfig._shift_sigmas(sigmas, config.width, config.height)
-        return sigmas
+        return RuntimeConfig._to_sigmas(sigmas)
 
     @staticmethod
-    def _create_sigmas_values(num_inference_steps: int) -> mx.array:
-        sigmas = np.linspace(1.0, 1 / num_inference_steps, num_inference_steps)
-        sigmas = mx.array(sigmas).astype(mx.float32)
-        return mx.concatenate([sigmas, mx.zeros(1)])
+    def _to_sigmas(sigmas: np.ndarray) -> np.ndarray:
+        return np.append(sigmas, 0).astype(np.float32)
 
     @staticmethod
-    def _shift_sigmas(sigmas: mx.array, width: int, height: int) -> mx.array:
+    def _shift_sigmas(sigmas: np.ndarray, width: int, height: int) -> np.ndarray:
         y1 = 0.5
         x1 = 256
         m = (1.15 - y1) / (4096 - x1)
         b = y1 - m * x1
         mu = m * width * height / 256 + b
-        mu = mx.array(mu)
-        shifted_sigmas = mx.exp(mu) / (mx.exp(mu) + (1 / sigmas - 1))
-        shifted_sigmas[-1] = 0
-        return shifted_sigmas
+        return np.exp(mu) / (np.exp(mu) + (1 / sigmas - 1))
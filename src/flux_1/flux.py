@@ -1,96 +1,551 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Generator, Iterator
+
 import PIL
 import mlx.core as mx
-from PIL import Image
+from mlx import nn
 from tqdm import tqdm
 
+from flux_1.cache.block_cache import BlockCache
+from flux_1.cache.prompt_cache import PromptCache
 from flux_1.config.config import Config
 from flux_1.config.model_config import ModelConfig
+from flux_1.config.offload_policy import OffloadPolicy
 from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.generation.denoise_step import DenoiseStep
+from flux_1.models.common.attention_backend import AttentionBackend
 from flux_1.models.text_encoder.clip_encoder.clip_encoder import CLIPEncoder
 from flux_1.models.text_encoder.t5_encoder.t5_encoder import T5Encoder
 from flux_1.models.transformer.transformer import Transformer
+from flux_1.models.vae.latent_previewer import LatentPreviewer
 from flux_1.models.vae.vae import VAE
+from flux_1.models.vae.vae_tiler import VAETiler
 from flux_1.post_processing.image_util import ImageUtil
+from flux_1.sampling.samplers import Samplers
 from flux_1.tokenizer.clip_tokenizer import TokenizerCLIP
 from flux_1.tokenizer.t5_tokenizer import TokenizerT5
 from flux_1.tokenizer.tokenizer_handler import TokenizerHandler
+from flux_1.weights.component_loader import ComponentLoader
+from flux_1.weights.model_resolver import ModelResolver
+from flux_1.weights.model_saver import ModelSaver
+from flux_1.weights.quantization_util import QuantizationUtil
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
 from flux_1.weights.weight_handler import WeightHandler
 
+log = logging.getLogger(__name__)
+
 
 class Flux1:
+    COMPONENTS = [WeightHandler.VAE, WeightHandler.TRANSFORMER, WeightHandler.T5_ENCODER, WeightHandler.CLIP_ENCODER]
 
-    def __init__(self, repo_id: str):
+    def __init__(
+            self,
+            repo_id: str,
+            prompt_cache: PromptCache | None = None,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            local_path: str | None = None,
+            offload_policy: OffloadPolicy = OffloadPolicy.KEEP_ALL,
+            offload_path: str | None = None,
+            manifest_path: str | None = None,
+            offline: bool = False,
+            fused_projections: bool = True,
+    ):
         self.model_config = ModelConfig.from_repo(repo_id)
+        self.prompt_cache = PromptCache() if prompt_cache is None else prompt_cache
+        self.offload_policy = offload_policy
+        self.latent_previewer = LatentPreviewer()
+
+        # Seconds spent on each part of loading the model, see main.py --startup_times
+        self.startup_times = {}
+
+        # Resolve the model directory, from the hub only when it is neither given, in a manifest nor in the local cache
+        start_time = time.perf_counter()
+        if local_path is not None:
+            root_path = Path(local_path)
+        else:
+            root_path = ModelResolver.resolve(repo_id, self.model_config.alias, manifest_path, offline)
+        self.startup_times["resolve"] = time.perf_counter() - start_time
 
         # Initialize the tokenizers
-        tokenizers = TokenizerHandler.load_from_disk_or_huggingface(repo_id, self.model_config.max_sequence_length)
+        start_time = time.perf_counter()
+        tokenizers = TokenizerHandler(root_path, self.model_config.max_sequence_length)
         self.t5_tokenizer = TokenizerT5(tokenizers.t5, max_length=self.model_config.max_sequence_length)
         self.clip_tokenizer = TokenizerCLIP(tokenizers.clip)
+        self.startup_times["tokenizers"] = time.perf_counter() - start_time
+
+        # Resolve the weights, the models themselves are created by the component loader
+        weights = WeightHandler.load_from_path(root_path)
+        if weights.quantize is not None:
+            if quantize is not None and quantize != weights.quantize:
+                log.warning(f"Ignoring quantize={quantize}, the saved model is already quantized to {weights.quantize} bits.")
+            quantize = weights.quantize
+            quantize_group_size = weights.quantize_group_size
+        self.quantize = quantize
+        self.quantize_group_size = quantize_group_size
+        # Whether the projections are fused is chosen per model, so models loaded both ways can be used side by side
+        self.component_loader = ComponentLoader(weights, quantize, quantize_group_size, offload_path, fused_projections)
+        self._components = {}
 
-        # Initialize the models
-        weights = WeightHandler.load_from_disk_or_huggingface(repo_id)
-        self.vae = VAE(weights.vae)
-        self.transformer = Transformer(weights.transformer)
-        self.t5_text_encoder = T5Encoder(weights.t5_encoder)
-        self.clip_text_encoder = CLIPEncoder(weights.clip_encoder)
+        # Unless memory is to be saved, all models are loaded up front and kept for the life of the process
+        start_time = time.perf_counter()
+        if offload_policy == OffloadPolicy.KEEP_ALL:
+            for component in Flux1.COMPONENTS:
+                self._component(component)
+        self.startup_times["weights"] = time.perf_counter() - start_time
 
     @staticmethod
-    def from_repo(repo_id: str) -> "Flux1":
-        return Flux1(repo_id)
+    def from_repo(
+            repo_id: str,
+            prompt_cache: PromptCache | None = None,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            offload_policy: OffloadPolicy = OffloadPolicy.KEEP_ALL,
+            offload_path: str | None = None,
+            local_path: str | None = None,
+            manifest_path: str | None = None,
+            offline: bool = False,
+            fused_projections: bool = True,
+    ) -> "Flux1":
+        return Flux1(
+            repo_id,
+            prompt_cache=prompt_cache,
+            quantize=quantize,
+            quantize_group_size=quantize_group_size,
+            local_path=local_path,
+            offload_policy=offload_policy,
+            offload_path=offload_path,
+            manifest_path=manifest_path,
+            offline=offline,
+            fused_projections=fused_projections,
+        )
+
+    @staticmethod
+    def from_alias(
+            alias: str,
+            prompt_cache: PromptCache | None = None,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            offload_policy: OffloadPolicy = OffloadPolicy.KEEP_ALL,
+            offload_path: str | None = None,
+            local_path: str | None = None,
+            manifest_path: str | None = None,
+            offline: bool = False,
+            fused_projections: bool = True,
+    ) -> "Flux1":
+        return Flux1.from_repo(
+            ModelConfig.from_alias(alias).model_name,
+            prompt_cache=prompt_cache,
+            quantize=quantize,
+            quantize_group_size=quantize_group_size,
+            offload_policy=offload_policy,
+            offload_path=offload_path,
+            local_path=local_path,
+            manifest_path=manifest_path,
+            offline=offline,
+            fused_projections=fused_projections,
+        )
 
     @staticmethod
-    def from_alias(alias: str) -> "Flux1":
-        return Flux1(ModelConfig.from_alias(alias).model_name)
+    def from_saved_model(
+            path: str,
+            prompt_cache: PromptCache | None = None,
+            quantize: int | None = None,
+            offload_policy: OffloadPolicy = OffloadPolicy.KEEP_ALL,
+            fused_projections: bool = True,
+    ) -> "Flux1":
+        metadata = SavedModelMetadata.read(Path(path))
+        return Flux1(
+            metadata.model_name,
+            prompt_cache=prompt_cache,
+            quantize=quantize,
+            local_path=path,
+            offload_policy=offload_policy,
+            fused_projections=fused_projections,
+        )
+
+    def save_model(self, path: str) -> None:
+        ModelSaver.save_model(self, path)
+
+    @property
+    def vae(self) -> VAE:
+        return self._component(WeightHandler.VAE)
+
+    @property
+    def transformer(self) -> Transformer:
+        return self._component(WeightHandler.TRANSFORMER)
+
+    @property
+    def t5_text_encoder(self) -> T5Encoder:
+        return self._component(WeightHandler.T5_ENCODER)
+
+    @property
+    def clip_text_encoder(self) -> CLIPEncoder:
+        return self._component(WeightHandler.CLIP_ENCODER)
+
+    @property
+    def loaded_components(self) -> dict[str, nn.Module]:
+        return dict(self._components)
+
+    def preload(self, *components: str) -> None:
+        # Loads the given components (all by default) and evaluates their weights, so that any thread can use them
+        for component in components or Flux1.COMPONENTS:
+            mx.eval(self._component(component).parameters())
+
+    def _component(self, component: str):
+        if component not in self._components:
+            self._components[component] = self.component_loader.load(component)
+        return self._components[component]
+
+    def release(self, *components: str) -> None:
+        released = False
+        for component in components:
+            model = self._components.pop(component, None)
+            if model is not None:
+                self.component_loader.release(component, model)
+                released = True
+        if released:
+            ComponentLoader.clear_cache()
+
+    def compile_report(self) -> dict:
+        # First call (trace and compile) versus steady state times of the compiled functions, see Config(compiled=True)
+        report = {}
+        if WeightHandler.TRANSFORMER in self._components:
+            report["transformer"] = self._components[WeightHandler.TRANSFORMER].compiled_forward.report()
+        if WeightHandler.VAE in self._components:
+            report["vae_decode"] = self._components[WeightHandler.VAE].compiled_decode.report()
+        return report
+
+    def _end_phase(self, *components: str) -> None:
+        if self.offload_policy == OffloadPolicy.SEQUENTIAL_OFFLOAD:
+            self.release(*components)
+        elif self.offload_policy == OffloadPolicy.ENCODERS_ONLY_ONCE:
+            self.release(*[c for c in components if c in (WeightHandler.T5_ENCODER, WeightHandler.CLIP_ENCODER)])
 
     def generate_image(self, seed: int, prompt: str, config: Config = Config()) -> PIL.Image.Image:
+        return self.generate_images(seeds=[seed], prompts=[prompt], config=config)[0]
+
+    def generate_images(self, seeds: list[int], prompts: list[str], config: Config = Config()) -> list[PIL.Image.Image]:
+        step = None
+        for step in self.generate_steps(seeds=seeds, prompts=prompts, config=config):
+            pass
+        return step.images
+
+    def generate_steps(
+            self,
+            seeds: list[int],
+            prompts: list[str],
+            config: Config = Config(),
+            preview: bool = False,
+            cancel_event: threading.Event | None = None,
+    ) -> Iterator[DenoiseStep]:
+        if len(prompts) == 1 and len(seeds) > 1:
+            prompts = prompts * len(seeds)
+        if len(seeds) != len(prompts):
+            raise ValueError(f"Got {len(seeds)} seeds but {len(prompts)} prompts")
+
         # Create a new runtime config based on the model type and input parameters
         config = RuntimeConfig(config, self.model_config)
 
         # Create the latents
-        latents = mx.random.normal(
-            shape=[1, (config.height // 16) * (config.width // 16), 64],
-            key=mx.random.key(seed)
+        latents = Flux1.create_latents(seeds, config)
+
+        # Embedd the prompts
+        prompt_embeds, pooled_prompt_embeds = self._embed_prompts(prompts, config)
+
+        yield from self._denoise_steps(latents, prompt_embeds, pooled_prompt_embeds, config, 0, preview, cancel_event)
+
+    async def generate_steps_async(
+            self,
+            seeds: list[int],
+            prompts: list[str],
+            config: Config = Config(),
+            preview: bool = False,
+            cancel_event: threading.Event | None = None,
+    ) -> AsyncIterator[DenoiseStep]:
+        # Every step runs in a worker thread, so the event loop stays responsive while the model runs. It is always the
+        # same thread, the lazy arrays a step leaves for the next (the sigmas, cached rotary embeddings, ...) are bound to it
+        cancel_event = threading.Event() if cancel_event is None else cancel_event
+        steps = self.generate_steps(seeds, prompts, config, preview, cancel_event)
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flux-steps")
+        done = object()
+        try:
+            while True:
+                step = await loop.run_in_executor(executor, next, steps, done)
+                if step is done:
+                    return
+                yield step
+        finally:
+            # When the consumer stops early, the generator is closed on its thread, which ends the phase (and offloads)
+            cancel_event.set()
+            try:
+                await loop.run_in_executor(executor, steps.close)
+            finally:
+                executor.shutdown(wait=False)
+
+    def generate_image_from_image(
+            self,
+            seed: int,
+            prompt: str,
+            image_path: str,
+            strength: float = 0.6,
+            config: Config = Config(),
+    ) -> PIL.Image.Image:
+        if not 0 < strength <= 1:
+            raise ValueError("Strength must be in (0, 1]")
+
+        # The image is used at its native resolution (rounded down to a multiple of 16)
+        array = ImageUtil.to_array(ImageUtil.load_image(image_path))
+        config = RuntimeConfig(config.with_size(width=array.shape[3], height=array.shape[2]), self.model_config)
+        image_latents = Flux1._pack_latents(self._encode_array(array, config))
+
+        # Skip the first part of the schedule and start from the correspondingly noised image
+        start_step = config.num_inference_steps - max(1, int(config.num_inference_steps * strength))
+        sigma = config.sigmas[start_step]
+        noise = Flux1._create_latents(seed, config)
+        latents = sigma * noise + (1 - sigma) * image_latents.astype(noise.dtype)
+
+        prompt_embeds, pooled_prompt_embeds = self._embed_prompts([prompt], config)
+
+        step = None
+        for step in self._denoise_steps(latents, prompt_embeds, pooled_prompt_embeds, config, start_step):
+            pass
+        return step.images[0]
+
+    def _embed_prompts(self, prompts: list[str], config: RuntimeConfig) -> (mx.array, mx.array):
+        prompt_embeds, pooled_prompt_embeds = self.encode_prompts(prompts, config)
+        mx.eval(prompt_embeds, pooled_prompt_embeds)
+        self._end_phase(WeightHandler.T5_ENCODER, WeightHandler.CLIP_ENCODER)
+        return prompt_embeds, pooled_prompt_embeds
+
+    def _denoise_steps(
+            self,
+            latents: mx.array,
+            prompt_embeds: mx.array,
+            pooled_prompt_embeds: mx.array,
+            config: RuntimeConfig,
+            start_step: int = 0,
+            preview: bool = False,
+            cancel_event: threading.Event | None = None,
+    ) -> Iterator[DenoiseStep]:
+        start_time = time.perf_counter()
+        try:
+            latents = yield from self.denoise(latents, prompt_embeds, pooled_prompt_embeds, config, start_step, preview, cancel_event)
+        except GeneratorExit:
+            # The consumer stopped early and closed the generator
+            self._end_phase(WeightHandler.TRANSFORMER)
+            raise
+        if latents is None:
+            return
+
+        # Decode the latent array
+        images = self._latents_to_images(latents, config)
+        yield DenoiseStep(
+            step=config.num_inference_steps,
+            num_inference_steps=config.num_inference_steps,
+            latents=latents,
+            step_time=0.0,
+            elapsed_time=time.perf_counter() - start_time,
+            images=images,
         )
 
-        # Embedd the prompt
-        t5_tokens = self.t5_tokenizer.tokenize(prompt)
-        clip_tokens = self.clip_tokenizer.tokenize(prompt)
-        prompt_embeds = self.t5_text_encoder.forward(t5_tokens)
-        pooled_prompt_embeds = self.clip_text_encoder.forward(clip_tokens)
-
-        for t in tqdm(range(config.num_inference_steps)):
-            # Predict the noise
-            noise = self.transformer.predict(
-                t=t,
-                prompt_embeds=prompt_embeds,
-                pooled_prompt_embeds=pooled_prompt_embeds,
-                hidden_states=latents,
-                config=config,
-            )
+    def denoise(
+            self,
+            latents: mx.array,
+            prompt_embeds: mx.array,
+            pooled_prompt_embeds: mx.array,
+            config: RuntimeConfig,
+            start_step: int = 0,
+            preview: bool = False,
+            cancel_event: threading.Event | None = None,
+    ) -> Generator[DenoiseStep, None, mx.array | None]:
+        # Yields every step and returns the denoised latents, or None when cancelled
+        block_cache = BlockCache.from_config(config)
+        sampler = Samplers.from_name(config.sampler)
+        start_time = time.perf_counter()
+
+        # The conditioning of every step is known up front, so it can be computed in a single pass
+        modulations = None
+        if config.precomputed_modulations:
+            modulations = self.transformer.precompute_modulations(pooled_prompt_embeds, config)
+            mx.eval(modulations)
+
+        for t in tqdm(range(start_step, config.num_inference_steps)):
+            # Stop between steps if the caller is no longer interested in the result
+            if cancel_event is not None and cancel_event.is_set():
+                self._end_phase(WeightHandler.TRANSFORMER)
+                return None
+
+            step_start_time = time.perf_counter()
+
+            # The attention backend is only set around the model calls, a step can resume on another thread
+            with self._attention_backend(config):
+                # Predict the noise
+                noise = self.transformer.predict(
+                    t=t,
+                    prompt_embeds=prompt_embeds,
+                    pooled_prompt_embeds=pooled_prompt_embeds,
+                    hidden_states=latents,
+                    config=config,
+                    block_cache=block_cache,
+                    modulations=modulations,
+                    compiled=config.compiled,
+                )
+
+                # The fully denoised latents as currently predicted, mapped straight to a low resolution image
+                preview_latents = None
+                preview_images = None
+                if preview:
+                    preview_latents = Flux1._unpack_latents(latents - config.sigmas[t] * noise, config.height, config.width)
+                    preview_images = self.latent_previewer.decode(preview_latents)
 
-            # Take one denoise step
-            dt = config.sigmas[t + 1] - config.sigmas[t]
-            latents += noise * dt
+                # Take one denoise step, higher order samplers evaluate the transformer again (never from the block cache)
+                latents = sampler.step(
+                    t=t,
+                    latents=latents,
+                    noise=noise,
+                    sigmas=config.sigma_values,
+                    predict=lambda step, step_latents: self.transformer.predict(
+                        t=step,
+                        prompt_embeds=prompt_embeds,
+                        pooled_prompt_embeds=pooled_prompt_embeds,
+                        hidden_states=step_latents,
+                        config=config,
+                        modulations=modulations,
+                        compiled=config.compiled,
+                    ),
+                )
 
             # To enable progress tracking
             mx.eval(latents)
+            if preview:
+                mx.eval(preview_latents, preview_images)
+                preview_images = ImageUtil.to_images(preview_images)
 
-        # Decode the latent array
+            now = time.perf_counter()
+            yield DenoiseStep(
+                step=t,
+                num_inference_steps=config.num_inference_steps,
+                latents=latents,
+                step_time=now - step_start_time,
+                elapsed_time=now - start_time,
+                preview_latents=preview_latents,
+                preview_images=preview_images,
+                reused_activations=block_cache is not None and t in block_cache.reused_steps,
+            )
+
+        self._end_phase(WeightHandler.TRANSFORMER)
+        return latents
+
+    def _latents_to_images(self, latents: mx.array, config: RuntimeConfig) -> list[PIL.Image.Image]:
+        images = ImageUtil.to_images(self.decode_latents(latents, config))
+        self._end_phase(WeightHandler.VAE)
+        return images
+
+    def decode_latents(self, latents: mx.array, config: RuntimeConfig) -> mx.array:
+        # The packed latents of denoise, decoded to images in [-1, 1]. Unlike the generate methods, the stages
+        # (encode_prompts, denoise except for the transformer, decode_latents) leave the offloading to the caller
         latents = Flux1._unpack_latents(latents, config.height, config.width)
-        decoded = self.vae.decode(latents)
-        return ImageUtil.to_image(decoded)
+        return self._decode_latents(latents, config)
+
+    @staticmethod
+    def create_latents(seeds: list[int], config: RuntimeConfig) -> mx.array:
+        # One per seed so that each image matches its single image counterpart
+        return mx.concatenate([Flux1._create_latents(seed, config) for seed in seeds], axis=0)
+
+    @staticmethod
+    def _create_latents(seed: int, config: RuntimeConfig) -> mx.array:
+        return mx.random.normal(
+            shape=[1, (config.height // 16) * (config.width // 16), 64],
+            key=mx.random.key(seed)
+        )
+
+    def encode_prompts(self, prompts: list[str], config: RuntimeConfig) -> (mx.array, mx.array):
+        # Without an attention mask in T5, the embeddings depend on the padded length, so all prompts of a batch share one
+        sequence_length = self.model_config.max_sequence_length
+        if config.trim_t5_padding:
+            sequence_length = self.t5_tokenizer.bucket_length(prompts)
+
+        keys = [self._prompt_cache_key(prompt, sequence_length) for prompt in prompts]
+        embeddings = {key: self.prompt_cache.get(key) for key in set(keys)}
+
+        # Only run the text encoders on the prompts that are not already cached
+        missing = list(dict.fromkeys(prompt for prompt, key in zip(prompts, keys) if embeddings[key] is None))
+        if missing:
+            t5_tokens, _ = self.t5_tokenizer.tokenize(missing, sequence_length)
+            clip_tokens, _ = self.clip_tokenizer.tokenize(missing)
+            with self._attention_backend(config):
+                prompt_embeds = self.t5_text_encoder.forward(t5_tokens)
+                pooled_prompt_embeds = self.clip_text_encoder.forward(clip_tokens)
+            for i, prompt in enumerate(missing):
+                key = self._prompt_cache_key(prompt, sequence_length)
+                embeddings[key] = (prompt_embeds[i:i + 1], pooled_prompt_embeds[i:i + 1])
+                self.prompt_cache.put(key, *embeddings[key])
+
+        prompt_embeds = mx.concatenate([embeddings[key][0] for key in keys], axis=0)
+        pooled_prompt_embeds = mx.concatenate([embeddings[key][1] for key in keys], axis=0)
+        return prompt_embeds, pooled_prompt_embeds
+
+    def _prompt_cache_key(self, prompt: str, sequence_length: int) -> str:
+        # Quantized T5 weights give slightly different embeddings, so they are cached separately
+        model_alias = self.model_config.alias if self.quantize is None else f"{self.model_config.alias}-q{self.quantize}"
+        return PromptCache.key(
+            model_alias=model_alias,
+            max_sequence_length=sequence_length,
+            prompt=prompt,
+        )
+
+    @staticmethod
+    def _attention_backend(config: Config | RuntimeConfig):
+        return AttentionBackend.use(config.attention_backend, config.attention_chunk_size)
 
     @staticmethod
     def _unpack_latents(latents: mx.array, height: int, width: int) -> mx.array:
-        latents = mx.reshape(latents, (1, width // 16, height // 16, 16, 2, 2))
+        batch_size = latents.shape[0]
+        latents = mx.reshape(latents, (batch_size, width // 16, height // 16, 16, 2, 2))
         latents = mx.transpose(latents, (0, 3, 1, 4, 2, 5))
-        latents = mx.reshape(latents, (1, 16, width // 16 * 2, height // 16 * 2))
+        latents = mx.reshape(latents, (batch_size, 16, width // 16 * 2, height // 16 * 2))
+        return latents
+
+    @staticmethod
+    def _pack_latents(latents: mx.array) -> mx.array:
+        batch_size, channels, rows, cols = latents.shape
+        latents = mx.reshape(latents, (batch_size, channels, rows // 2, 2, cols // 2, 2))
+        latents = mx.transpose(latents, (0, 2, 4, 1, 3, 5))
+        latents = mx.reshape(latents, (batch_size, (rows // 2) * (cols // 2), channels * 4))
         return latents
 
-    def encode(self, path: str) -> mx.array:
-        array = ImageUtil.to_array(Image.open(path))
-        return self.vae.encode(array)
+    def _decode_latents(self, latents: mx.array, config: Config | RuntimeConfig) -> mx.array:
+        with self._attention_backend(config):
+            if config.vae_tiling:
+                return VAETiler.decode(
+                    lambda tile: self.vae.decode(tile, compiled=config.compiled), latents, config.vae_tile_size, config.vae_tile_overlap
+                )
+            return self.vae.decode(latents, compiled=config.compiled)
+
+    def encode(self, path: str, config: Config = Config()) -> mx.array:
+        array = ImageUtil.to_array(ImageUtil.load_image(path))
+        return self._encode_array(array, config)
+
+    def _encode_array(self, array: mx.array, config: Config | RuntimeConfig) -> mx.array:
+        with self._attention_backend(config):
+            if config.vae_tiling:
+                moments = VAETiler.encode(self.vae.encoder.encode, array, config.vae_tile_size, config.vae_tile_overlap)
+            else:
+                moments = self.vae.encoder.encode(array)
+        encoded = self.vae.latents_from_moments(moments)
+        mx.eval(encoded)
+        self._end_phase(WeightHandler.VAE)
+        return encoded
 
-    def decode(self, code: mx.array) -> PIL.Image.Image:
-        decoded = self.vae.decode(code)
-        return ImageUtil.to_image(decoded)
+    def decode(self, code: mx.array, config: Config = Config()) -> PIL.Image.Image:
+        decoded = self._decode_latents(code, config)
+        image = ImageUtil.to_image(decoded)
+        self._end_phase(WeightHandler.VAE)
+        return image
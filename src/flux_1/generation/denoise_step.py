@@ -0,0 +1,31 @@
+import PIL.Image
+import mlx.core as mx
+
+
+class DenoiseStep:
+
+    def __init__(
+            self,
+            step: int,
+            num_inference_steps: int,
+            latents: mx.array,
+            step_time: float,
+            elapsed_time: float,
+            preview_latents: mx.array | None = None,
+            preview_images: list[PIL.Image.Image] | None = None,
+            images: list[PIL.Image.Image] | None = None,
+            reused_activations: bool = False,
+    ):
+        self.step = step
+        self.num_inference_steps = num_inference_steps
+        self.latents = latents
+        self.step_time = step_time
+        self.elapsed_time = elapsed_time
+        self.preview_latents = preview_latents
+        self.preview_images = preview_images
+        self.images = images
+        self.reused_activations = reused_activations
+
+    @property
+    def is_final(self) -> bool:
+        return self.images is not None
@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import time
+from typing import Iterable
+
+import mlx.core as mx
+
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.flux import Flux1
+from flux_1.generation.pipeline_job import PipelineJob
+from flux_1.post_processing.image_util import ImageUtil
+from flux_1.post_processing.image_writer import ImageWriter
+
+log = logging.getLogger(__name__)
+
+
+class PipelineExecutor:
+    # Marks the end of the jobs in the queue of tokenized jobs
+    _DONE = object()
+
+    def __init__(self, flux: Flux1, queue_size: int = 2, num_writers: int = 2):
+        if queue_size < 1 or num_writers < 1:
+            raise ValueError("The queue size and the number of writers must be at least 1")
+        self.flux = flux
+        self.queue_size = queue_size
+        self.num_writers = num_writers
+
+    def run(self, jobs: Iterable[PipelineJob]) -> dict:
+        # All MLX work (encoding, denoising and decoding) runs on this thread, one job after the other: MLX arrays and
+        # streams belong to the thread that created them, and evaluating from several threads at once is not something
+        # MLX guarantees. Only host work overlaps with it, the prompts of the next jobs are tokenized on a thread of their
+        # own, and the conversion to PNG and the writing happen in a pool of writer threads
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._stage_times = {"tokenize": 0.0, "encode": 0.0, "denoise": 0.0, "decode": 0.0}
+        self._num_jobs = 0
+        tokenized = queue.Queue(maxsize=self.queue_size)
+
+        start_time = time.perf_counter()
+        # The writer bounds the decoded images waiting to be written, so that a slow disk slows down generation instead of using up memory
+        with ImageWriter(num_workers=self.num_writers, max_pending=self.queue_size + self.num_writers) as writer:
+            tokenizer = threading.Thread(target=self._tokenize_stage, args=(jobs, tokenized), name="pipeline-tokenize")
+            tokenizer.start()
+            try:
+                self._generate_stage(tokenized, writer)
+            finally:
+                tokenizer.join()
+        wall_time = time.perf_counter() - start_time
+
+        if self._errors:
+            raise self._errors[0]
+        write_stats = writer.stats()
+        return {
+            "jobs": self._num_jobs,
+            "images": write_stats["images"],
+            "wall_time": wall_time,
+            "images_per_second": write_stats["images"] / wall_time if wall_time > 0 else None,
+            "stage_times": dict(self._stage_times, write=write_stats["write_time"]),
+        }
+
+    def _tokenize_stage(self, jobs: Iterable[PipelineJob], tokenized: queue.Queue) -> None:
+        # Plain host work, the token ids stay in the LRU caches of the tokenizers, where encode_prompts finds them
+        try:
+            for job in jobs:
+                if self._stop.is_set():
+                    break
+                start_time = time.perf_counter()
+                self.flux.t5_tokenizer.token_ids(job.prompts)
+                self.flux.clip_tokenizer.token_ids(job.prompts)
+                self._add_time("tokenize", time.perf_counter() - start_time)
+                self._put(tokenized, job)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(tokenized, PipelineExecutor._DONE)
+
+    def _generate_stage(self, tokenized: queue.Queue, writer: ImageWriter) -> None:
+        try:
+            while True:
+                job = tokenized.get()
+                if job is PipelineExecutor._DONE:
+                    break
+                if self._stop.is_set():
+                    continue
+
+                start_time = time.perf_counter()
+                config = RuntimeConfig(job.config, self.flux.model_config)
+                latents = Flux1.create_latents(job.seeds, config)
+                prompt_embeds, pooled_prompt_embeds = self.flux.encode_prompts(job.prompts, config)
+                mx.eval(latents, prompt_embeds, pooled_prompt_embeds)
+                self._add_time("encode", time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                for step in self.flux.denoise(latents, prompt_embeds, pooled_prompt_embeds, config):
+                    latents = step.latents
+                self._add_time("denoise", time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                images = ImageUtil.to_numpy_images(self.flux.decode_latents(latents, config))
+                self._add_time("decode", time.perf_counter() - start_time)
+
+                # Only numpy arrays are handed to the writer threads
+                for image, path in zip(images, job.output_paths):
+                    writer.submit(image, path)
+                self._num_jobs += 1
+        except Exception as e:
+            self._fail(e)
+            # Keep taking the tokenized jobs, so that the tokenizer is not blocked on a full queue
+            while tokenized.get() is not PipelineExecutor._DONE:
+                pass
+
+    def _put(self, stage_queue: queue.Queue, item) -> None:
+        # The end marker always gets through, the jobs are dropped once the pipeline is stopping
+        while True:
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set() and item is not PipelineExecutor._DONE:
+                    return
+
+    def _add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stage_times[stage] += seconds
+
+    def _fail(self, error: Exception) -> None:
+        log.error(f"Pipeline stage failed: {error}")
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
@@ -0,0 +1,14 @@
+from flux_1.config.config import Config
+
+
+class PipelineJob:
+
+    def __init__(self, seeds: list[int], prompts: list[str], config: Config, output_paths: list[str]):
+        if len(prompts) == 1 and len(seeds) > 1:
+            prompts = prompts * len(seeds)
+        if not len(seeds) == len(prompts) == len(output_paths):
+            raise ValueError(f"Got {len(seeds)} seeds, {len(prompts)} prompts and {len(output_paths)} output paths")
+        self.seeds = seeds
+        self.prompts = prompts
+        self.config = config
+        self.output_paths = output_paths
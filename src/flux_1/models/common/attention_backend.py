@@ -0,0 +1,93 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import mlx.core as mx
+
+
+class AttentionBackend:
+    FUSED = "fused"
+    CHUNKED = "chunked"
+    NAIVE = "naive"
+    BACKENDS = (FUSED, CHUNKED, NAIVE)
+    DEFAULT_CHUNK_SIZE = 1024
+
+    # The backend of the generation running on each thread, see use()
+    _local = threading.local()
+
+    @staticmethod
+    @contextmanager
+    def use(backend: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[None]:
+        # The attention layers are called deep inside the models, so the backend of a generation is set around its model
+        # calls instead of being passed down. It only applies to the calling thread, other generations keep their own
+        if backend not in AttentionBackend.BACKENDS:
+            raise ValueError(f"'{backend}' is not a valid attention backend")
+        previous = AttentionBackend.current()
+        AttentionBackend._local.settings = (backend, chunk_size)
+        try:
+            yield
+        finally:
+            AttentionBackend._local.settings = previous
+
+    @staticmethod
+    def current() -> tuple[str, int]:
+        return getattr(AttentionBackend._local, "settings", (AttentionBackend.FUSED, AttentionBackend.DEFAULT_CHUNK_SIZE))
+
+    @staticmethod
+    def attention(
+            query: mx.array,
+            key: mx.array,
+            value: mx.array,
+            scale: float | None = None,
+            mask: mx.array | None = None,
+            backend: str | None = None,
+    ) -> mx.array:
+        scale = query.shape[-1] ** -0.5 if scale is None else scale
+        current_backend, chunk_size = AttentionBackend.current()
+        backend = current_backend if backend is None else backend
+        if backend == AttentionBackend.FUSED:
+            return AttentionBackend.fused_attention(query, key, value, scale, mask)
+        if backend == AttentionBackend.CHUNKED:
+            return AttentionBackend.chunked_attention(query, key, value, scale, mask, chunk_size)
+        if backend == AttentionBackend.NAIVE:
+            return AttentionBackend.naive_attention(query, key, value, scale, mask)
+        raise ValueError(f"'{backend}' is not a valid attention backend")
+
+    @staticmethod
+    def fused_attention(query: mx.array, key: mx.array, value: mx.array, scale: float, mask: mx.array | None) -> mx.array:
+        key = key.astype(query.dtype)
+        value = value.astype(query.dtype)
+        if mask is not None:
+            mask = mask.astype(query.dtype)
+        return mx.fast.scaled_dot_product_attention(query, key, value, scale=scale, mask=mask)
+
+    @staticmethod
+    def chunked_attention(
+            query: mx.array,
+            key: mx.array,
+            value: mx.array,
+            scale: float,
+            mask: mx.array | None,
+            chunk_size: int,
+    ) -> mx.array:
+        query_length = query.shape[-2]
+        if query_length <= chunk_size:
+            return AttentionBackend.naive_attention(query, key, value, scale, mask)
+
+        # Only a (chunk_size x key_length) block of scores is alive at any time
+        chunks = []
+        for start in range(0, query_length, chunk_size):
+            end = min(start + chunk_size, query_length)
+            chunk_mask = mask
+            if mask is not None and mask.shape[-2] != 1:
+                chunk_mask = mask[..., start:end, :]
+            chunks.append(AttentionBackend.naive_attention(query[..., start:end, :], key, value, scale, chunk_mask))
+        return mx.concatenate(chunks, axis=-2)
+
+    @staticmethod
+    def naive_attention(query: mx.array, key: mx.array, value: mx.array, scale: float, mask: mx.array | None) -> mx.array:
+        scores = (query * scale) @ mx.swapaxes(key, -1, -2)
+        if mask is not None:
+            scores = scores + mask
+        attn = mx.softmax(scores, axis=-1)
+        return attn @ value
@@ -6,9 +6,11 @@ from flux_1.models.text_encoder.clip_encoder.clip_text_model import CLIPTextMode
 
 class CLIPEncoder(nn.Module):
 
-    def __init__(self, weights: dict):
+    def __init__(self, weights: dict, num_encoder_layers: int = 12):
         super().__init__()
-        self.text_model = CLIPTextModel(dims=768, num_encoder_layers=12)
+        layers = weights.get("text_model", {}).get("encoder", {}).get("layers", [{}])
+        fused_projections = "qkv_proj" in layers[0].get("self_attn", {})
+        self.text_model = CLIPTextModel(dims=768, num_encoder_layers=num_encoder_layers, fused_projections=fused_projections)
 
         # Load the weights after all components are initialized
         self.update(weights)
@@ -7,9 +7,9 @@ from flux_1.models.text_encoder.clip_encoder.clip_sdpa_attention import CLIPSdpa
 
 class CLIPEncoderLayer(nn.Module):
 
-    def __init__(self, layer: int):
+    def __init__(self, layer: int, fused_projections: bool = False):
         super().__init__()
-        self.self_attn = CLIPSdpaAttention()
+        self.self_attn = CLIPSdpaAttention(fused_projections=fused_projections)
         self.layer_norm1 = nn.LayerNorm(dims=768)
         self.mlp = CLIPMLP()
         self.layer_norm2 = nn.LayerNorm(dims=768)
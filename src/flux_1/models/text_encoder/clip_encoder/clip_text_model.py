@@ -7,9 +7,9 @@ from flux_1.models.text_encoder.clip_encoder.encoder_clip import EncoderCLIP
 
 class CLIPTextModel(nn.Module):
 
-    def __init__(self, dims: int, num_encoder_layers: int):
+    def __init__(self, dims: int, num_encoder_layers: int, fused_projections: bool = False):
         super().__init__()
-        self.encoder = EncoderCLIP(num_encoder_layers)
+        self.encoder = EncoderCLIP(num_encoder_layers, fused_projections)
         self.embeddings = CLIPEmbeddings(dims)
         self.final_layer_norm = nn.LayerNorm(dims=768)
 
@@ -18,7 +18,7 @@ class CLIPTextModel(nn.Module):
         causal_attention_mask = CLIPTextModel.create_causal_attention_mask(hidden_states.shape)
         encoder_outputs = self.encoder.forward(hidden_states, causal_attention_mask)
         last_hidden_state = self.final_layer_norm(encoder_outputs)
-        pooled_output = last_hidden_state[0, mx.argmax(tokens, axis=-1)]
+        pooled_output = last_hidden_state[mx.arange(tokens.shape[0]), mx.argmax(tokens, axis=-1)]
         return pooled_output
 
     @staticmethod
@@ -6,9 +6,9 @@ from flux_1.models.text_encoder.clip_encoder.clip_encoder_layer import CLIPEncod
 
 class EncoderCLIP(nn.Module):
 
-    def __init__(self, num_encoder_layers: int):
+    def __init__(self, num_encoder_layers: int, fused_projections: bool = False):
         super().__init__()
-        self.layers = [CLIPEncoderLayer(i) for i in range(num_encoder_layers)]
+        self.layers = [CLIPEncoderLayer(i, fused_projections) for i in range(num_encoder_layers)]
 
     def forward(self, tokens: mx.array, causal_attention_mask: mx.array) -> mx.array:
         hidden_states = tokens
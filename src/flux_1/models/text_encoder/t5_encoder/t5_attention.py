@@ -7,9 +7,9 @@ from flux_1.models.text_encoder.t5_encoder.t5_self_attention import T5SelfAttent
 
 class T5Attention(nn.Module):
 
-    def __init__(self):
+    def __init__(self, fused_projections: bool = False):
         super().__init__()
-        self.SelfAttention = T5SelfAttention()
+        self.SelfAttention = T5SelfAttention(fused_projections=fused_projections)
         self.layer_norm = T5LayerNorm()
 
     def forward(self, hidden_states: mx.array) -> mx.array:
@@ -7,9 +7,9 @@ from flux_1.models.text_encoder.t5_encoder.t5_feed_forward import T5FeedForward
 
 class T5Block(nn.Module):
 
-    def __init__(self, layer: int):
+    def __init__(self, layer: int, fused_projections: bool = False):
         super().__init__()
-        self.attention = T5Attention()
+        self.attention = T5Attention(fused_projections=fused_projections)
         self.ff = T5FeedForward()
 
     def forward(self, hidden_states: mx.array) -> mx.array:
@@ -3,16 +3,28 @@ from mlx import nn
 
 from flux_1.models.text_encoder.t5_encoder.t5_block import T5Block
 from flux_1.models.text_encoder.t5_encoder.t5_layer_norm import T5LayerNorm
+from flux_1.weights.quantization_util import QuantizationUtil
 
 
 class T5Encoder(nn.Module):
 
-    def __init__(self, weights: dict):
+    def __init__(
+            self,
+            weights: dict,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            num_blocks: int = 24,
+    ):
         super().__init__()
         self.shared = nn.Embedding(num_embeddings=32128, dims=4096)
-        self.t5_blocks = [T5Block(i) for i in range(24)]
+        fused_projections = "qkv" in weights.get("t5_blocks", [{}])[0].get("attention", {}).get("SelfAttention", {})
+        self.t5_blocks = [T5Block(i, fused_projections) for i in range(num_blocks)]
         self.final_layer_norm = T5LayerNorm()
 
+        # Already quantized weights can only be loaded into a quantized model
+        if quantize is not None:
+            QuantizationUtil.quantize(self, bits=quantize, group_size=quantize_group_size)
+
         # Load the weights after all components are initialized
         self.update(weights)
 
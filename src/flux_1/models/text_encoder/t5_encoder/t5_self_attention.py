@@ -3,37 +3,44 @@ import math
 import mlx.core as mx
 from mlx import nn
 
+from flux_1.models.common.attention_backend import AttentionBackend
+
 
 class T5SelfAttention(nn.Module):
 
-    def __init__(self):
+    def __init__(self, fused_projections: bool = False):
         super().__init__()
-        self.q = nn.Linear(4096, 4096, bias=False)
-        self.k = nn.Linear(4096, 4096, bias=False)
-        self.v = nn.Linear(4096, 4096, bias=False)
+        self.fused_projections = fused_projections
+        if self.fused_projections:
+            self.qkv = nn.Linear(4096, 3 * 4096, bias=False)
+        else:
+            self.q = nn.Linear(4096, 4096, bias=False)
+            self.k = nn.Linear(4096, 4096, bias=False)
+            self.v = nn.Linear(4096, 4096, bias=False)
         self.relative_attention_bias = nn.Embedding(32, 64)
         self.o = nn.Linear(4096, 4096, bias=False)
 
     def forward(self, hidden_states: mx.array) -> mx.array:
-        query_states = T5SelfAttention.shape(self.q(hidden_states))
-        key_states = T5SelfAttention.shape(self.k(hidden_states))
-        value_states = T5SelfAttention.shape(self.v(hidden_states))
-        scores = mx.matmul(query_states, mx.transpose(key_states, (0, 1, 3, 2)))
+        if self.fused_projections:
+            query_states, key_states, value_states = map(T5SelfAttention.shape, mx.split(self.qkv(hidden_states), 3, axis=-1))
+        else:
+            query_states = T5SelfAttention.shape(self.q(hidden_states))
+            key_states = T5SelfAttention.shape(self.k(hidden_states))
+            value_states = T5SelfAttention.shape(self.v(hidden_states))
         seq_length = hidden_states.shape[1]
         position_bias = self._compute_bias(seq_length=seq_length)
-        scores += position_bias
-        attn_weights = nn.softmax(scores, axis=-1)
-        attn_output = T5SelfAttention.un_shape(mx.matmul(attn_weights, value_states))
+        attn_output = AttentionBackend.attention(query_states, key_states, value_states, scale=1.0, mask=position_bias)
+        attn_output = T5SelfAttention.un_shape(attn_output)
         attn_output = self.o(attn_output)
         return attn_output
 
     @staticmethod
     def shape(states):
-        return mx.transpose(mx.reshape(states, (1, -1, 64, 64)), (0, 2, 1, 3))
+        return mx.transpose(mx.reshape(states, (states.shape[0], -1, 64, 64)), (0, 2, 1, 3))
 
     @staticmethod
     def un_shape(states):
-        return mx.reshape(mx.transpose(states, (0, 2, 1, 3)), (1, -1, 4096))
+        return mx.reshape(mx.transpose(states, (0, 2, 1, 3)), (states.shape[0], -1, 4096))
 
     def _compute_bias(self, seq_length):
         context_position = mx.arange(start=0, stop=seq_length, step=1)[:, None]
@@ -13,10 +13,15 @@ class AdaLayerNormContinuous(nn.Module):
         self.norm = nn.LayerNorm(dims=embedding_dim, eps=1e-6, affine=False)
 
     def forward(self, x: mx.array, text_embeddings: mx.array) -> mx.array:
-        text_embeddings = self.linear(nn.silu(text_embeddings).astype(Config.precision))
+        return self.modulate(x, self.modulation(text_embeddings))
+
+    def modulation(self, text_embeddings: mx.array) -> mx.array:
+        return self.linear(nn.silu(text_embeddings).astype(Config.precision))
+
+    def modulate(self, x: mx.array, modulation: mx.array) -> mx.array:
         chunk_size = self.embedding_dim
-        scale = text_embeddings[:, 0*chunk_size:1*chunk_size]
-        shift = text_embeddings[:, 1*chunk_size:2*chunk_size]
+        scale = modulation[:, 0*chunk_size:1*chunk_size]
+        shift = modulation[:, 1*chunk_size:2*chunk_size]
         x = self.norm(x) * (1 + scale)[:, None, :] + shift[:, None, :]
         return x
 
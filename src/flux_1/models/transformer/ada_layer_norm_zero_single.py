@@ -10,10 +10,15 @@ class AdaLayerNormZeroSingle(nn.Module):
         self.norm = nn.LayerNorm(dims=3072, eps=1e-6, affine=False)
 
     def forward(self, x: mx.array, text_embeddings: mx.array):
-        text_embeddings = self.linear(nn.silu(text_embeddings))
+        return self.modulate(x, self.modulation(text_embeddings))
+
+    def modulation(self, text_embeddings: mx.array) -> mx.array:
+        return self.linear(nn.silu(text_embeddings))
+
+    def modulate(self, x: mx.array, modulation: mx.array):
         chunk_size = 9216 // 3
-        shift_msa = text_embeddings[:, 0*chunk_size:1*chunk_size]
-        scale_msa = text_embeddings[:, 1*chunk_size:2*chunk_size]
-        gate_msa = text_embeddings[:, 2*chunk_size:3*chunk_size]
+        shift_msa = modulation[:, 0*chunk_size:1*chunk_size]
+        scale_msa = modulation[:, 1*chunk_size:2*chunk_size]
+        gate_msa = modulation[:, 2*chunk_size:3*chunk_size]
         x = self.norm(x) * (1 + scale_msa[:, None]) + shift_msa[:, None]
         return x, gate_msa
@@ -1,21 +1,27 @@
 import mlx.core as mx
 from mlx import nn
 
+from flux_1.models.common.attention_backend import AttentionBackend
+
 
 class JointAttention(nn.Module):
     head_dimension = 128
-    batch_size = 1
     num_heads = 24
 
-    def __init__(self):
+    def __init__(self, fused_projections: bool = False):
         super().__init__()
-        self.to_q = nn.Linear(3072, 3072)
-        self.to_k = nn.Linear(3072, 3072)
-        self.to_v = nn.Linear(3072, 3072)
+        self.fused_projections = fused_projections
+        if self.fused_projections:
+            self.to_qkv = nn.Linear(3072, 3 * 3072)
+            self.add_qkv_proj = nn.Linear(3072, 3 * 3072)
+        else:
+            self.to_q = nn.Linear(3072, 3072)
+            self.to_k = nn.Linear(3072, 3072)
+            self.to_v = nn.Linear(3072, 3072)
+            self.add_q_proj = nn.Linear(3072, 3072)
+            self.add_k_proj = nn.Linear(3072, 3072)
+            self.add_v_proj = nn.Linear(3072, 3072)
         self.to_out = [nn.Linear(3072, 3072)]
-        self.add_q_proj = nn.Linear(3072, 3072)
-        self.add_k_proj = nn.Linear(3072, 3072)
-        self.add_v_proj = nn.Linear(3072, 3072)
         self.to_add_out = nn.Linear(3072, 3072)
         self.norm_q = nn.RMSNorm(128)
         self.norm_k = nn.RMSNorm(128)
@@ -28,26 +34,34 @@ class JointAttention(nn.Module):
             encoder_hidden_states: mx.array,
             image_rotary_emb: mx.array
     ) -> (mx.array, mx.array):
-        residual = hidden_states
+        batch_size = hidden_states.shape[0]
 
-        query = self.to_q(hidden_states)
-        key = self.to_k(hidden_states)
-        value = self.to_v(hidden_states)
+        if self.fused_projections:
+            query, key, value = mx.split(self.to_qkv(hidden_states), 3, axis=-1)
+        else:
+            query = self.to_q(hidden_states)
+            key = self.to_k(hidden_states)
+            value = self.to_v(hidden_states)
 
-        query = mx.transpose(mx.reshape(query, (1, -1, 24, 128)), (0, 2, 1, 3))
-        key = mx.transpose(mx.reshape(key, (1, -1, 24, 128)), (0, 2, 1, 3))
-        value = mx.transpose(mx.reshape(value, (1, -1, 24, 128)), (0, 2, 1, 3))
+        query = mx.transpose(mx.reshape(query, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        key = mx.transpose(mx.reshape(key, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        value = mx.transpose(mx.reshape(value, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
 
         query = self.norm_q(query)
         key = self.norm_k(key)
 
-        encoder_hidden_states_query_proj = self.add_q_proj(encoder_hidden_states)
-        encoder_hidden_states_key_proj = self.add_k_proj(encoder_hidden_states)
-        encoder_hidden_states_value_proj = self.add_v_proj(encoder_hidden_states)
+        if self.fused_projections:
+            encoder_hidden_states_query_proj, encoder_hidden_states_key_proj, encoder_hidden_states_value_proj = mx.split(
+                self.add_qkv_proj(encoder_hidden_states), 3, axis=-1
+            )
+        else:
+            encoder_hidden_states_query_proj = self.add_q_proj(encoder_hidden_states)
+            encoder_hidden_states_key_proj = self.add_k_proj(encoder_hidden_states)
+            encoder_hidden_states_value_proj = self.add_v_proj(encoder_hidden_states)
 
-        encoder_hidden_states_query_proj = mx.transpose(mx.reshape(encoder_hidden_states_query_proj, (1, -1, 24, 128)), (0, 2, 1, 3))
-        encoder_hidden_states_key_proj = mx.transpose(mx.reshape(encoder_hidden_states_key_proj, (1, -1, 24, 128)), (0, 2, 1, 3))
-        encoder_hidden_states_value_proj = mx.transpose(mx.reshape(encoder_hidden_states_value_proj, (1, -1, 24, 128)),   (0, 2, 1, 3))
+        encoder_hidden_states_query_proj = mx.transpose(mx.reshape(encoder_hidden_states_query_proj, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        encoder_hidden_states_key_proj = mx.transpose(mx.reshape(encoder_hidden_states_key_proj, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        encoder_hidden_states_value_proj = mx.transpose(mx.reshape(encoder_hidden_states_value_proj, (batch_size, -1, 24, 128)),   (0, 2, 1, 3))
 
         encoder_hidden_states_query_proj = self.norm_added_q(encoder_hidden_states_query_proj)
         encoder_hidden_states_key_proj = self.norm_added_k(encoder_hidden_states_key_proj)
@@ -60,7 +74,7 @@ class JointAttention(nn.Module):
 
         hidden_states = JointAttention.attention(query, key, value)
         hidden_states = mx.transpose(hidden_states, (0, 2, 1, 3))
-        hidden_states = mx.reshape(hidden_states, (self.batch_size, -1, self.num_heads * self.head_dimension))
+        hidden_states = mx.reshape(hidden_states, (batch_size, -1, self.num_heads * self.head_dimension))
         encoder_hidden_states, hidden_states = (
             hidden_states[:, : encoder_hidden_states.shape[1]],
             hidden_states[:, encoder_hidden_states.shape[1]:],
@@ -73,11 +87,7 @@ class JointAttention(nn.Module):
 
     @staticmethod
     def attention(query, key, value):
-        scale = 1 / mx.sqrt(query.shape[-1])
-        scores = (query * scale) @ key.transpose(0, 1, 3, 2)
-        attn = mx.softmax(scores, axis=-1)
-        hidden_states = (attn @ value)
-        return hidden_states
+        return AttentionBackend.attention(query, key, value)
 
     @staticmethod
     def apply_rope(xq: mx.array, xk: mx.array, freqs_cis: mx.array):
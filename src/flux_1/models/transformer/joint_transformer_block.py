@@ -8,29 +8,32 @@ from flux_1.models.transformer.joint_attention import JointAttention
 
 class JointTransformerBlock(nn.Module):
 
-    def __init__(self, layer):
+    def __init__(self, layer, fused_projections: bool = False):
         super().__init__()
         self.layer = layer
         self.norm1 = AdaLayerNormZero()
         self.norm2 = nn.LayerNorm(dims=3072, eps=1e-6, affine=False)
         self.ff = FeedForward(activation_function=nn.gelu)
-        self.attn = JointAttention()
+        self.attn = JointAttention(fused_projections=fused_projections)
         self.norm1_context = AdaLayerNormZero()
         self.ff_context = FeedForward(activation_function=nn.gelu_approx)
         self.norm2_context = nn.LayerNorm(dims=1536, eps=1e-6, affine=False)
 
+    def modulations(self, text_embeddings: mx.array) -> list[mx.array]:
+        return [self.norm1.modulation(text_embeddings), self.norm1_context.modulation(text_embeddings)]
+
     def forward(
             self,
             hidden_states: mx.array,
             encoder_hidden_states: mx.array,
-            text_embeddings: mx.array,
+            modulations: list[mx.array],
             rotary_embeddings: mx.array
     ) -> (mx.array, mx.array):
-        norm_hidden_states, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.norm1.forward(hidden_states, text_embeddings)
+        norm_hidden_states, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.norm1.modulate(hidden_states, modulations[0])
 
-        norm_encoder_hidden_states, c_gate_msa, c_shift_mlp, c_scale_mlp, c_gate_mlp = self.norm1_context.forward(
+        norm_encoder_hidden_states, c_gate_msa, c_shift_mlp, c_scale_mlp, c_gate_mlp = self.norm1_context.modulate(
             x=encoder_hidden_states,
-            text_embeddings=text_embeddings
+            modulation=modulations[1]
         )
 
         attn_output, context_attn_output = self.attn.forward(
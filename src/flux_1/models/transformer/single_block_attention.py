@@ -1,17 +1,21 @@
 import mlx.core as mx
 from mlx import nn
 
+from flux_1.models.common.attention_backend import AttentionBackend
+
 
 class SingleBlockAttention(nn.Module):
     head_dimension = 128
-    batch_size = 1
     num_heads = 24
 
-    def __init__(self):
+    def __init__(self, fused_projections: bool = False):
         super().__init__()
-        self.to_q = nn.Linear(3072, 3072)
-        self.to_k = nn.Linear(3072, 3072)
-        self.to_v = nn.Linear(3072, 3072)
+
+        # With fused projections, the query, key and value come from the block's proj_qkv_mlp instead
+        if not fused_projections:
+            self.to_q = nn.Linear(3072, 3072)
+            self.to_k = nn.Linear(3072, 3072)
+            self.to_v = nn.Linear(3072, 3072)
         self.norm_q = nn.RMSNorm(128)
         self.norm_k = nn.RMSNorm(128)
 
@@ -23,10 +27,20 @@ class SingleBlockAttention(nn.Module):
         query = self.to_q(hidden_states)
         key = self.to_k(hidden_states)
         value = self.to_v(hidden_states)
+        return self.attend(query, key, value, image_rotary_emb)
+
+    def attend(
+            self,
+            query: mx.array,
+            key: mx.array,
+            value: mx.array,
+            image_rotary_emb: mx.array
+    ) -> mx.array:
+        batch_size = query.shape[0]
 
-        query = mx.transpose(mx.reshape(query, (1, -1, 24, 128)), (0, 2, 1, 3))
-        key = mx.transpose(mx.reshape(key, (1, -1, 24, 128)), (0, 2, 1, 3))
-        value = mx.transpose(mx.reshape(value, (1, -1, 24, 128)), (0, 2, 1, 3))
+        query = mx.transpose(mx.reshape(query, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        key = mx.transpose(mx.reshape(key, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
+        value = mx.transpose(mx.reshape(value, (batch_size, -1, 24, 128)), (0, 2, 1, 3))
 
         query = self.norm_q(query)
         key = self.norm_k(key)
@@ -35,17 +49,13 @@ class SingleBlockAttention(nn.Module):
 
         hidden_states = SingleBlockAttention.attention(query, key, value)
         hidden_states = mx.transpose(hidden_states, (0, 2, 1, 3))
-        hidden_states = mx.reshape(hidden_states, (self.batch_size, -1, self.num_heads * self.head_dimension))
+        hidden_states = mx.reshape(hidden_states, (batch_size, -1, self.num_heads * self.head_dimension))
 
         return hidden_states
 
     @staticmethod
     def attention(query, key, value):
-        scale = 1 / mx.sqrt(query.shape[-1])
-        scores = (query * scale) @ key.transpose(0, 1, 3, 2)
-        attn = mx.softmax(scores, axis=-1)
-        hidden_states = (attn @ value)
-        return hidden_states
+        return AttentionBackend.attention(query, key, value)
 
     @staticmethod
     def apply_rope(xq: mx.array, xk: mx.array, freqs_cis: mx.array):
@@ -7,27 +7,39 @@ from flux_1.models.transformer.single_block_attention import SingleBlockAttentio
 
 class SingleTransformerBlock(nn.Module):
 
-    def __init__(self, layer):
+    def __init__(self, layer, fused_projections: bool = False):
         super().__init__()
         self.layer = layer
+        self.fused_projections = fused_projections
         self.norm = AdaLayerNormZeroSingle()
-        self.proj_mlp = nn.Linear(3072, 4*3072)
-        self.attn = SingleBlockAttention()
+        if self.fused_projections:
+            self.proj_qkv_mlp = nn.Linear(3072, 3*3072 + 4*3072)
+        else:
+            self.proj_mlp = nn.Linear(3072, 4*3072)
+        self.attn = SingleBlockAttention(fused_projections=fused_projections)
         self.proj_out = nn.Linear(3072 + 4*3072, 3072)
 
+    def modulations(self, text_embeddings: mx.array) -> list[mx.array]:
+        return [self.norm.modulation(text_embeddings)]
+
     def forward(
             self,
             hidden_states: mx.array,
-            text_embeddings: mx.array,
+            modulations: list[mx.array],
             rotary_embeddings: mx.array
     ) -> (mx.array, mx.array):
         residual = hidden_states
-        norm_hidden_states, gate = self.norm.forward(x=hidden_states, text_embeddings=text_embeddings)
-        mlp_hidden_states = nn.gelu_approx(self.proj_mlp(norm_hidden_states))
-        attn_output = self.attn.forward(
-            hidden_states=norm_hidden_states,
-            image_rotary_emb=rotary_embeddings,
-        )
+        norm_hidden_states, gate = self.norm.modulate(x=hidden_states, modulation=modulations[0])
+        if self.fused_projections:
+            query, key, value, mlp_hidden_states = mx.split(self.proj_qkv_mlp(norm_hidden_states), [3072, 2*3072, 3*3072], axis=2)
+            mlp_hidden_states = nn.gelu_approx(mlp_hidden_states)
+            attn_output = self.attn.attend(query, key, value, rotary_embeddings)
+        else:
+            mlp_hidden_states = nn.gelu_approx(self.proj_mlp(norm_hidden_states))
+            attn_output = self.attn.forward(
+                hidden_states=norm_hidden_states,
+                image_rotary_emb=rotary_embeddings,
+            )
         hidden_states = mx.concatenate([attn_output, mlp_hidden_states], axis=2)
         gate = mx.expand_dims(gate, axis=1)
         hidden_states = gate * self.proj_out(hidden_states)
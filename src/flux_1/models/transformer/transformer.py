@@ -1,28 +1,47 @@
 import mlx.core as mx
 from mlx import nn
+from mlx.utils import tree_map
 
-from flux_1.config.config import Config
+from flux_1.cache.block_cache import BlockCache
+from flux_1.cache.compiled_function_cache import CompiledFunctionCache
+from flux_1.cache.rotary_embedding_cache import RotaryEmbeddingCache
 from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.models.common.attention_backend import AttentionBackend
 from flux_1.models.transformer.ada_layer_norm_continous import AdaLayerNormContinuous
 from flux_1.models.transformer.embed_nd import EmbedND
 from flux_1.models.transformer.joint_transformer_block import JointTransformerBlock
 from flux_1.models.transformer.single_transformer_block import SingleTransformerBlock
 from flux_1.models.transformer.time_text_embed import TimeTextEmbed
+from flux_1.weights.quantization_util import QuantizationUtil
 
 
 class Transformer(nn.Module):
 
-    def __init__(self, weights: dict):
+    def __init__(
+            self,
+            weights: dict,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            num_transformer_blocks: int = 19,
+            num_single_transformer_blocks: int = 38,
+    ):
         super().__init__()
         self.pos_embed = EmbedND()
         self.x_embedder = nn.Linear(64, 3072)
         with_guidance_embed = "guidance_embedder" in weights["time_text_embed"].keys()
         self.time_text_embed = TimeTextEmbed(with_guidance_embed=with_guidance_embed)
         self.context_embedder = nn.Linear(4096, 3072)
-        self.transformer_blocks = [JointTransformerBlock(i) for i in range(19)]
-        self.single_transformer_blocks = [SingleTransformerBlock(i) for i in range(38)]
+        fused_projections = "to_qkv" in weights.get("transformer_blocks", [{}])[0].get("attn", {})
+        self.transformer_blocks = [JointTransformerBlock(i, fused_projections) for i in range(num_transformer_blocks)]
+        self.single_transformer_blocks = [SingleTransformerBlock(i, fused_projections) for i in range(num_single_transformer_blocks)]
         self.norm_out = AdaLayerNormContinuous(3072, 3072)
         self.proj_out = nn.Linear(3072, 64)
+        self.rotary_embedding_cache = RotaryEmbeddingCache()
+        self.compiled_forward = CompiledFunctionCache(self._forward, state=self.state)
+
+        # Already quantized weights can only be loaded into a quantized model
+        if quantize is not None:
+            QuantizationUtil.quantize(self, bits=quantize, group_size=quantize_group_size)
 
         # Load the weights after all components are initialized
         self.update(weights)
@@ -34,41 +53,126 @@ class Transformer(nn.Module):
             pooled_prompt_embeds: mx.array,
             hidden_states: mx.array,
             config: RuntimeConfig,
+            block_cache: BlockCache | None = None,
+            modulations: dict | None = None,
+            *,
+            compiled: bool = False,
+    ) -> mx.array:
+        if modulations is None:
+            time_step = config.sigmas[t] * config.num_train_steps
+            time_step = mx.broadcast_to(time_step, (1,)).astype(config.precision)
+            guidance = mx.broadcast_to(config.guidance * config.num_train_steps, (1,)).astype(config.precision)
+            modulations = self._modulations(self.time_text_embed.forward(time_step, pooled_prompt_embeds, guidance))
+        else:
+            modulations = tree_map(lambda modulation: modulation[t], modulations)
+        image_rotary_emb = self.rotary_embedding_cache.get(
+            key=(config.height, config.width, prompt_embeds.shape[1]),
+            create=lambda: self._rotary_embeddings(config.height, config.width, prompt_embeds.shape[1]),
+        )
+
+        # Deciding whether to reuse the cached activations needs the values of this step, so it cannot be compiled
+        if block_cache is not None:
+            return self._forward_with_block_cache(t, block_cache, hidden_states, prompt_embeds, modulations, image_rotary_emb)
+        if compiled:
+            return self.compiled_forward(
+                (config.height, config.width, prompt_embeds.shape[1], hidden_states.shape[0], hidden_states.dtype, *AttentionBackend.current()),
+                hidden_states,
+                prompt_embeds,
+                modulations,
+                image_rotary_emb,
+            )
+        return self._forward(hidden_states, prompt_embeds, modulations, image_rotary_emb)
+
+    def precompute_modulations(self, pooled_prompt_embeds: mx.array, config: RuntimeConfig) -> dict:
+        # The modulations only depend on the sigmas, the guidance and the pooled prompt, so those of all steps
+        # are computed together, as a single batch of (num_inference_steps * batch_size) conditionings
+        batch_size = pooled_prompt_embeds.shape[0]
+        num_steps = config.num_inference_steps
+        time_steps = mx.repeat(config.sigmas[:num_steps] * config.num_train_steps, batch_size).astype(config.precision)
+        guidance = mx.full((num_steps * batch_size,), config.guidance * config.num_train_steps).astype(config.precision)
+        pooled_prompt_embeds = mx.tile(pooled_prompt_embeds, (num_steps, 1))
+        modulations = self._modulations(self.time_text_embed.forward(time_steps, pooled_prompt_embeds, guidance))
+        return tree_map(lambda modulation: modulation.reshape(num_steps, batch_size, -1), modulations)
+
+    def _modulations(self, text_embeddings: mx.array) -> dict:
+        return {
+            "transformer_blocks": [block.modulations(text_embeddings) for block in self.transformer_blocks],
+            "single_transformer_blocks": [block.modulations(text_embeddings) for block in self.single_transformer_blocks],
+            "norm_out": self.norm_out.modulation(text_embeddings),
+        }
+
+    def _forward(
+            self,
+            hidden_states: mx.array,
+            prompt_embeds: mx.array,
+            modulations: dict,
+            image_rotary_emb: mx.array,
     ) -> mx.array:
-        time_step = config.sigmas[t] * config.num_train_steps
-        time_step = mx.broadcast_to(time_step, (1,)).astype(config.precision)
         hidden_states = self.x_embedder(hidden_states)
-        guidance = mx.broadcast_to(config.guidance * config.num_train_steps, (1,)).astype(config.precision)
-        text_embeddings = self.time_text_embed.forward(time_step, pooled_prompt_embeds, guidance)
         encoder_hidden_states = self.context_embedder(prompt_embeds)
-        txt_ids = Transformer._prepare_text_ids(seq_len=prompt_embeds.shape[1])
-        img_ids = Transformer._prepare_latent_image_ids(config.height, config.width)
-        ids = mx.concatenate((txt_ids, img_ids), axis=1)
-        image_rotary_emb = self.pos_embed.forward(ids)
+        hidden_states = self._blocks(hidden_states, encoder_hidden_states, modulations, image_rotary_emb)
+        return self._output(hidden_states, modulations)
 
-        for block in self.transformer_blocks:
+    def _forward_with_block_cache(
+            self,
+            t: int,
+            block_cache: BlockCache,
+            hidden_states: mx.array,
+            prompt_embeds: mx.array,
+            modulations: dict,
+            image_rotary_emb: mx.array,
+    ) -> mx.array:
+        hidden_states = self.x_embedder(hidden_states)
+        encoder_hidden_states = self.context_embedder(prompt_embeds)
+
+        # The modulated input of the first block is cheap to compute and tells how much this step differs from the last
+        modulated_input, _, _, _, _ = self.transformer_blocks[0].norm1.modulate(hidden_states, modulations["transformer_blocks"][0][0])
+        if block_cache.should_reuse(t, modulated_input):
+            hidden_states = hidden_states + block_cache.residual
+        else:
+            output = self._blocks(hidden_states, encoder_hidden_states, modulations, image_rotary_emb)
+            block_cache.update(output - hidden_states)
+            hidden_states = output
+        return self._output(hidden_states, modulations)
+
+    def _blocks(
+            self,
+            hidden_states: mx.array,
+            encoder_hidden_states: mx.array,
+            modulations: dict,
+            image_rotary_emb: mx.array,
+    ) -> mx.array:
+        for block, block_modulations in zip(self.transformer_blocks, modulations["transformer_blocks"]):
             encoder_hidden_states, hidden_states = block.forward(
                 hidden_states=hidden_states,
                 encoder_hidden_states=encoder_hidden_states,
-                text_embeddings=text_embeddings,
+                modulations=block_modulations,
                 rotary_embeddings=image_rotary_emb
             )
 
         hidden_states = mx.concatenate([encoder_hidden_states, hidden_states], axis=1)
 
-        for block in self.single_transformer_blocks:
+        for block, block_modulations in zip(self.single_transformer_blocks, modulations["single_transformer_blocks"]):
             hidden_states = block.forward(
                 hidden_states=hidden_states,
-                text_embeddings=text_embeddings,
+                modulations=block_modulations,
                 rotary_embeddings=image_rotary_emb
             )
 
-        hidden_states = hidden_states[:, encoder_hidden_states.shape[1]:, ...]
-        hidden_states = self.norm_out.forward(hidden_states, text_embeddings)
+        return hidden_states[:, encoder_hidden_states.shape[1]:, ...]
+
+    def _output(self, hidden_states: mx.array, modulations: dict) -> mx.array:
+        hidden_states = self.norm_out.modulate(hidden_states, modulations["norm_out"])
         hidden_states = self.proj_out(hidden_states)
         noise = hidden_states
         return noise
 
+    def _rotary_embeddings(self, height: int, width: int, seq_len: int) -> mx.array:
+        txt_ids = Transformer._prepare_text_ids(seq_len=seq_len)
+        img_ids = Transformer._prepare_latent_image_ids(height, width)
+        ids = mx.concatenate((txt_ids, img_ids), axis=1)
+        return self.pos_embed.forward(ids)
+
     @staticmethod
     def _prepare_latent_image_ids(height: int, width: int) -> mx.array:
         latent_width = width // 16
@@ -2,6 +2,7 @@ import mlx.core as mx
 from mlx import nn
 
 from flux_1.config.config import Config
+from flux_1.models.common.attention_backend import AttentionBackend
 
 
 class Attention(nn.Module):
@@ -25,10 +26,8 @@ class Attention(nn.Module):
         keys = self.to_k(y).reshape(B, H * W, C)
         values = self.to_v(y).reshape(B, H * W, C)
 
-        scale = 1 / mx.sqrt(queries.shape[-1])
-        scores = (queries * scale) @ keys.transpose(0, 2, 1)
-        attn = mx.softmax(scores, axis=-1)
-        y = (attn @ values).reshape(B, H, W, C)
+        y = AttentionBackend.attention(queries[:, None], keys[:, None], values[:, None])
+        y = y.reshape(B, H, W, C)
 
         y = self.to_out[0](y)
         output_tensor = input_array + y
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import mlx.core as mx
+import numpy as np
+from mlx import nn
+
+
+class LatentPreviewer(nn.Module):
+    # Approximate linear map from the 16 latent channels to RGB in [-1, 1]
+    latent_rgb_factors = [
+        [-0.0346, 0.0244, 0.0681],
+        [0.0034, 0.0210, 0.0687],
+        [0.0275, -0.0668, -0.0433],
+        [-0.0174, 0.0160, 0.0617],
+        [0.0859, 0.0721, 0.0329],
+        [0.0004, 0.0383, 0.0115],
+        [0.0405, 0.0861, 0.0915],
+        [-0.0236, -0.0185, -0.0259],
+        [-0.0245, 0.0250, 0.1180],
+        [0.1008, 0.0755, -0.0421],
+        [-0.0515, 0.0201, 0.0011],
+        [0.0428, -0.0012, -0.0036],
+        [0.0817, 0.0765, 0.0749],
+        [-0.1264, -0.0522, -0.1103],
+        [-0.0280, -0.0881, -0.0499],
+        [-0.1262, -0.0982, -0.0778],
+    ]
+    latent_rgb_bias = [-0.0329, -0.0718, -0.0851]
+
+    def __init__(self, weight: mx.array | None = None, bias: mx.array | None = None):
+        super().__init__()
+        self.weight = mx.array(LatentPreviewer.latent_rgb_factors) if weight is None else weight
+        self.bias = mx.array(LatentPreviewer.latent_rgb_bias) if bias is None else bias
+
+    @staticmethod
+    def from_file(path: str) -> "LatentPreviewer":
+        weights = mx.load(str(path))
+        return LatentPreviewer(weight=weights["weight"], bias=weights["bias"])
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        mx.save_safetensors(str(path), {"weight": self.weight, "bias": self.bias})
+
+    def decode(self, latents: mx.array) -> mx.array:
+        # (B, 16, H/8, W/8) unpacked latents -> (B, 3, H/8, W/8) image, same value range as the VAE output
+        rgb = mx.einsum("bchw,cr->brhw", latents.astype(mx.float32), self.weight.astype(mx.float32))
+        return rgb + self.bias.astype(mx.float32)[None, :, None, None]
+
+    @staticmethod
+    def fit(latents: mx.array, images: mx.array) -> "LatentPreviewer":
+        # Least squares fit against decoded images, downsampled to the latent resolution
+        batch, channels, height, width = latents.shape
+        targets = images.astype(mx.float32).reshape(batch, 3, height, images.shape[2] // height, width, images.shape[3] // width)
+        targets = targets.mean(axis=(3, 5))
+
+        x = np.array(latents.astype(mx.float32).transpose(0, 2, 3, 1).reshape(-1, channels))
+        y = np.array(targets.transpose(0, 2, 3, 1).reshape(-1, 3))
+        x = np.concatenate([x, np.ones((x.shape[0], 1), dtype=x.dtype)], axis=1)
+        solution, _, _, _ = np.linalg.lstsq(x, y, rcond=None)
+        return LatentPreviewer(weight=mx.array(solution[:-1]), bias=mx.array(solution[-1]))
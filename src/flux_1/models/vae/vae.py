@@ -1,6 +1,8 @@
 import mlx.core as mx
 from mlx import nn
 
+from flux_1.cache.compiled_function_cache import CompiledFunctionCache
+from flux_1.models.common.attention_backend import AttentionBackend
 from flux_1.models.vae.decoder.decoder import Decoder
 from flux_1.models.vae.encoder.encoder import Encoder
 
@@ -13,15 +15,24 @@ class VAE(nn.Module):
         super().__init__()
         self.decoder = Decoder()
         self.encoder = Encoder()
+        self.compiled_decode = CompiledFunctionCache(self._decode, state=self.state)
 
         # Load the weights after all components are initialized
         self.update(weights)
 
-    def decode(self, latents: mx.array) -> mx.array:
+    def decode(self, latents: mx.array, *, compiled: bool = False) -> mx.array:
+        if compiled:
+            return self.compiled_decode((latents.shape, latents.dtype, *AttentionBackend.current()), latents)
+        return self._decode(latents)
+
+    def _decode(self, latents: mx.array) -> mx.array:
         scaled_latents = (latents / self.scaling_factor) + self.shift_factor
         return self.decoder.decode(scaled_latents)
 
     def encode(self, latents: mx.array) -> mx.array:
         latents = self.encoder.encode(latents)
-        mean, _ = mx.split(latents, 2, axis=1)
+        return self.latents_from_moments(latents)
+
+    def latents_from_moments(self, moments: mx.array) -> mx.array:
+        mean, _ = mx.split(moments, 2, axis=1)
         return (mean - self.shift_factor) * self.scaling_factor
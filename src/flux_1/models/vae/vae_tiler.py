@@ -0,0 +1,98 @@
+from typing import Callable
+
+import mlx.core as mx
+
+
+class VAETiler:
+
+    @staticmethod
+    def decode(
+            decode: Callable[[mx.array], mx.array],
+            latents: mx.array,
+            tile_size: int,
+            tile_overlap: int,
+            scale: int = 8,
+    ) -> mx.array:
+        # Tile size and overlap are given in pixels, the tiles are cut from the latent array
+        return VAETiler.apply(decode, latents, tile_size // scale, tile_overlap // scale, scale)
+
+    @staticmethod
+    def encode(
+            encode: Callable[[mx.array], mx.array],
+            pixels: mx.array,
+            tile_size: int,
+            tile_overlap: int,
+            scale: int = 8,
+    ) -> mx.array:
+        # The encoder moments (mean and log variance) are stitched, not the sampled latents
+        return VAETiler.apply(encode, pixels, tile_size, tile_overlap, 1 / scale)
+
+    @staticmethod
+    def apply(
+            fn: Callable[[mx.array], mx.array],
+            array: mx.array,
+            tile_size: int,
+            tile_overlap: int,
+            scale: float,
+    ) -> mx.array:
+        batch_size, _, height, width = array.shape
+        out_height, out_width = int(height * scale), int(width * scale)
+        output = None
+        weights = mx.zeros((1, 1, out_height, out_width), dtype=mx.float32)
+
+        rows = VAETiler._tile_starts(height, tile_size, tile_overlap)
+        cols = VAETiler._tile_starts(width, tile_size, tile_overlap)
+        for y in rows:
+            for x in cols:
+                tile_height = min(tile_size, height - y)
+                tile_width = min(tile_size, width - x)
+                tile = fn(array[:, :, y:y + tile_height, x:x + tile_width]).astype(mx.float32)
+
+                # Feather the tile towards its neighbours so that the seams are blended
+                mask = VAETiler._feather_mask(
+                    height=tile.shape[2],
+                    width=tile.shape[3],
+                    ramp=int(tile_overlap * scale),
+                    top=y > 0,
+                    bottom=y + tile_height < height,
+                    left=x > 0,
+                    right=x + tile_width < width,
+                )
+                out_y, out_x = int(y * scale), int(x * scale)
+                out_y_end, out_x_end = out_y + tile.shape[2], out_x + tile.shape[3]
+                if output is None:
+                    output = mx.zeros((batch_size, tile.shape[1], out_height, out_width), dtype=mx.float32)
+                output[:, :, out_y:out_y_end, out_x:out_x_end] += tile * mask
+                weights[:, :, out_y:out_y_end, out_x:out_x_end] += mask
+
+                # Evaluate per tile, so peak memory depends on the tile size and not the full resolution
+                mx.eval(output, weights)
+
+        return output / weights
+
+    @staticmethod
+    def _tile_starts(length: int, tile_size: int, tile_overlap: int) -> list[int]:
+        if length <= tile_size:
+            return [0]
+        stride = tile_size - tile_overlap
+        starts = list(range(0, length - tile_size, stride))
+        starts.append(length - tile_size)
+        return starts
+
+    @staticmethod
+    def _feather_mask(height: int, width: int, ramp: int, top: bool, bottom: bool, left: bool, right: bool) -> mx.array:
+        rows = VAETiler._ramp(height, ramp, top, bottom)
+        cols = VAETiler._ramp(width, ramp, left, right)
+        return (rows[:, None] * cols[None, :])[None, None]
+
+    @staticmethod
+    def _ramp(length: int, ramp: int, start: bool, end: bool) -> mx.array:
+        weights = mx.ones((length,), dtype=mx.float32)
+        if ramp <= 0:
+            return weights
+        positions = mx.arange(length, dtype=mx.float32)
+        if start:
+            weights = mx.minimum(weights, (positions + 1) / (ramp + 1))
+        if end:
+            weights = mx.minimum(weights, (length - positions) / (ramp + 1))
+        return weights
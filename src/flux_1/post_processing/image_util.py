@@ -1,4 +1,6 @@
 import logging
+import os
+import uuid
 from pathlib import Path
 
 import PIL
@@ -13,10 +15,21 @@ class ImageUtil:
 
     @staticmethod
     def to_image(decoded_latents: mx.array) -> PIL.Image.Image:
+        return ImageUtil.to_images(decoded_latents)[0]
+
+    @staticmethod
+    def to_images(decoded_latents: mx.array) -> list[PIL.Image.Image]:
+        return ImageUtil.numpy_to_images(ImageUtil.to_numpy_images(decoded_latents))
+
+    @staticmethod
+    def to_numpy_images(decoded_latents: mx.array) -> np.ndarray:
+        # The part of the conversion that runs in MLX, the rest is plain numpy and PIL work
         normalized = ImageUtil._denormalize(decoded_latents)
-        normalized_numpy = ImageUtil._to_numpy(normalized)
-        image = ImageUtil._numpy_to_pil(normalized_numpy)
-        return image
+        return ImageUtil._to_numpy(normalized)
+
+    @staticmethod
+    def numpy_to_images(images: np.ndarray) -> list[PIL.Image.Image]:
+        return ImageUtil._numpy_to_pil(images)
 
     @staticmethod
     def _denormalize(images: mx.array) -> mx.array:
@@ -34,10 +47,10 @@ class ImageUtil:
         return images
 
     @staticmethod
-    def _numpy_to_pil(images: np.ndarray) -> PIL.Image.Image:
+    def _numpy_to_pil(images: np.ndarray) -> list[PIL.Image.Image]:
         images = (images * 255).round().astype("uint8")
         pil_images = [Image.fromarray(image) for image in images]
-        return pil_images[0]
+        return pil_images
 
     @staticmethod
     def _pil_to_numpy(image: PIL.Image.Image) -> np.ndarray:
@@ -45,6 +58,10 @@ class ImageUtil:
         images = np.stack([image], axis=0)
         return images
 
+    @staticmethod
+    def load_image(path: str) -> PIL.Image.Image:
+        return Image.open(path).convert("RGB")
+
     @staticmethod
     def to_array(image: PIL.Image.Image) -> mx.array:
         image = ImageUtil.resize(image)
@@ -55,26 +72,65 @@ class ImageUtil:
         return array
 
     @staticmethod
-    def resize(image):
-        image = image.resize((1024, 1024), resample=PIL.Image.LANCZOS)
+    def resize(image: PIL.Image.Image, multiple: int = 16) -> PIL.Image.Image:
+        width = max(multiple, multiple * (image.width // multiple))
+        height = max(multiple, multiple * (image.height // multiple))
+        if (width, height) != image.size:
+            image = image.resize((width, height), resample=PIL.Image.LANCZOS)
         return image
 
     @staticmethod
-    def save_image(image: Image.Image, path: str) -> None:
-        file_path = Path(path)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_name = file_path.stem
-        file_extension = file_path.suffix
-
-        # If a file already exists, create a new name with a counter
-        counter = 1
-        while file_path.exists():
-            new_name = f"{file_name}({counter}){file_extension}"
-            file_path = file_path.with_name(new_name)
-            counter += 1
+    def psnr(image: PIL.Image.Image, reference: PIL.Image.Image) -> float:
+        difference = np.asarray(image, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+        mse = np.mean(difference ** 2)
+        return float("inf") if mse == 0 else float(10 * np.log10(255 ** 2 / mse))
 
+    @staticmethod
+    def save_image(image: Image.Image, path: str) -> None:
         try:
-            image.save(file_path)
+            file_path = ImageUtil.write_image(image, path)
             log.info(f"Image saved successfully at: {file_path}")
         except Exception as e:
             log.info(f"Error saving image: {e}")
+
+    @staticmethod
+    def write_image(image: Image.Image, path: str | Path, overwrite: bool = False, counter: int = 0) -> Path:
+        # Written to a temporary file first, so that a partially written image is never visible under its name
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.{uuid.uuid4().hex}{path.suffix}")
+        try:
+            image.save(tmp_path)
+            if overwrite:
+                os.replace(tmp_path, path)
+                return path
+
+            # If a file already exists, use a new name with a counter
+            while True:
+                file_path = ImageUtil.numbered_path(path, counter)
+                try:
+                    ImageUtil._claim(tmp_path, file_path)
+                    return file_path
+                except FileExistsError:
+                    counter += 1
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _claim(tmp_path: Path, file_path: Path) -> None:
+        # Both ways only succeed if the name is still free, so writers in other threads or processes can never take the
+        # same one. A hard link publishes the complete file at once, on filesystems without hard links (FAT, exFAT, some
+        # network mounts) the name is reserved by creating it exclusively, and the written image then replaces it
+        try:
+            os.link(tmp_path, file_path)
+            return
+        except FileExistsError:
+            raise
+        except (OSError, NotImplementedError):
+            pass
+        os.close(os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        os.replace(tmp_path, file_path)
+
+    @staticmethod
+    def numbered_path(path: Path, counter: int) -> Path:
+        return path if counter == 0 else path.with_name(f"{path.stem}({counter}){path.suffix}")
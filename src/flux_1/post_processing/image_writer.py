@@ -0,0 +1,132 @@
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import PIL
+import numpy as np
+
+from flux_1.post_processing.image_util import ImageUtil
+
+log = logging.getLogger(__name__)
+
+
+class ImageWriter:
+
+    def __init__(self, num_workers: int = 2, max_pending: int = 8, overwrite: bool = False):
+        if num_workers < 1 or max_pending < 1:
+            raise ValueError("The number of workers and of pending images must be at least 1")
+        self.overwrite = overwrite
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="image-writer")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._futures = set()
+        self._errors = []
+        self._next_counters = {}
+        self._images = 0
+        self._bytes = 0
+        self._write_time = 0.0
+        self._start_time = None
+        self._end_time = None
+
+    def __enter__(self) -> "ImageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def submit(self, image: PIL.Image.Image | np.ndarray, path: str | Path) -> Future:
+        # Blocks while max_pending images are waiting to be written, so a slow disk slows down the producer
+        # instead of letting decoded images pile up in memory. Arrays are (H, W, 3) in [0, 1], see ImageUtil.to_numpy_images
+        self._pending.acquire()
+        with self._lock:
+            counter = self._reserve(Path(path))
+            if self._start_time is None:
+                self._start_time = time.perf_counter()
+        try:
+            future = self._executor.submit(self._write, image, Path(path), counter)
+        except Exception:
+            self._pending.release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def flush(self) -> None:
+        # Waits for all submitted images, and raises the first error since the last flush
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.exception()
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            # From the first submitted image until the last written one, or until now while images are still pending
+            end_time = self._end_time if not self._futures and self._end_time is not None else time.perf_counter()
+            elapsed = end_time - self._start_time if self._start_time is not None else 0.0
+            return {
+                "images": self._images,
+                "bytes": self._bytes,
+                "pending": len(self._futures),
+                "write_time": self._write_time,
+                "images_per_second": self._images / elapsed if elapsed > 0 else None,
+                "megabytes_per_second": self._bytes / elapsed / 1e6 if elapsed > 0 else None,
+            }
+
+    def _reserve(self, path: Path) -> int:
+        # Repeated paths are numbered in the order they are submitted, after any numbered files already on disk
+        if self.overwrite:
+            return 0
+        if path not in self._next_counters:
+            self._next_counters[path] = ImageWriter._first_free_counter(path)
+        counter = self._next_counters[path]
+        self._next_counters[path] = counter + 1
+        return counter
+
+    @staticmethod
+    def _first_free_counter(path: Path) -> int:
+        if not path.exists():
+            return 0
+        pattern = re.compile(rf"{re.escape(path.stem)}\((\d+)\){re.escape(path.suffix)}")
+        counters = [int(match.group(1)) for name in os.listdir(path.parent) if (match := pattern.fullmatch(name))]
+        return max(counters, default=0) + 1
+
+    def _write(self, image: PIL.Image.Image | np.ndarray, path: Path, counter: int) -> Path:
+        start_time = time.perf_counter()
+        try:
+            if isinstance(image, np.ndarray):
+                image = ImageUtil.numpy_to_images(image[None])[0]
+            file_path = ImageUtil.write_image(image, path, overwrite=self.overwrite, counter=counter)
+        except Exception as e:
+            # Recorded before the future completes, its waiters (flush) wake up before the done callbacks run
+            log.error(f"Error saving image: {e}")
+            with self._lock:
+                self._errors.append(e)
+            raise
+        size = file_path.stat().st_size
+        with self._lock:
+            self._images += 1
+            self._bytes += size
+            self._write_time += time.perf_counter() - start_time
+        log.info(f"Image saved successfully at: {file_path}")
+        return file_path
+
+    def _done(self, future: Future) -> None:
+        self._pending.release()
+        with self._lock:
+            self._futures.discard(future)
+            self._end_time = time.perf_counter()
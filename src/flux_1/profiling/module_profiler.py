@@ -0,0 +1,200 @@
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from pathlib import Path
+
+import mlx.core as mx
+from mlx import nn
+from mlx.utils import tree_flatten
+
+
+class ModuleProfiler:
+    # Fused attention layers run their projections in forward and the attention itself in attend, the AdaLN
+    # layers compute their modulation once per step and apply it with modulate
+    METHODS = ("forward", "predict", "encode", "decode", "attend", "modulation", "modulate")
+
+    # The profiler of the current context. Calls from other threads (e.g. other requests of a server) run in
+    # their own contexts, so they go straight to the original methods and are never recorded
+    _active = contextvars.ContextVar("module_profiler", default=None)
+    # The methods stay swapped while any profiler is enabled
+    _patch_lock = threading.Lock()
+    _patch_count = 0
+    _originals = []
+
+    def __init__(self, roots: dict[str, nn.Module] | None = None, force_eval: bool = True, package: str = "flux_1.models"):
+        # The roots are only used to give module instances readable names, e.g. "transformer.transformer_blocks.3.attn"
+        self.names = {}
+        for prefix, root in (roots or {}).items():
+            self.names[id(root)] = prefix
+            for name, module in root.named_modules():
+                if name:
+                    self.names[id(module)] = f"{prefix}.{name}"
+        self.force_eval = force_eval
+        self.package = package
+        self.events = []
+        self._token = None
+        self._start_time = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_flux(flux, force_eval: bool = True) -> "ModuleProfiler":
+        # Components that are not loaded yet (see OffloadPolicy) are still profiled, under their class names
+        return ModuleProfiler(roots=flux.loaded_components, force_eval=force_eval)
+
+    def __enter__(self) -> "ModuleProfiler":
+        self.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.disable()
+
+    def enable(self) -> None:
+        # Records the calls made from the current context until disable, which has to be called from the same one
+        if self._token is not None:
+            return
+        self._start_time = time.perf_counter()
+        self._token = ModuleProfiler._active.set(self)
+        ModuleProfiler._patch(self.package)
+
+    def disable(self) -> None:
+        if self._token is None:
+            return
+        ModuleProfiler._active.reset(self._token)
+        self._token = None
+        ModuleProfiler._unpatch()
+
+    @staticmethod
+    def _patch(package: str) -> None:
+        # The methods are only replaced while profiling, the classes are left untouched otherwise
+        with ModuleProfiler._patch_lock:
+            ModuleProfiler._patch_count += 1
+            patched = {(cls, method) for cls, method, _ in ModuleProfiler._originals}
+            for cls in ModuleProfiler._module_classes(package):
+                for method in ModuleProfiler.METHODS:
+                    original = cls.__dict__.get(method)
+                    if callable(original) and (cls, method) not in patched:
+                        ModuleProfiler._originals.append((cls, method, original))
+                        setattr(cls, method, ModuleProfiler._wrap(cls, method, original))
+
+    @staticmethod
+    def _unpatch() -> None:
+        with ModuleProfiler._patch_lock:
+            ModuleProfiler._patch_count -= 1
+            if ModuleProfiler._patch_count > 0:
+                return
+            for cls, method, original in reversed(ModuleProfiler._originals):
+                setattr(cls, method, original)
+            ModuleProfiler._originals = []
+
+    @staticmethod
+    def _wrap(cls: type, method: str, original):
+        # Compiled functions are traced once and cannot evaluate per module, so the profiled calls run uncompiled
+        uncompiled = "compiled" in inspect.signature(original).parameters
+
+        @functools.wraps(original)
+        def wrapper(module, *args, **kwargs):
+            profiler = ModuleProfiler._active.get()
+            if profiler is None:
+                return original(module, *args, **kwargs)
+            if uncompiled:
+                kwargs["compiled"] = False
+            return profiler._call(cls, method, original, module, args, kwargs)
+
+        return wrapper
+
+    def _call(self, cls: type, method: str, original, module, args: tuple, kwargs: dict):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        outer_step = getattr(local, "step", None)
+        step = kwargs.get("t", outer_step) if method == "predict" else outer_step
+
+        local.depth = depth + 1
+        local.step = step
+        start = time.perf_counter()
+        try:
+            output = original(module, *args, **kwargs)
+            traced = time.perf_counter()
+            if self.force_eval:
+                mx.eval(output)
+        finally:
+            local.depth = depth
+            local.step = outer_step
+        end = time.perf_counter()
+
+        self._record({
+            "name": self.names.get(id(module), cls.__name__),
+            "class": cls.__name__,
+            "method": method,
+            "step": step,
+            "depth": depth,
+            "thread": threading.get_ident(),
+            "start": start - self._start_time,
+            "wall_time": end - start,
+            "trace_time": traced - start,
+            "eval_time": end - traced,
+            "output_bytes": ModuleProfiler._nbytes(output),
+        })
+        return output
+
+    def _record(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> dict:
+        totals = {}
+        for event in self.events:
+            key = f"{event['class']}.{event['method']}"
+            total = totals.setdefault(key, {"calls": 0, "wall_time": 0.0, "eval_time": 0.0, "output_bytes": 0})
+            total["calls"] += 1
+            total["wall_time"] += event["wall_time"]
+            total["eval_time"] += event["eval_time"]
+            total["output_bytes"] += event["output_bytes"]
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["wall_time"]))
+
+    def save_chrome_trace(self, path: str) -> None:
+        # Complete ("X") events, which chrome://tracing and Perfetto nest by their time ranges
+        trace_events = [
+            {
+                "name": event["name"],
+                "cat": event["class"],
+                "ph": "X",
+                "ts": event["start"] * 1e6,
+                "dur": event["wall_time"] * 1e6,
+                "pid": 0,
+                "tid": event["thread"],
+                "args": {
+                    "method": event["method"],
+                    "step": event["step"],
+                    "trace_time_ms": event["trace_time"] * 1e3,
+                    "eval_time_ms": event["eval_time"] * 1e3,
+                    "output_bytes": event["output_bytes"],
+                },
+            }
+            for event in self.events
+        ]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+    @staticmethod
+    def _module_classes(package: str) -> list[type]:
+        classes = []
+        pending = [nn.Module]
+        while pending:
+            cls = pending.pop()
+            pending.extend(cls.__subclasses__())
+            if cls.__module__.startswith(package) and cls not in classes:
+                classes.append(cls)
+        return classes
+
+    @staticmethod
+    def _nbytes(output) -> int:
+        if isinstance(output, mx.array):
+            return output.nbytes
+        if isinstance(output, (list, tuple, dict)):
+            return sum(value.nbytes for _, value in tree_flatten(output) if isinstance(value, mx.array))
+        return 0
@@ -0,0 +1,49 @@
+import math
+from typing import Callable
+
+import mlx.core as mx
+
+from flux_1.sampling.sampler import Sampler
+
+
+class DPMSolverSampler(Sampler):
+    # DPM-Solver++(2M) for flow matching, where the latents at sigma are (1 - sigma) * image + sigma * noise
+
+    def __init__(self):
+        self._previous_denoised = None
+        self._previous_h = None
+
+    def step(
+            self,
+            t: int,
+            latents: mx.array,
+            noise: mx.array,
+            sigmas: list[float],
+            predict: Callable[[int, mx.array], mx.array],
+    ) -> mx.array:
+        sigma = sigmas[t]
+        sigma_next = sigmas[t + 1]
+        denoised = latents - sigma * noise
+
+        # The last step goes to sigma 0, which is the predicted image itself
+        if sigma_next == 0:
+            return denoised
+
+        h = DPMSolverSampler._log_snr(sigma_next) - DPMSolverSampler._log_snr(sigma)
+        if self._previous_denoised is None:
+            correction = denoised
+        else:
+            # Second order: extrapolate the predicted image from the previous step
+            r = self._previous_h / h
+            correction = (1 + 1 / (2 * r)) * denoised - (1 / (2 * r)) * self._previous_denoised
+        self._previous_denoised = denoised
+        self._previous_h = h
+
+        return (sigma_next / sigma) * latents - (1 - sigma_next) * math.expm1(-h) * correction
+
+    @staticmethod
+    def _log_snr(sigma: float) -> float:
+        # Half the log signal to noise ratio, -inf at pure noise
+        if sigma >= 1:
+            return -math.inf
+        return math.log((1 - sigma) / sigma)
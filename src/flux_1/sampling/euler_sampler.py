@@ -0,0 +1,19 @@
+from typing import Callable
+
+import mlx.core as mx
+
+from flux_1.sampling.sampler import Sampler
+
+
+class EulerSampler(Sampler):
+
+    def step(
+            self,
+            t: int,
+            latents: mx.array,
+            noise: mx.array,
+            sigmas: list[float],
+            predict: Callable[[int, mx.array], mx.array],
+    ) -> mx.array:
+        dt = sigmas[t + 1] - sigmas[t]
+        return latents + noise * dt
@@ -0,0 +1,27 @@
+from typing import Callable
+
+import mlx.core as mx
+
+from flux_1.sampling.sampler import Sampler
+
+
+class HeunSampler(Sampler):
+
+    def step(
+            self,
+            t: int,
+            latents: mx.array,
+            noise: mx.array,
+            sigmas: list[float],
+            predict: Callable[[int, mx.array], mx.array],
+    ) -> mx.array:
+        dt = sigmas[t + 1] - sigmas[t]
+        euler_latents = latents + noise * dt
+
+        # The last step goes to sigma 0, where there is no velocity to correct with
+        if t + 1 == len(sigmas) - 1:
+            return euler_latents
+
+        # Second order: average the velocities at both ends of the step
+        next_noise = predict(t + 1, euler_latents)
+        return latents + (noise + next_noise) * (dt / 2)
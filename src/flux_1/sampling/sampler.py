@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+from typing import Callable
+
+import mlx.core as mx
+
+
+class Sampler(ABC):
+
+    @abstractmethod
+    def step(
+            self,
+            t: int,
+            latents: mx.array,
+            noise: mx.array,
+            sigmas: list[float],
+            predict: Callable[[int, mx.array], mx.array],
+    ) -> mx.array:
+        # Moves the latents from sigmas[t] to sigmas[t + 1], given the predicted velocity (noise) at sigmas[t].
+        # Higher order samplers can call predict(t + 1, latents) to evaluate the transformer once more
+        pass
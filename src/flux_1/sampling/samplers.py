@@ -0,0 +1,19 @@
+from flux_1.sampling.dpm_solver_sampler import DPMSolverSampler
+from flux_1.sampling.euler_sampler import EulerSampler
+from flux_1.sampling.heun_sampler import HeunSampler
+from flux_1.sampling.sampler import Sampler
+
+
+class Samplers:
+    SAMPLERS = {
+        "euler": EulerSampler,
+        "heun": HeunSampler,
+        "dpm++2m": DPMSolverSampler,
+    }
+
+    @staticmethod
+    def from_name(name: str) -> Sampler:
+        # A new instance per generation, since multistep samplers keep state between steps
+        if name not in Samplers.SAMPLERS:
+            raise ValueError(f"'{name}' is not a valid sampler, choose one of {', '.join(Samplers.SAMPLERS)}")
+        return Samplers.SAMPLERS[name]()
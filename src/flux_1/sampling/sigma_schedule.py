@@ -0,0 +1,28 @@
+import numpy as np
+
+
+class SigmaSchedule:
+    SCHEDULES = ["linear", "karras", "beta"]
+
+    @staticmethod
+    def create(name: str, num_inference_steps: int) -> np.ndarray:
+        # All schedules run from sigma 1 (pure noise) down to 1 / num_inference_steps, the final 0 is added by the caller
+        sigma_min = 1 / num_inference_steps
+        ramp = np.linspace(0, 1, num_inference_steps)
+        if name == "linear":
+            return np.linspace(1.0, sigma_min, num_inference_steps)
+        if name == "karras":
+            # Spaced as in Karras et al. (rho = 7), more steps at low noise
+            rho = 7.0
+            return (1.0 + ramp * (sigma_min ** (1 / rho) - 1.0)) ** rho
+        if name == "beta":
+            # Quantiles of a Beta(0.5, 0.5) distribution, more steps at both ends of the schedule
+            return 1.0 - (1.0 - sigma_min) * np.sin(np.pi / 2 * ramp) ** 2
+        raise ValueError(f"'{name}' is not a valid sigma schedule, choose one of {', '.join(SigmaSchedule.SCHEDULES)}")
+
+    @staticmethod
+    def validate(sigmas: list[float]) -> None:
+        if len(sigmas) == 0 or any(not 0 < sigma <= 1 for sigma in sigmas):
+            raise ValueError("Custom sigmas must be in (0, 1].")
+        if any(a <= b for a, b in zip(sigmas, sigmas[1:])):
+            raise ValueError("Custom sigmas must be strictly decreasing.")
@@ -0,0 +1,54 @@
+import itertools
+import threading
+import time
+
+import PIL.Image
+
+from flux_1.config.config import Config
+
+
+class GenerationRequest:
+    _ids = itertools.count(1)
+
+    def __init__(self, prompt: str, seed: int, config: Config):
+        self.id = next(GenerationRequest._ids)
+        self.prompt = prompt
+        self.seed = seed
+        self.config = config
+        self.submit_time = time.perf_counter()
+        self.start_time = None
+        self.end_time = None
+        self.batch_size = None
+        self.image = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def batch_key(self) -> tuple:
+        # A batch runs with the config of its first request, so only requests with the same value for every
+        # setting of the config (everything but the prompt and seed) are batched together
+        return tuple(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in sorted(vars(self.config).items())
+        )
+
+    @property
+    def queue_time(self) -> float:
+        return self.start_time - self.submit_time
+
+    @property
+    def latency(self) -> float:
+        return self.end_time - self.submit_time
+
+    def start(self, batch_size: int) -> None:
+        self.start_time = time.perf_counter()
+        self.batch_size = batch_size
+
+    def complete(self, image: PIL.Image.Image | None = None, error: Exception | None = None) -> None:
+        self.end_time = time.perf_counter()
+        self.image = image
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import random
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from flux_1.config.config import Config
+from flux_1.flux import Flux1
+from flux_1.post_processing.image_util import ImageUtil
+from flux_1.server.generation_request import GenerationRequest
+from flux_1.server.request_batcher import RequestBatcher
+
+log = logging.getLogger(__name__)
+
+
+class GenerationServer:
+
+    def __init__(
+            self,
+            flux: Flux1,
+            output_dir: str = "server_output",
+            max_batch_size: int = 4,
+            max_wait: float = 0.05,
+    ):
+        self.flux = flux
+        self.output_dir = Path(output_dir)
+        self.batcher = RequestBatcher(max_batch_size=max_batch_size, max_wait=max_wait)
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._batches = 0
+        self._total_latency = 0.0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self.batcher.close()
+        self._worker.join()
+
+    def submit(self, prompt: str, seed: int, config: Config) -> GenerationRequest:
+        request = GenerationRequest(prompt=prompt, seed=seed, config=config)
+        self.batcher.submit(request)
+        return request
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.batcher.queue_depth,
+                "completed": self._completed,
+                "batches": self._batches,
+                "mean_latency": self._total_latency / self._completed if self._completed else None,
+            }
+
+    def _run(self) -> None:
+        # A single worker owns the model, so requests never run concurrently on it
+        while True:
+            batch = self.batcher.next_batch()
+            if not batch:
+                return
+            self._generate(batch)
+
+    def _generate(self, batch: list[GenerationRequest]) -> None:
+        for request in batch:
+            request.start(batch_size=len(batch))
+        try:
+            images = self.flux.generate_images(
+                seeds=[request.seed for request in batch],
+                prompts=[request.prompt for request in batch],
+                config=batch[0].config,
+            )
+        except Exception as e:
+            log.exception("Generation failed")
+            for request in batch:
+                request.complete(error=e)
+            return
+
+        for request, image in zip(batch, images):
+            request.complete(image=image)
+        with self._lock:
+            self._batches += 1
+            self._completed += len(batch)
+            self._total_latency += sum(request.latency for request in batch)
+        log.info(f"Generated a batch of {len(batch)}, {self.batcher.queue_depth} requests queued")
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8000, socket_path: str | None = None) -> None:
+        handler = GenerationServer._handler(self)
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            http_server = _UnixHTTPServer(socket_path, handler)
+            log.info(f"Serving on {socket_path}")
+        else:
+            http_server = ThreadingHTTPServer((host, port), handler)
+            log.info(f"Serving on http://{host}:{port}")
+
+        self.start()
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            self.stop()
+
+    @staticmethod
+    def _handler(server: "GenerationServer") -> type:
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == "/status":
+                    self._send(200, server.status())
+                else:
+                    self._send(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/generate":
+                    self._send(404, {"error": f"Unknown path {self.path}"})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    config = Config(
+                        num_inference_steps=int(body.get("steps", 4)),
+                        width=int(body.get("width", 1024)),
+                        height=int(body.get("height", 1024)),
+                        guidance=float(body.get("guidance", 3.5)),
+                        vae_tiling=bool(body.get("vae_tiling", False)),
+                        sampler=body.get("sampler", "euler"),
+                        sigma_schedule=body.get("sigma_schedule", "linear"),
+                        sigmas=body.get("sigmas"),
+                        trim_t5_padding=bool(body.get("trim_t5_padding", False)),
+                    )
+                    # Requests without a seed get a random one, which the response reports
+                    seed = random.randint(0, 2 ** 32 - 1) if body.get("seed") is None else int(body["seed"])
+                    request = server.submit(prompt=body["prompt"], seed=seed, config=config)
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send(400, {"error": str(e)})
+                    return
+
+                request.wait()
+                if request.error is not None:
+                    self._send(500, {"error": str(request.error)})
+                    return
+
+                path = ImageUtil.write_image(request.image, server.output_dir / f"{request.id}_{request.seed}.png")
+                self._send(200, {
+                    "path": str(path.resolve()),
+                    "seed": request.seed,
+                    "batch_size": request.batch_size,
+                    "queue_time": request.queue_time,
+                    "latency": request.latency,
+                    "queue_depth": server.batcher.queue_depth,
+                })
+
+            def _send(self, code: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def address_string(self):
+                # Unix socket clients have no host address
+                return self.client_address[0] if self.client_address else "unix"
+
+            def log_message(self, format, *args):
+                log.info(format % args)
+
+        return Handler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
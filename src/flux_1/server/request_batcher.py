@@ -0,0 +1,56 @@
+import threading
+import time
+
+from flux_1.server.generation_request import GenerationRequest
+
+
+class RequestBatcher:
+
+    def __init__(self, max_batch_size: int = 4, max_wait: float = 0.05):
+        if max_batch_size < 1:
+            raise ValueError("The max batch size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @property
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def submit(self, request: GenerationRequest) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The batcher is closed")
+            self._queue.append(request)
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def next_batch(self) -> list[GenerationRequest]:
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return []
+                self._condition.wait()
+
+            # The oldest request decides the batch, compatible requests arriving within max_wait join it
+            key = self._queue[0].batch_key
+            deadline = time.perf_counter() + self.max_wait
+            while self._count(key) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [request for request in self._queue if request.batch_key == key][:self.max_batch_size]
+            self._queue = [request for request in self._queue if request not in batch]
+            return batch
+
+    def _count(self, key: tuple) -> int:
+        return sum(1 for request in self._queue if request.batch_key == key)
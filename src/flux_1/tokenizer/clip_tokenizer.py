@@ -1,20 +1,13 @@
-import mlx.core as mx
-from transformers import CLIPTokenizer
+from typing import TYPE_CHECKING
 
+from flux_1.tokenizer.tokenizer import Tokenizer
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase
 
-class TokenizerCLIP:
-    MAX_TOKEN_LENGTH = 77
 
-    def __init__(self, tokenizer: CLIPTokenizer):
-        self.tokenizer = tokenizer
+class TokenizerCLIP(Tokenizer):
+    MAX_TOKEN_LENGTH = 77
 
-    def tokenize(self, prompt: str) -> mx.array:
-        return self.tokenizer(
-            [prompt],
-            padding="max_length",
-            max_length=TokenizerCLIP.MAX_TOKEN_LENGTH,
-            truncation=True,
-            return_length=False,
-            return_overflowing_tokens=False,
-            return_tensors="mlx",
-        ).input_ids
+    def __init__(self, tokenizer: "PreTrainedTokenizerBase", cache_size: int = 1024):
+        super().__init__(tokenizer, max_length=TokenizerCLIP.MAX_TOKEN_LENGTH, cache_size=cache_size)
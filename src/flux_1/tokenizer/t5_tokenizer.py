@@ -1,20 +1,26 @@
-import mlx.core as mx
-from transformers import T5Tokenizer
+from typing import TYPE_CHECKING
 
+from flux_1.tokenizer.tokenizer import Tokenizer
 
-class TokenizerT5:
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase
 
-    def __init__(self, tokenizer: T5Tokenizer, max_length: int = 256):
-        self.tokenizer = tokenizer
-        self.max_length = max_length
 
-    def tokenize(self, prompt: str) -> mx.array:
-        return self.tokenizer(
-            [prompt],
-            padding="max_length",
-            max_length=self.max_length,
-            truncation=True,
-            return_length=False,
-            return_overflowing_tokens=False,
-            return_tensors="mlx",
-        ).input_ids
+class TokenizerT5(Tokenizer):
+    # Sequence lengths prompts are padded to when the padding is trimmed, few of them so that compiled shapes get reused
+    LENGTH_BUCKETS = [64, 128, 256, 512]
+
+    def __init__(self, tokenizer: "PreTrainedTokenizerBase", max_length: int = 256, cache_size: int = 1024):
+        super().__init__(tokenizer, max_length=max_length, cache_size=cache_size)
+
+    def bucket_length(self, prompts: list[str]) -> int:
+        # The smallest bucket that fits the longest prompt (including its end token) without truncating it
+        num_tokens = max(len(token_ids) for token_ids in self.token_ids(prompts))
+        return TokenizerT5.length_bucket(num_tokens, self.max_length)
+
+    @staticmethod
+    def length_bucket(num_tokens: int, max_length: int) -> int:
+        for length in TokenizerT5.LENGTH_BUCKETS:
+            if num_tokens <= length < max_length:
+                return length
+        return max_length
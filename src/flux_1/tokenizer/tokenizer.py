@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import mlx.core as mx
+import numpy as np
+
+if TYPE_CHECKING:
+    # Only for the annotations, importing transformers takes about a second
+    from transformers import PreTrainedTokenizerBase
+
+
+class Tokenizer:
+
+    def __init__(self, tokenizer: "PreTrainedTokenizerBase", max_length: int, cache_size: int = 1024):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._token_ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tokenize(self, prompts: list[str], length: int | None = None) -> (mx.array, mx.array):
+        # (B, length) token ids padded to the same length, and the (B,) number of tokens of each prompt before padding
+        length = self.max_length if length is None else length
+        rows = [Tokenizer._truncate(token_ids, length) for token_ids in self.token_ids(prompts)]
+        tokens = np.full((len(rows), length), self.tokenizer.pad_token_id, dtype=np.int32)
+        for i, row in enumerate(rows):
+            tokens[i, :len(row)] = row
+        return mx.array(tokens), mx.array([len(row) for row in rows], dtype=mx.int32)
+
+    def token_ids(self, prompts: list[str]) -> list[list[int]]:
+        # Unpadded token ids, truncated to max_length. Repeated prompts come from the cache, the others are tokenized in one call
+        with self._lock:
+            cached = {prompt: self._token_ids.get(prompt) for prompt in prompts}
+            for prompt, token_ids in cached.items():
+                if token_ids is not None:
+                    self._token_ids.move_to_end(prompt)
+        missing = [prompt for prompt, token_ids in cached.items() if token_ids is None]
+        if missing:
+            encoded = self.tokenizer(missing, truncation=True, max_length=self.max_length).input_ids
+            cached.update(zip(missing, encoded))
+        with self._lock:
+            self.hits += len(prompts) - len(missing)
+            self.misses += len(missing)
+            for prompt in missing:
+                self._token_ids[prompt] = cached[prompt]
+            while len(self._token_ids) > self.cache_size:
+                self._token_ids.popitem(last=False)
+        return [cached[prompt] for prompt in prompts]
+
+    @staticmethod
+    def _truncate(token_ids: list[int], length: int) -> list[int]:
+        # The same as truncating while tokenizing, the end token is kept
+        if len(token_ids) <= length:
+            return token_ids
+        return token_ids[:length - 1] + token_ids[-1:]
@@ -1,40 +1,30 @@
 from pathlib import Path
 
-import transformers
-from huggingface_hub import snapshot_download
-
 from flux_1.tokenizer.clip_tokenizer import TokenizerCLIP
-from flux_1.tokenizer.t5_tokenizer import TokenizerT5
 
 
 class TokenizerHandler:
-
-    def __init__(self, repo_id: str, max_t5_length: int = 256):
-        root_path = TokenizerHandler._download_or_get_cached_tokenizers(repo_id)
-
-        self.clip = transformers.CLIPTokenizer.from_pretrained(
+    # The files the tokenizers are loaded from in the Hugging Face repo
+    FILES = [
+        "tokenizer/tokenizer_config.json",
+        "tokenizer/vocab.json",
+        "tokenizer/merges.txt",
+        "tokenizer_2/tokenizer_config.json",
+        "tokenizer_2/spiece.model",
+    ]
+
+    def __init__(self, root_path: Path, max_t5_length: int = 256):
+        # Imported here, transformers alone takes about a second to import
+        import transformers
+
+        # The Rust backed fast tokenizers, loaded from the same files (tokenizer.json, or converted from the vocabulary)
+        self.clip = transformers.CLIPTokenizerFast.from_pretrained(
             pretrained_model_name_or_path=root_path / "tokenizer",
             local_files_only=True,
             max_length=TokenizerCLIP.MAX_TOKEN_LENGTH
         )
-        self.t5 = transformers.T5Tokenizer.from_pretrained(
+        self.t5 = transformers.T5TokenizerFast.from_pretrained(
             pretrained_model_name_or_path=root_path / "tokenizer_2",
             local_files_only=True,
             max_length=max_t5_length
         )
-
-    @staticmethod
-    def load_from_disk_or_huggingface(repo_id: str, max_t5_length: int = 256) -> "TokenizerHandler":
-        return TokenizerHandler(repo_id, max_t5_length)
-
-    @staticmethod
-    def _download_or_get_cached_tokenizers(repo_id: str) -> Path:
-        return Path(
-            snapshot_download(
-                repo_id=repo_id,
-                allow_patterns=[
-                    "tokenizer/**",
-                    "tokenizer_2/**"
-                ]
-            )
-        )
@@ -0,0 +1,84 @@
+import logging
+from pathlib import Path
+
+import mlx.core as mx
+from mlx import nn
+
+from flux_1.models.text_encoder.clip_encoder.clip_encoder import CLIPEncoder
+from flux_1.models.text_encoder.t5_encoder.t5_encoder import T5Encoder
+from flux_1.models.transformer.transformer import Transformer
+from flux_1.models.vae.vae import VAE
+from flux_1.weights.model_saver import ModelSaver
+from flux_1.weights.quantization_util import QuantizationUtil
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+from flux_1.weights.weight_handler import WeightHandler
+
+log = logging.getLogger(__name__)
+
+
+class ComponentLoader:
+
+    def __init__(
+            self,
+            weight_handler: WeightHandler,
+            quantize: int | None = None,
+            quantize_group_size: int = QuantizationUtil.DEFAULT_GROUP_SIZE,
+            offload_path: str | None = None,
+            fused_projections: bool = True,
+    ):
+        self.weight_handler = weight_handler
+        self.quantize = quantize
+        self.quantize_group_size = quantize_group_size
+        self.offload_path = None if offload_path is None else Path(offload_path)
+        self.fused_projections = fused_projections
+        self._offloaded = set()
+
+    def load(self, component: str) -> nn.Module:
+        if component in self._offloaded:
+            weights = WeightHandler.load_saved(self.offload_path / SavedModelMetadata.FILES[component])
+            stored_quantize = self.quantize
+        else:
+            weights = self.weight_handler.load(component, self.fused_projections)
+            stored_quantize = self.weight_handler.quantize
+
+        # The number of blocks and layers is the one of the weights
+        if component == WeightHandler.VAE:
+            model = VAE(weights)
+        elif component == WeightHandler.CLIP_ENCODER:
+            model = CLIPEncoder(weights, num_encoder_layers=len(weights["text_model"]["encoder"]["layers"]))
+        elif component == WeightHandler.TRANSFORMER:
+            model = Transformer(
+                weights,
+                stored_quantize,
+                self.quantize_group_size,
+                num_transformer_blocks=len(weights["transformer_blocks"]),
+                num_single_transformer_blocks=len(weights["single_transformer_blocks"]),
+            )
+        elif component == WeightHandler.T5_ENCODER:
+            model = T5Encoder(weights, stored_quantize, self.quantize_group_size, num_blocks=len(weights["t5_blocks"]))
+        else:
+            raise ValueError(f"'{component}' is not a valid model component")
+
+        # Quantize the two large models, the VAE and CLIP are kept in full precision
+        if component in (WeightHandler.TRANSFORMER, WeightHandler.T5_ENCODER) and self.quantize is not None and stored_quantize is None:
+            QuantizationUtil.quantize(model, bits=self.quantize, group_size=self.quantize_group_size)
+
+        # Materialize the (lazy) loaded, converted and quantized weights now, so that the first forward pass does not pay
+        # for loading them, and so that other threads can use the model, a lazy array is bound to the thread it was made in
+        mx.eval(model.parameters())
+        return model
+
+    def release(self, component: str, model: nn.Module) -> None:
+        # Converted weights are written once so that reloading them later is only a memory-mapped read
+        if self.offload_path is not None and not self.weight_handler.is_saved_model and component not in self._offloaded:
+            self.offload_path.mkdir(parents=True, exist_ok=True)
+            ModelSaver.save_weights(model, self.offload_path / SavedModelMetadata.FILES[component])
+            self._offloaded.add(component)
+            log.info(f"Offloaded {component} to {self.offload_path}")
+
+    @staticmethod
+    def clear_cache() -> None:
+        if hasattr(mx, "clear_cache"):
+            mx.clear_cache()
+        else:
+            mx.metal.clear_cache()
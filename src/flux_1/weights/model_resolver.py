@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+from flux_1.tokenizer.tokenizer_handler import TokenizerHandler
+from flux_1.weights.weight_handler import WeightHandler
+
+log = logging.getLogger(__name__)
+
+
+class ModelResolver:
+    MANIFEST_ENV = "FLUX_MODEL_MANIFEST"
+    # The parts of the Hugging Face repos that are used, the weights and the tokenizers
+    ALLOW_PATTERNS = [
+        "tokenizer/**",
+        "tokenizer_2/**",
+        "text_encoder/*.safetensors",
+        "text_encoder_2/*.safetensors",
+        "transformer/*.safetensors",
+        "vae/*.safetensors",
+    ]
+
+    @staticmethod
+    def resolve(repo_id: str, alias: str, manifest_path: str | None = None, offline: bool = False) -> Path:
+        # A model directory from the manifest, else a complete snapshot in the Hugging Face cache (read straight from disk),
+        # and only then the hub client, which is not even imported before
+        manifest_path = manifest_path or os.environ.get(ModelResolver.MANIFEST_ENV)
+        offline = offline or ModelResolver.is_offline()
+        if manifest_path:
+            path = ModelResolver.from_manifest(Path(manifest_path), repo_id, alias)
+            if path is not None:
+                return path
+
+        path = ModelResolver.cached_snapshot(repo_id)
+        if path is not None:
+            return path
+
+        if offline:
+            raise FileNotFoundError(
+                f"'{repo_id}' is neither in a model manifest nor completely in the Hugging Face cache, and downloading is disabled. "
+                f"Pass a local model path, or list it in a manifest (--manifest or {ModelResolver.MANIFEST_ENV})."
+            )
+        return ModelResolver.download(repo_id)
+
+    @staticmethod
+    def is_offline() -> bool:
+        return os.environ.get("HF_HUB_OFFLINE", "").lower() in ("1", "true", "yes", "on")
+
+    @staticmethod
+    def from_manifest(manifest_path: Path, repo_id: str, alias: str) -> Path | None:
+        # A JSON object from model alias or repo id to a model directory, relative paths are relative to the manifest
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        entry = manifest.get(alias, manifest.get(repo_id))
+        if entry is None:
+            log.info(f"'{alias}' is not in the model manifest {manifest_path}")
+            return None
+        path = manifest_path.parent / entry
+        if not path.is_dir():
+            raise FileNotFoundError(f"The model manifest {manifest_path} lists '{path}' for '{alias}', which is not a directory")
+        return path
+
+    @staticmethod
+    def cached_snapshot(repo_id: str) -> Path | None:
+        # The same layout snapshot_download writes: models--{org}--{name}/refs/main holds the commit of snapshots/{commit}
+        repo_path = ModelResolver._hub_cache() / f"models--{repo_id.replace('/', '--')}"
+        ref_path = repo_path / "refs" / "main"
+        if not ref_path.is_file():
+            return None
+        path = repo_path / "snapshots" / ref_path.read_text().strip()
+        # An incomplete snapshot (only the tokenizers, or an interrupted download) is left to snapshot_download to complete
+        files = TokenizerHandler.FILES + [file for component_files in WeightHandler.FILES.values() for file in component_files]
+        missing = [file for file in files if not (path / file).is_file()]
+        if missing:
+            log.info(f"The cached snapshot of '{repo_id}' is missing {', '.join(missing)}")
+            return None
+        return path
+
+    @staticmethod
+    def download(repo_id: str) -> Path:
+        from huggingface_hub import snapshot_download
+
+        return Path(snapshot_download(repo_id=repo_id, allow_patterns=ModelResolver.ALLOW_PATTERNS))
+
+    @staticmethod
+    def _hub_cache() -> Path:
+        if "HF_HUB_CACHE" in os.environ:
+            return Path(os.environ["HF_HUB_CACHE"])
+        if "HF_HOME" in os.environ:
+            return Path(os.environ["HF_HOME"]) / "hub"
+        return Path.home() / ".cache" / "huggingface" / "hub"
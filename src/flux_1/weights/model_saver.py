@@ -0,0 +1,40 @@
+import logging
+from pathlib import Path
+
+import mlx.core as mx
+from mlx import nn
+from mlx.utils import tree_flatten
+
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+
+log = logging.getLogger(__name__)
+
+
+class ModelSaver:
+
+    @staticmethod
+    def save_model(flux, path: str) -> None:
+        root_path = Path(path)
+        root_path.mkdir(parents=True, exist_ok=True)
+
+        ModelSaver.save_weights(flux.clip_text_encoder, root_path / SavedModelMetadata.CLIP_ENCODER_FILE)
+        ModelSaver.save_weights(flux.t5_text_encoder, root_path / SavedModelMetadata.T5_ENCODER_FILE)
+        ModelSaver.save_weights(flux.vae, root_path / SavedModelMetadata.VAE_FILE)
+        ModelSaver.save_weights(flux.transformer, root_path / SavedModelMetadata.TRANSFORMER_FILE)
+
+        # Keep the tokenizers next to the weights so that the directory is self-contained
+        flux.clip_tokenizer.tokenizer.save_pretrained(root_path / "tokenizer")
+        flux.t5_tokenizer.tokenizer.save_pretrained(root_path / "tokenizer_2")
+
+        # The metadata is written last, a directory without it is an incomplete save
+        SavedModelMetadata(
+            model_name=flux.model_config.model_name,
+            quantize=flux.quantize,
+            quantize_group_size=flux.quantize_group_size if flux.quantize is not None else None,
+        ).write(root_path)
+        log.info(f"Model saved successfully at: {root_path}")
+
+    @staticmethod
+    def save_weights(model: nn.Module, path: Path) -> None:
+        weights = dict(tree_flatten(model.parameters()))
+        mx.save_safetensors(str(path), weights)
@@ -0,0 +1,27 @@
+from mlx import nn
+
+
+class QuantizationUtil:
+    SUPPORTED_BITS = (4, 8)
+    DEFAULT_GROUP_SIZE = 64
+    # Only the attention and MLP projections inside these blocks are quantized, they hold most of the weights. The
+    # embedders, the AdaLN modulations (the norm linears) and the output layers stay in full precision
+    QUANTIZED_BLOCKS = ("transformer_blocks", "single_transformer_blocks", "t5_blocks")
+
+    @staticmethod
+    def quantize(module: nn.Module, bits: int, group_size: int = DEFAULT_GROUP_SIZE) -> None:
+        if bits not in QuantizationUtil.SUPPORTED_BITS:
+            raise ValueError(f"Quantization to {bits} bits is not supported, use one of {QuantizationUtil.SUPPORTED_BITS}")
+        nn.quantize(
+            module,
+            group_size=group_size,
+            bits=bits,
+            class_predicate=lambda path, m: QuantizationUtil._is_quantizable(path, m, group_size),
+        )
+
+    @staticmethod
+    def _is_quantizable(path: str, module: nn.Module, group_size: int) -> bool:
+        if not isinstance(module, nn.Linear) or module.weight.shape[-1] % group_size != 0:
+            return False
+        parts = path.split(".")
+        return parts[0] in QuantizationUtil.QUANTIZED_BLOCKS and not any(part.startswith("norm") for part in parts)
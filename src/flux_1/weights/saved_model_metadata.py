@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+
+class SavedModelMetadata:
+    FILE = "flux_model.json"
+    CLIP_ENCODER_FILE = "text_encoder.safetensors"
+    T5_ENCODER_FILE = "text_encoder_2.safetensors"
+    VAE_FILE = "vae.safetensors"
+    TRANSFORMER_FILE = "transformer.safetensors"
+    FILES = {
+        "clip_encoder": CLIP_ENCODER_FILE,
+        "t5_encoder": T5_ENCODER_FILE,
+        "vae": VAE_FILE,
+        "transformer": TRANSFORMER_FILE,
+    }
+    FORMAT_VERSION = 1
+
+    def __init__(self, model_name: str, quantize: int | None = None, quantize_group_size: int | None = None):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.quantize_group_size = quantize_group_size
+
+    @staticmethod
+    def read(root_path: Path) -> "SavedModelMetadata":
+        file_path = root_path / SavedModelMetadata.FILE
+        if not file_path.exists():
+            raise FileNotFoundError(f"'{root_path}' is not a saved model, '{SavedModelMetadata.FILE}' is missing")
+        with open(file_path) as f:
+            metadata = json.load(f)
+        if metadata.get("format_version") != SavedModelMetadata.FORMAT_VERSION:
+            raise ValueError(f"Unsupported saved model format version {metadata.get('format_version')} in '{file_path}'")
+        return SavedModelMetadata(
+            model_name=metadata["model_name"],
+            quantize=metadata.get("quantize"),
+            quantize_group_size=metadata.get("quantize_group_size"),
+        )
+
+    def write(self, root_path: Path) -> None:
+        with open(root_path / SavedModelMetadata.FILE, "w") as f:
+            json.dump(
+                {
+                    "format_version": SavedModelMetadata.FORMAT_VERSION,
+                    "model_name": self.model_name,
+                    "quantize": self.quantize,
+                    "quantize_group_size": self.quantize_group_size,
+                },
+                f,
+                indent=2,
+            )
@@ -1,36 +1,120 @@
 from pathlib import Path
 
 import mlx.core as mx
-from huggingface_hub import snapshot_download
 from mlx.utils import tree_unflatten
 
 from flux_1.config.config import Config
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
 
 
 class WeightHandler:
+    CLIP_ENCODER = "clip_encoder"
+    T5_ENCODER = "t5_encoder"
+    VAE = "vae"
+    TRANSFORMER = "transformer"
+    # The files of each component in the Hugging Face repo
+    FILES = {
+        CLIP_ENCODER: ["text_encoder/model.safetensors"],
+        T5_ENCODER: [
+            "text_encoder_2/model-00001-of-00002.safetensors",
+            "text_encoder_2/model-00002-of-00002.safetensors",
+        ],
+        VAE: ["vae/diffusion_pytorch_model.safetensors"],
+        TRANSFORMER: [
+            "transformer/diffusion_pytorch_model-00001-of-00003.safetensors",
+            "transformer/diffusion_pytorch_model-00002-of-00003.safetensors",
+            "transformer/diffusion_pytorch_model-00003-of-00003.safetensors",
+        ],
+    }
+
+    def __init__(
+            self,
+            root_path: Path,
+            is_saved_model: bool = False,
+            quantize: int | None = None,
+            quantize_group_size: int | None = None,
+    ):
+        self.root_path = root_path
+        self.is_saved_model = is_saved_model
+
+        # Set when the transformer and T5 weights were saved already quantized
+        self.quantize = quantize
+        self.quantize_group_size = quantize_group_size
 
-    def __init__(self, repo_id: str):
-        root_path = WeightHandler._download_or_get_cached_weights(repo_id)
+    @staticmethod
+    def load_from_path(root_path: Path) -> "WeightHandler":
+        # Either a model saved with save.py, or a directory laid out like the Hugging Face repo
+        if (root_path / SavedModelMetadata.FILE).exists():
+            return WeightHandler.load_from_saved_model(str(root_path))
+        return WeightHandler(root_path)
 
-        self.clip_encoder = WeightHandler._clip_encoder(
-            weights=WeightHandler._load(root_path / "text_encoder/model.safetensors")
-        )
-        self.t5_encoder = WeightHandler._t5_encoder(
-            weights_1=WeightHandler._load(root_path / "text_encoder_2/model-00001-of-00002.safetensors"),
-            weights_2=WeightHandler._load(root_path / "text_encoder_2/model-00002-of-00002.safetensors"),
-        )
-        self.vae = WeightHandler._vae(
-            weights=WeightHandler._load(root_path / "vae/diffusion_pytorch_model.safetensors")
-        )
-        self.transformer = WeightHandler._transformer(
-            weights_1=WeightHandler._load(root_path / "transformer/diffusion_pytorch_model-00001-of-00003.safetensors"),
-            weights_2=WeightHandler._load(root_path / "transformer/diffusion_pytorch_model-00002-of-00003.safetensors"),
-            weights_3=WeightHandler._load(root_path / "transformer/diffusion_pytorch_model-00003-of-00003.safetensors"),
+    @staticmethod
+    def load_from_saved_model(path: str) -> "WeightHandler":
+        root_path = Path(path)
+        metadata = SavedModelMetadata.read(root_path)
+        return WeightHandler(
+            root_path=root_path,
+            is_saved_model=True,
+            quantize=metadata.quantize,
+            quantize_group_size=metadata.quantize_group_size,
         )
 
+    def load(self, component: str, fused_projections: bool = True) -> dict:
+        weights = self._load_converted(component)
+        if fused_projections:
+            weights = WeightHandler.fuse_projections(component, weights)
+        return weights
+
+    def _load_converted(self, component: str) -> dict:
+        # Saved weights are already converted to the MLX layout and dtype, so they are used as-is
+        if self.is_saved_model:
+            return WeightHandler.load_saved(self.root_path / SavedModelMetadata.FILES[component])
+
+        if component not in WeightHandler.FILES:
+            raise ValueError(f"'{component}' is not a valid model component")
+        weights = [WeightHandler._load(self.root_path / file) for file in WeightHandler.FILES[component]]
+        if component == WeightHandler.CLIP_ENCODER:
+            return WeightHandler._clip_encoder(weights=weights[0])
+        if component == WeightHandler.T5_ENCODER:
+            return WeightHandler._t5_encoder(weights_1=weights[0], weights_2=weights[1])
+        if component == WeightHandler.VAE:
+            return WeightHandler._vae(weights=weights[0])
+        return WeightHandler._transformer(weights_1=weights[0], weights_2=weights[1], weights_3=weights[2])
+
     @staticmethod
-    def load_from_disk_or_huggingface(repo_id: str) -> "WeightHandler":
-        return WeightHandler(repo_id)
+    def fuse_projections(component: str, weights: dict) -> dict:
+        # Linears applied to the same input are concatenated along their outputs, so that each runs as a single
+        # matmul. Already fused weights (e.g. from a saved model) are left as they are.
+        if component == WeightHandler.TRANSFORMER:
+            for block in weights["transformer_blocks"]:
+                attn = block["attn"]
+                if "to_q" in attn:
+                    attn["to_qkv"] = WeightHandler._concat(attn.pop("to_q"), attn.pop("to_k"), attn.pop("to_v"))
+                    attn["add_qkv_proj"] = WeightHandler._concat(attn.pop("add_q_proj"), attn.pop("add_k_proj"), attn.pop("add_v_proj"))
+            for block in weights["single_transformer_blocks"]:
+                attn = block["attn"]
+                if "to_q" in attn:
+                    block["proj_qkv_mlp"] = WeightHandler._concat(attn.pop("to_q"), attn.pop("to_k"), attn.pop("to_v"), block.pop("proj_mlp"))
+        elif component == WeightHandler.T5_ENCODER:
+            for block in weights["t5_blocks"]:
+                attention = block["attention"]["SelfAttention"]
+                if "q" in attention:
+                    attention["qkv"] = WeightHandler._concat(attention.pop("q"), attention.pop("k"), attention.pop("v"))
+        elif component == WeightHandler.CLIP_ENCODER:
+            for layer in weights["text_model"]["encoder"]["layers"]:
+                attention = layer["self_attn"]
+                if "q_proj" in attention:
+                    attention["qkv_proj"] = WeightHandler._concat(attention.pop("q_proj"), attention.pop("k_proj"), attention.pop("v_proj"))
+        return weights
+
+    @staticmethod
+    def _concat(*layers: dict) -> dict:
+        # Also works for quantized layers, whose scales and biases are laid out per output row as well
+        return {key: mx.concatenate([layer[key] for layer in layers], axis=0) for key in layers[0]}
+
+    @staticmethod
+    def load_saved(path: Path) -> dict:
+        return tree_unflatten(list(mx.load(str(path)).items()))
 
     @staticmethod
     def _load(path: Path) -> list[dict]:
@@ -113,17 +197,3 @@ class WeightHandler:
             value = value.transpose(0, 2, 3, 1)
         value = value.reshape(-1).reshape(value.shape).astype(Config.precision)
         return [(key, value)]
-
-    @staticmethod
-    def _download_or_get_cached_weights(repo_id: str) -> Path:
-        return Path(
-            snapshot_download(
-                repo_id=repo_id,
-                allow_patterns=[
-                    "text_encoder/*.safetensors",
-                    "text_encoder_2/*.safetensors",
-                    "transformer/*.safetensors",
-                    "vae/*.safetensors",
-                ]
-            )
-        )
@@ -0,0 +1,88 @@
+import gc
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import mlx.core as mx
+import pytest
+import transformers
+
+from flux_1.cache.prompt_cache import PromptCache
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+from flux_1.flux import Flux1
+from flux_1.models.text_encoder.clip_encoder.clip_encoder import CLIPEncoder
+from flux_1.models.text_encoder.t5_encoder.t5_encoder import T5Encoder
+from flux_1.models.transformer.transformer import Transformer
+from flux_1.models.vae.vae import VAE
+from flux_1.weights.component_loader import ComponentLoader
+from flux_1.weights.model_saver import ModelSaver
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+
+PROMPTS = ["a red cube", "a blue sphere"]
+WORDS = ["a", "red", "blue", "cube", "sphere"]
+
+
+def tiny_t5_tokenizer():
+    # A vocabulary of the prompt words, each word is one token and </s> (id 1) ends every prompt
+    return transformers.T5TokenizerFast(vocab=[("<pad>", 0.0), ("</s>", 0.0), ("<unk>", 0.0)] + [(f"▁{word}", -1.0) for word in WORDS], extra_ids=0)
+
+
+def tiny_clip_tokenizer():
+    # The same words, every prompt starts with <|startoftext|> (id 0) and ends with <|endoftext|> (id 1)
+    return transformers.CLIPTokenizerFast(vocab={"<|startoftext|>": 0, "<|endoftext|>": 1, **{f"{word}</w>": i + 2 for i, word in enumerate(WORDS)}}, merges=[])
+
+
+def save_tiny_tokenizers(path) -> None:
+    # Saved like ModelSaver saves the real tokenizers
+    tiny_t5_tokenizer().save_pretrained(path / "tokenizer_2")
+    tiny_clip_tokenizer().save_pretrained(path / "tokenizer")
+
+
+def save_tiny_model(path) -> None:
+    # schnell with random weights and one block or layer of each kind, saved in the precision of the converted weights
+    # the way save.py saves a model. One model at a time, the transformer alone takes 1GB
+    mx.random.seed(0)
+    models = {
+        SavedModelMetadata.TRANSFORMER_FILE: lambda: Transformer({"time_text_embed": {}}, num_transformer_blocks=1, num_single_transformer_blocks=1),
+        SavedModelMetadata.T5_ENCODER_FILE: lambda: T5Encoder({}, num_blocks=1),
+        SavedModelMetadata.CLIP_ENCODER_FILE: lambda: CLIPEncoder({}, num_encoder_layers=1),
+        SavedModelMetadata.VAE_FILE: lambda: VAE({}),
+    }
+    for file, create in models.items():
+        model = create()
+        model.set_dtype(Config.precision)
+        ModelSaver.save_weights(model, path / file)
+    save_tiny_tokenizers(path)
+    SavedModelMetadata(model_name=ModelConfig.FLUX1_SCHNELL.model_name).write(path)
+
+
+@pytest.fixture(autouse=True)
+def release_memory():
+    # Several tests build layers of full width, their buffers are returned before the next test instead of staying in
+    # the MLX cache next to the session's tiny model
+    yield
+    gc.collect()
+    ComponentLoader.clear_cache()
+
+
+@pytest.fixture(scope="session")
+def tiny_flux_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tiny_flux")
+    save_tiny_model(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def tiny_flux(tiny_flux_path) -> Flux1:
+    # Loaded like any saved model. The prompt embeddings are already cached, so the text encoders (with random weights
+    # and made up vocabularies) are not needed to generate the prompts, and they are short to keep the transformer fast
+    prompt_cache = PromptCache()
+    for prompt in PROMPTS:
+        prompt_cache.put(
+            PromptCache.key(model_alias=ModelConfig.FLUX1_SCHNELL.alias, max_sequence_length=ModelConfig.FLUX1_SCHNELL.max_sequence_length, prompt=prompt),
+            mx.random.normal((1, 8, 4096)),
+            mx.random.normal((1, 768)),
+        )
+    return Flux1.from_saved_model(str(tiny_flux_path), prompt_cache=prompt_cache)
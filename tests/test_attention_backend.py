@@ -0,0 +1,107 @@
+import threading
+
+import mlx.core as mx
+import pytest
+
+from flux_1.models.common.attention_backend import AttentionBackend
+from flux_1.models.text_encoder.clip_encoder.clip_sdpa_attention import CLIPSdpaAttention
+from flux_1.models.text_encoder.clip_encoder.clip_text_model import CLIPTextModel
+from flux_1.models.text_encoder.t5_encoder.t5_self_attention import T5SelfAttention
+
+# bf16 keeps about 3 significant digits, and the fused kernel accumulates in a different order than the naive path
+TOLERANCES = {mx.float32: 1e-4, mx.bfloat16: 5e-2}
+
+# A chunk size smaller than every query length, so that the chunked path really splits the queries and the masks
+CHUNK_SIZE = 32
+
+
+def clip_inputs(dtype):
+    # The causal mask of the CLIP text model, 77 tokens with 12 heads of 64
+    query, key, value = (mx.random.normal((2, 12, 77, 64)).astype(dtype) for _ in range(3))
+    mask = CLIPTextModel.create_causal_attention_mask((2, 77, 768))
+    return query, key, value, None, mask
+
+
+def t5_inputs(dtype):
+    # The relative position bias of T5 with scale=1, 64 heads of 64. T5 has the 1/sqrt(d) scaling folded into its
+    # query weights, so the queries are scaled alike to get scores of a realistic size
+    query, key, value = (mx.random.normal((1, 64, 96, 64)) for _ in range(3))
+    query, key, value = (query * 64 ** -0.5).astype(dtype), key.astype(dtype), value.astype(dtype)
+    attention = T5SelfAttention()
+    attention.relative_attention_bias.weight = mx.random.normal((32, 64))
+    return query, key, value, 1.0, attention._compute_bias(seq_length=96)
+
+
+def joint_inputs(dtype):
+    # The joint image and text tokens of the transformer, 24 heads of 128
+    query, key, value = (mx.random.normal((1, 24, 160, 128)).astype(dtype) for _ in range(3))
+    return query, key, value, None, None
+
+
+def vae_inputs(dtype):
+    # The single head VAE mid-block attention over the latent pixels, 512 channels
+    query, key, value = (mx.random.normal((1, 1, 144, 512)).astype(dtype) for _ in range(3))
+    return query, key, value, None, None
+
+
+@pytest.mark.parametrize("backend", [AttentionBackend.FUSED, AttentionBackend.CHUNKED])
+@pytest.mark.parametrize("dtype", [mx.float32, mx.bfloat16])
+@pytest.mark.parametrize("inputs", [clip_inputs, t5_inputs, joint_inputs, vae_inputs])
+def test_matches_naive_attention(backend, dtype, inputs):
+    mx.random.seed(0)
+    query, key, value, scale, mask = inputs(dtype)
+
+    # The naive path in float32 on the same (rounded) inputs, in bf16 the naive path itself is the least accurate one
+    expected = AttentionBackend.attention(
+        *(x.astype(mx.float32) for x in (query, key, value)), scale=scale, mask=mask, backend=AttentionBackend.NAIVE
+    )
+    with AttentionBackend.use(backend, chunk_size=CHUNK_SIZE):
+        actual = AttentionBackend.attention(query, key, value, scale=scale, mask=mask)
+
+    assert actual.shape == expected.shape
+    error = mx.abs(actual.astype(mx.float32) - expected.astype(mx.float32)).max().item()
+    assert error < TOLERANCES[dtype]
+
+
+def t5_self_attention():
+    # The whole T5 attention layer, whose relative position bias is the mask, on 96 tokens
+    attention = T5SelfAttention()
+    hidden_states = mx.random.normal((2, 96, 4096))
+    return attention, lambda: attention.forward(hidden_states)
+
+
+def clip_sdpa_attention():
+    # The whole CLIP attention layer with the causal mask of the text model, on 77 tokens
+    attention = CLIPSdpaAttention()
+    hidden_states = mx.random.normal((2, 77, 768))
+    mask = CLIPTextModel.create_causal_attention_mask(hidden_states.shape)
+    return attention, lambda: attention.forward(hidden_states, mask)
+
+
+@pytest.mark.parametrize("backend", [AttentionBackend.FUSED, AttentionBackend.CHUNKED])
+@pytest.mark.parametrize("layer", [t5_self_attention, clip_sdpa_attention])
+def test_layer_matches_naive_attention(backend, layer):
+    # The backend is selected by AttentionBackend.use, as Flux1 does for the attention_backend of a Config
+    mx.random.seed(0)
+    attention, forward = layer()
+    mx.eval(attention.parameters())
+
+    with AttentionBackend.use(AttentionBackend.NAIVE):
+        expected = forward()
+    with AttentionBackend.use(backend, chunk_size=CHUNK_SIZE):
+        actual = forward()
+
+    assert actual.shape == expected.shape
+    assert mx.abs(actual - expected).max().item() < TOLERANCES[mx.float32] * max(1.0, mx.abs(expected).max().item())
+
+
+def test_backend_only_applies_to_the_calling_thread():
+    seen = []
+    with AttentionBackend.use(AttentionBackend.NAIVE, chunk_size=CHUNK_SIZE):
+        thread = threading.Thread(target=lambda: seen.append(AttentionBackend.current()))
+        thread.start()
+        thread.join()
+        assert AttentionBackend.current() == (AttentionBackend.NAIVE, CHUNK_SIZE)
+
+    assert seen == [(AttentionBackend.FUSED, AttentionBackend.DEFAULT_CHUNK_SIZE)]
+    assert AttentionBackend.current() == (AttentionBackend.FUSED, AttentionBackend.DEFAULT_CHUNK_SIZE)
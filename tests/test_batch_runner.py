@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+
+from conftest import PROMPTS
+from flux_1.batch.batch_job import BatchJob
+from flux_1.batch.batch_runner import BatchRunner
+
+JOBS = [
+    {"prompt": PROMPTS[0], "seed": 1},
+    {"prompt": PROMPTS[1], "seed": 1},
+    {"prompt": PROMPTS[0], "seed": 1},
+    {"prompt": PROMPTS[0], "seed": 2, "output": "named.png"},
+    {"prompt": PROMPTS[1], "seed": 1, "steps": 1},
+]
+
+
+def write_jobs(path, jobs: list[dict]) -> str:
+    # Small images and few steps, to keep the tiny model fast
+    path.write_text("".join(json.dumps({"width": 64, "height": 64, "steps": 2, **job}) + "\n" for job in jobs))
+    return str(path)
+
+
+def record_batches(flux, monkeypatch) -> list[list[tuple]]:
+    batches = []
+    generate_images = flux.generate_images
+
+    def recording_generate_images(seeds, prompts, config):
+        batches.append(list(zip(prompts, seeds)))
+        return generate_images(seeds=seeds, prompts=prompts, config=config)
+
+    monkeypatch.setattr(flux, "generate_images", recording_generate_images)
+    return batches
+
+
+def manifest(output_dir) -> list[dict]:
+    return [json.loads(line) for line in (output_dir / BatchRunner.MANIFEST_FILE).read_text().splitlines()]
+
+
+def test_output_names_are_derived_from_the_job_and_model(tmp_path):
+    job = BatchJob(prompt=PROMPTS[0], seed=1)
+    path = job.output_path(tmp_path, model="schnell")
+
+    assert path == BatchJob(prompt=PROMPTS[0], seed=1).output_path(tmp_path, model="schnell")
+    assert path.name.endswith("_1.png")
+    assert job.output_path(tmp_path, model="dev") != path
+    assert job.output_path(tmp_path, model="schnell-q8") != path
+    for other in [
+        BatchJob(prompt=PROMPTS[1], seed=1),
+        BatchJob(prompt=PROMPTS[0], seed=2),
+        BatchJob(prompt=PROMPTS[0], seed=1, width=512),
+        BatchJob(prompt=PROMPTS[0], seed=1, steps=2),
+        BatchJob(prompt=PROMPTS[0], seed=1, guidance=4.0),
+        BatchJob(prompt=PROMPTS[0], seed=1, sampler="heun"),
+        BatchJob(prompt=PROMPTS[0], seed=1, sigma_schedule="karras"),
+    ]:
+        assert other.output_path(tmp_path, model="schnell") != path
+        assert other.key != job.key
+    assert BatchJob(prompt=PROMPTS[0], seed=1, output="named.png").output_path(tmp_path, model="schnell") == tmp_path / "named.png"
+
+
+def test_jobs_without_a_seed_get_distinct_seeds(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text(json.dumps({"prompt": PROMPTS[0]}) + "\n\n" + json.dumps({"prompt": PROMPTS[0]}) + "\n" + json.dumps({"prompt": PROMPTS[0], "seed": 7}) + "\n")
+
+    assert [job.seed for job in BatchRunner.read_jobs(str(path), base_seed=10)] == [10, 11, 7]
+
+
+def test_rerun_generates_nothing_and_keeps_the_manifest(tiny_flux, tmp_path, monkeypatch):
+    batches = record_batches(tiny_flux, monkeypatch)
+    jobs_path = write_jobs(tmp_path / "jobs.jsonl", JOBS)
+    output_dir = tmp_path / "output"
+
+    summary = BatchRunner(tiny_flux, output_dir=str(output_dir), batch_size=2).run(BatchRunner.read_jobs(jobs_path))
+
+    # The duplicate job is generated once, and only jobs of the same size, steps and guidance share a batch
+    assert (summary["jobs"], summary["skipped"], summary["generated"]) == (5, 1, 4)
+    assert sorted(len(batch) for batch in batches) == [1, 1, 2]
+    records = manifest(output_dir)
+    assert len(records) == 4
+    assert all(Path(record["output"]).exists() for record in records)
+    assert (output_dir / "named.png").exists()
+
+    summary = BatchRunner(tiny_flux, output_dir=str(output_dir), batch_size=2).run(BatchRunner.read_jobs(jobs_path))
+
+    assert (summary["skipped"], summary["generated"]) == (5, 0)
+    assert len(batches) == 3
+    assert manifest(output_dir) == records
+
+
+def test_resume_generates_only_the_missing_images(tiny_flux, tmp_path, monkeypatch):
+    jobs_path = write_jobs(tmp_path / "jobs.jsonl", JOBS[:2])
+    output_dir = tmp_path / "output"
+    BatchRunner(tiny_flux, output_dir=str(output_dir)).run(BatchRunner.read_jobs(jobs_path))
+
+    # An interrupted run: the image of the second job was never written
+    missing = BatchRunner.read_jobs(jobs_path)[1].output_path(output_dir, model=tiny_flux.model_config.alias)
+    missing.unlink()
+    batches = record_batches(tiny_flux, monkeypatch)
+    summary = BatchRunner(tiny_flux, output_dir=str(output_dir)).run(BatchRunner.read_jobs(jobs_path))
+
+    assert batches == [[(PROMPTS[1], 1)]]
+    assert (summary["skipped"], summary["generated"]) == (1, 1)
+    assert missing.exists()
+    # The manifest is appended to
+    assert sorted(record["prompt"] for record in manifest(output_dir)) == sorted([PROMPTS[0], PROMPTS[1], PROMPTS[1]])
+
+
+def test_another_model_does_not_resume_from_the_outputs_of_the_first(tiny_flux, tmp_path, monkeypatch):
+    jobs_path = write_jobs(tmp_path / "jobs.jsonl", JOBS[:1])
+    output_dir = tmp_path / "output"
+    BatchRunner(tiny_flux, output_dir=str(output_dir)).run(BatchRunner.read_jobs(jobs_path))
+
+    # Only the name of the quantized model matters here, its images go next to those of the first run
+    monkeypatch.setattr(tiny_flux, "quantize", 8)
+    summary = BatchRunner(tiny_flux, output_dir=str(output_dir)).run(BatchRunner.read_jobs(jobs_path))
+
+    assert (summary["skipped"], summary["generated"]) == (0, 1)
+    assert [record["model"] for record in manifest(output_dir)] == ["schnell", "schnell-q8"]
+    assert len({record["output"] for record in manifest(output_dir)}) == 2
@@ -0,0 +1,125 @@
+import threading
+
+import mlx.core as mx
+import pytest
+
+from conftest import PROMPTS
+from flux_1.benchmark.stage_benchmark import StageBenchmark
+from flux_1.cache.block_cache import BlockCache
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+from flux_1.config.runtime_config import RuntimeConfig
+
+
+def relative_changes(changes: list[float]) -> list[mx.array]:
+    # Inputs where each differs from the previous one by the given relative L1 change
+    inputs = [mx.ones((1, 4, 8))]
+    for change in changes:
+        inputs.append(inputs[-1] * (1 + change))
+    return inputs
+
+
+def test_block_cache_needs_a_threshold_or_steps():
+    with pytest.raises(ValueError):
+        BlockCache()
+    assert BlockCache.from_config(RuntimeConfig(Config(), ModelConfig.FLUX1_SCHNELL)) is None
+    assert BlockCache.from_config(RuntimeConfig(Config(block_cache_steps=[1]), ModelConfig.FLUX1_SCHNELL)).steps == {1}
+
+
+def test_nothing_is_reused_before_a_full_step():
+    block_cache = BlockCache(steps=[0, 1])
+    assert not block_cache.should_reuse(0, mx.ones((1, 4, 8)))
+    # Without a residual there is nothing to reuse, even for a listed step
+    assert not block_cache.should_reuse(1, mx.ones((1, 4, 8)))
+    assert block_cache.reused_steps == []
+
+
+def test_threshold_accumulation_resets_after_a_full_step():
+    block_cache = BlockCache(threshold=0.25)
+    block_cache.update(mx.zeros((1, 4, 8)))
+
+    reused = [block_cache.should_reuse(t, modulated_input) for t, modulated_input in enumerate(relative_changes([0.1] * 6))]
+
+    # 0.1 and 0.2 stay below the threshold, 0.3 does not and computes step 3 fully, after which the sum starts over
+    assert reused == [False, True, True, False, True, True, False]
+    assert block_cache.reused_steps == [1, 2, 4, 5]
+
+
+def in_thread(fn):
+    result = {}
+
+    def run():
+        try:
+            result["value"] = fn()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def test_listed_steps_do_not_evaluate_the_input():
+    # A lazy array made in another thread cannot be evaluated here, so any evaluation of the input would raise
+    block_cache = BlockCache(steps=[1])
+    block_cache.update(mx.zeros((1, 4, 8)))
+    lazy_input = in_thread(lambda: mx.ones((1, 4, 8)) * 2)
+
+    assert [block_cache.should_reuse(t, lazy_input) for t in range(3)] == [False, True, False]
+    assert block_cache._previous_input is None
+
+
+def test_threshold_steps_can_resume_on_other_threads():
+    # generate_steps_async runs each step on an executor thread, what the cache keeps must be evaluated before that
+    block_cache = BlockCache(threshold=0.25)
+    inputs = relative_changes([0.1] * 4)
+    mx.eval(inputs)
+
+    def step(t: int) -> bool:
+        modulated_input = inputs[t] * 1.0
+        reuse = block_cache.should_reuse(t, modulated_input)
+        if not reuse:
+            block_cache.update(modulated_input * 0)
+        return reuse
+
+    assert [in_thread(lambda t=t: step(t)) for t in range(len(inputs))] == [False, True, True, False, True]
+
+
+def test_no_reused_steps_match_the_uncached_path(tiny_flux):
+    transformer = tiny_flux.transformer
+    config = RuntimeConfig(Config(num_inference_steps=3, width=64, height=64), tiny_flux.model_config)
+    mx.random.seed(0)
+    prompt_embeds = mx.random.normal((1, 8, 4096))
+    pooled_prompt_embeds = mx.random.normal((1, 768))
+    hidden_states = mx.random.normal((1, 16, 64))
+
+    # Neither an empty list of steps nor a threshold below any change ever reuses a step
+    for block_cache in [BlockCache(steps=[]), BlockCache(threshold=1e-9)]:
+        for t in range(config.num_inference_steps):
+            expected = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config)
+            actual = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config, block_cache=block_cache)
+            assert mx.array_equal(actual, expected)
+        assert block_cache.reused_steps == []
+
+
+def test_listed_steps_report_reused_activations(tiny_flux):
+    config = Config(num_inference_steps=4, width=64, height=64, block_cache_steps=[1, 2])
+
+    steps = list(tiny_flux.generate_steps(seeds=[1], prompts=PROMPTS[:1], config=config))
+
+    assert [step.reused_activations for step in steps if not step.is_final] == [False, True, True, False]
+
+
+def test_compare_block_cache_reports_each_threshold(tiny_flux):
+    report = StageBenchmark.from_flux(tiny_flux).compare_block_cache(resolutions=[64], steps=[2], thresholds=[1e-9, 1e9], t5_length=64)
+
+    never, always = report["results"]
+    # A threshold below any change computes every step, and gives the image of the full computation
+    assert (never["threshold"], never["reused_steps"], never["psnr"]) == (1e-9, [], float("inf"))
+    # The first step is always computed
+    assert always["reused_steps"] == [1]
+    assert always["psnr"] < float("inf")
+    assert always["cached_time"] > 0 and always["full_time"] > 0
@@ -0,0 +1,42 @@
+import mlx.core as mx
+from mlx.utils import tree_map
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.models.vae.vae import VAE
+
+TOLERANCE = 1e-4
+
+
+def assert_close(actual: mx.array, expected: mx.array, tolerance: float = TOLERANCE):
+    assert actual.shape == expected.shape
+    assert mx.abs(actual - expected).max().item() <= tolerance * mx.abs(expected).max().item()
+
+
+def test_compiled_decode_follows_weight_updates():
+    mx.random.seed(0)
+    vae = VAE({})
+    latents = mx.random.normal((1, 16, 4, 4))
+    assert_close(vae.decode(latents, compiled=True), vae.decode(latents))
+
+    # New values, then a cast like the one of the benchmark grid, both with the function compiled before
+    vae.update(tree_map(lambda x: x * 1.5, vae.parameters()))
+    assert_close(vae.decode(latents, compiled=True), vae.decode(latents))
+    vae.apply(lambda x: x.astype(mx.float16))
+    assert_close(vae.decode(latents, compiled=True), vae.decode(latents), tolerance=1e-2)
+
+    assert len(vae.compiled_decode.report()) == 1
+
+
+def test_compiled_transformer_step_matches_uncompiled(tiny_flux):
+    transformer = tiny_flux.transformer
+    config = RuntimeConfig(Config(num_inference_steps=2, width=64, height=64), tiny_flux.model_config)
+    prompt_embeds, pooled_prompt_embeds = tiny_flux.encode_prompts(PROMPTS, config)
+    hidden_states = mx.random.normal((2, 16, 64)).astype(config.precision)
+
+    for t in range(config.num_inference_steps):
+        expected = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config)
+        actual = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config, compiled=True)
+        # bfloat16 weights, the compiled graph fuses the elementwise operations in another order
+        assert_close(actual, expected, tolerance=2e-2)
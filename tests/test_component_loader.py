@@ -0,0 +1,33 @@
+import threading
+
+import mlx.core as mx
+
+from flux_1.models.vae.vae import VAE
+from flux_1.weights.component_loader import ComponentLoader
+from flux_1.weights.model_saver import ModelSaver
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+from flux_1.weights.weight_handler import WeightHandler
+
+
+def test_loaded_component_is_usable_from_another_thread(tmp_path):
+    # A lazy weight can only be evaluated on the thread it was created in, so the loader has to evaluate them
+    vae = VAE({})
+    mx.eval(vae.parameters())
+    ModelSaver.save_weights(vae, tmp_path / SavedModelMetadata.VAE_FILE)
+    SavedModelMetadata(model_name="black-forest-labs/FLUX.1-schnell").write(tmp_path)
+    model = ComponentLoader(WeightHandler.load_from_saved_model(str(tmp_path))).load(WeightHandler.VAE)
+
+    result = {}
+
+    def decode():
+        try:
+            decoded = model.decode(mx.zeros((1, 16, 2, 2)))
+            mx.eval(decoded)
+            result["shape"] = decoded.shape
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=decode)
+    thread.start()
+    thread.join()
+    assert result == {"shape": (1, 3, 16, 16)}
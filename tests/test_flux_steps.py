@@ -0,0 +1,34 @@
+import asyncio
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.weights.weight_handler import WeightHandler
+
+CONFIG = Config(num_inference_steps=3, width=64, height=64)
+
+
+def test_async_steps_match_sync_steps(tiny_flux):
+    async def collect():
+        return [step async for step in tiny_flux.generate_steps_async(seeds=[1], prompts=PROMPTS[:1], config=CONFIG)]
+
+    steps = asyncio.run(collect())
+    expected = tiny_flux.generate_images(seeds=[1], prompts=PROMPTS[:1], config=CONFIG)
+
+    assert [step.step for step in steps] == [0, 1, 2, 3]
+    assert steps[-1].images[0].tobytes() == expected[0].tobytes()
+
+
+def test_async_steps_end_the_phase_when_stopped_early(tiny_flux, monkeypatch):
+    ended = []
+    monkeypatch.setattr(tiny_flux, "_end_phase", lambda *components: ended.extend(components))
+
+    async def first_step():
+        steps = tiny_flux.generate_steps_async(seeds=[1], prompts=PROMPTS[:1], config=CONFIG)
+        try:
+            async for step in steps:
+                return step
+        finally:
+            await steps.aclose()
+
+    assert asyncio.run(first_step()).step == 0
+    assert WeightHandler.TRANSFORMER in ended
@@ -0,0 +1,139 @@
+import mlx.core as mx
+import pytest
+from mlx import nn
+
+from flux_1.config.offload_policy import OffloadPolicy
+from flux_1.flux import Flux1
+from flux_1.models.text_encoder.clip_encoder.clip_sdpa_attention import CLIPSdpaAttention
+from flux_1.models.text_encoder.clip_encoder.clip_text_model import CLIPTextModel
+from flux_1.models.text_encoder.t5_encoder.t5_self_attention import T5SelfAttention
+from flux_1.models.transformer.embed_nd import EmbedND
+from flux_1.models.transformer.joint_attention import JointAttention
+from flux_1.models.transformer.single_transformer_block import SingleTransformerBlock
+from flux_1.models.transformer.transformer import Transformer
+from flux_1.weights.component_loader import ComponentLoader
+from flux_1.weights.weight_handler import WeightHandler
+
+# Both paths run in float32, the fused matmul only sums the same products in a different order
+TOLERANCE = 1e-4
+
+
+def rotary_embeddings() -> mx.array:
+    # 8 text tokens and the 16 latent tokens of a 64x64 image
+    ids = mx.concatenate([Transformer._prepare_text_ids(seq_len=8), Transformer._prepare_latent_image_ids(64, 64)], axis=1)
+    return EmbedND().forward(ids)
+
+
+def joint_attention():
+    inputs = (mx.random.normal((2, 16, 3072)), mx.random.normal((2, 8, 3072)), rotary_embeddings())
+    return (
+        JointAttention,
+        lambda params: {"transformer_blocks": [{"attn": params}], "single_transformer_blocks": []},
+        lambda weights: weights["transformer_blocks"][0]["attn"],
+        lambda module: module.forward(*inputs),
+    )
+
+
+def single_transformer_block():
+    hidden_states = mx.random.normal((2, 24, 3072))
+    text_embeddings = mx.random.normal((2, 3072))
+    return (
+        lambda fused_projections: SingleTransformerBlock(0, fused_projections),
+        lambda params: {"transformer_blocks": [], "single_transformer_blocks": [params]},
+        lambda weights: weights["single_transformer_blocks"][0],
+        lambda module: module.forward(hidden_states, module.modulations(text_embeddings), rotary_embeddings()),
+    )
+
+
+def t5_self_attention():
+    hidden_states = mx.random.normal((2, 12, 4096))
+    return (
+        T5SelfAttention,
+        lambda params: {"t5_blocks": [{"attention": {"SelfAttention": params}}]},
+        lambda weights: weights["t5_blocks"][0]["attention"]["SelfAttention"],
+        lambda module: module.forward(hidden_states),
+    )
+
+
+def clip_sdpa_attention():
+    hidden_states = mx.random.normal((2, 77, 768))
+    mask = CLIPTextModel.create_causal_attention_mask(hidden_states.shape)
+    return (
+        CLIPSdpaAttention,
+        lambda params: {"text_model": {"encoder": {"layers": [{"self_attn": params}]}}},
+        lambda weights: weights["text_model"]["encoder"]["layers"][0]["self_attn"],
+        lambda module: module.forward(hidden_states, mask),
+    )
+
+
+COMPONENTS = {
+    joint_attention: WeightHandler.TRANSFORMER,
+    single_transformer_block: WeightHandler.TRANSFORMER,
+    t5_self_attention: WeightHandler.T5_ENCODER,
+    clip_sdpa_attention: WeightHandler.CLIP_ENCODER,
+}
+
+
+def quantize(module: nn.Module, bits: int | None) -> None:
+    if bits is not None:
+        nn.quantize(module, group_size=64, bits=bits, class_predicate=lambda _, m: isinstance(m, nn.Linear))
+
+
+def assert_outputs_match(actual, expected) -> None:
+    # JointAttention returns the image and the text outputs
+    actual, expected = (x if isinstance(x, tuple) else (x,) for x in (actual, expected))
+    for actual_output, expected_output in zip(actual, expected, strict=True):
+        assert actual_output.shape == expected_output.shape
+        assert mx.abs(actual_output - expected_output).max().item() < TOLERANCE
+
+
+@pytest.mark.parametrize("bits", [None, 8])
+@pytest.mark.parametrize("module", [joint_attention, single_transformer_block, t5_self_attention, clip_sdpa_attention])
+def test_fused_projections_match_unfused(module, bits):
+    # The weights of the unfused module go through WeightHandler.fuse_projections as they do at load time, so the fused
+    # module is quantized after fusing (like ComponentLoader does) while the unfused one quantizes each projection
+    mx.random.seed(0)
+    create, wrap, unwrap, forward = module()
+    unfused = create(fused_projections=False)
+    mx.eval(unfused.parameters())
+    fused = create(fused_projections=True)
+    fused.update(unwrap(WeightHandler.fuse_projections(COMPONENTS[module], wrap(unfused.parameters()))))
+    quantize(unfused, bits)
+    quantize(fused, bits)
+
+    assert_outputs_match(forward(fused), forward(unfused))
+
+
+@pytest.mark.parametrize("module", [joint_attention, single_transformer_block, t5_self_attention, clip_sdpa_attention])
+def test_fusing_quantized_weights_matches_unfused(module):
+    # Weights that were saved quantized but unfused are fused after quantization, scales and biases included
+    mx.random.seed(0)
+    create, wrap, unwrap, forward = module()
+    unfused = create(fused_projections=False)
+    quantize(unfused, 8)
+    mx.eval(unfused.parameters())
+    fused = create(fused_projections=True)
+    quantize(fused, 8)
+    fused.update(unwrap(WeightHandler.fuse_projections(COMPONENTS[module], wrap(unfused.parameters()))))
+
+    assert_outputs_match(forward(fused), forward(unfused))
+
+
+def test_models_in_one_process_can_differ_in_fused_projections(tiny_flux_path):
+    # The tiny model is saved with separate projections, one loader fuses them and the other keeps them separate
+    weights = WeightHandler.load_from_saved_model(str(tiny_flux_path))
+    fused = ComponentLoader(weights, fused_projections=True).load(WeightHandler.CLIP_ENCODER)
+    unfused = ComponentLoader(weights, fused_projections=False).load(WeightHandler.CLIP_ENCODER)
+
+    assert all(layer.self_attn.fused_projections for layer in fused.text_model.encoder.layers)
+    assert not any(layer.self_attn.fused_projections for layer in unfused.text_model.encoder.layers)
+    mx.random.seed(0)
+    tokens = mx.random.randint(0, 49408, (1, 77))
+    # Both in bfloat16, like the saved weights
+    assert mx.allclose(fused.forward(tokens), unfused.forward(tokens), atol=1e-2, rtol=1e-2).item()
+
+
+def test_fused_projections_are_passed_to_the_component_loader(tiny_flux_path):
+    flux = Flux1.from_saved_model(str(tiny_flux_path), offload_policy=OffloadPolicy.SEQUENTIAL_OFFLOAD, fused_projections=False)
+    assert flux.component_loader.fused_projections is False
+    assert Flux1.from_saved_model(str(tiny_flux_path), offload_policy=OffloadPolicy.SEQUENTIAL_OFFLOAD).component_loader.fused_projections
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.server.generation_request import GenerationRequest
+from flux_1.server.generation_server import GenerationServer
+
+
+def post(server: GenerationServer, body: dict) -> tuple[int, dict]:
+    # A request through the HTTP handler, generated on the worker thread of the server
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), GenerationServer._handler(server))
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    try:
+        connection = HTTPConnection("127.0.0.1", http_server.server_address[1], timeout=600)
+        connection.request("POST", "/generate", body=json.dumps(body), headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+
+def test_generates_a_request(tiny_flux, tmp_path):
+    server = GenerationServer(tiny_flux, output_dir=str(tmp_path))
+    server.start()
+    try:
+        status, result = post(server, {"prompt": PROMPTS[0], "seed": 3, "steps": 2, "width": 64, "height": 64})
+    finally:
+        server.stop()
+
+    assert status == 200, result
+    assert result["seed"] == 3
+    assert Image.open(result["path"]).size == (64, 64)
+
+    # Written through a temporary file, which is gone once the image is in place
+    assert os.listdir(tmp_path) == [os.path.basename(result["path"])]
+    assert server.status()["completed"] == 1
+
+
+def test_requests_without_a_seed_get_random_seeds(tmp_path, monkeypatch):
+    # Completed right away, only the seeds the handler submits matter here
+    server = GenerationServer(flux=None, output_dir=str(tmp_path))
+
+    def submit(prompt, seed, config):
+        request = GenerationRequest(prompt=prompt, seed=seed, config=config)
+        request.start(batch_size=1)
+        request.complete(image=Image.new("RGB", (16, 16)))
+        return request
+
+    monkeypatch.setattr(server, "submit", submit)
+    seeds = [post(server, {"prompt": PROMPTS[0]})[1]["seed"] for _ in range(3)]
+
+    assert len(set(seeds)) == 3
+    assert post(server, {"prompt": PROMPTS[0], "seed": 0})[1]["seed"] == 0
+
+
+@pytest.mark.parametrize("setting", [
+    {"width": 128},
+    {"num_inference_steps": 2},
+    {"guidance": 3.5},
+    {"vae_tiling": True},
+    {"vae_tile_size": 256},
+    {"vae_tile_overlap": 32},
+    {"block_cache_threshold": 0.1},
+    {"block_cache_steps": [1]},
+    {"sampler": "heun"},
+    {"sigma_schedule": "karras"},
+    {"sigmas": [1.0, 0.5]},
+    {"trim_t5_padding": True},
+    {"compiled": True},
+    {"precomputed_modulations": True},
+    {"attention_backend": "chunked"},
+    {"attention_chunk_size": 256},
+])
+def test_requests_that_differ_in_any_setting_are_not_batched(setting):
+    request = GenerationRequest(prompt=PROMPTS[0], seed=1, config=Config())
+    same = GenerationRequest(prompt=PROMPTS[1], seed=2, config=Config())
+    other = GenerationRequest(prompt=PROMPTS[0], seed=1, config=Config(**setting))
+
+    assert request.batch_key == same.batch_key
+    assert request.batch_key != other.batch_key
+
+
+def test_batches_compatible_requests_only(tiny_flux, tmp_path):
+    # All four are queued before the worker starts, the two with the same settings share a batch
+    server = GenerationServer(tiny_flux, output_dir=str(tmp_path), max_batch_size=4)
+    config = Config(num_inference_steps=1, width=64, height=64)
+    requests = [
+        server.submit(prompt=PROMPTS[0], seed=1, config=config),
+        server.submit(prompt=PROMPTS[0], seed=1, config=Config(num_inference_steps=1, width=64, height=64, block_cache_steps=[0])),
+        server.submit(prompt=PROMPTS[1], seed=2, config=config),
+        server.submit(prompt=PROMPTS[0], seed=1, config=Config(num_inference_steps=1, width=64, height=64, vae_tiling=True, vae_tile_size=32, vae_tile_overlap=8)),
+    ]
+    server.start()
+    try:
+        for request in requests:
+            assert request.wait(timeout=600)
+    finally:
+        server.stop()
+
+    assert all(request.error is None for request in requests)
+    assert [request.batch_size for request in requests] == [2, 1, 2, 1]
+    assert server.status()["batches"] == 3
+    assert all(request.image.size == (64, 64) for request in requests)
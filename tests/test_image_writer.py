@@ -0,0 +1,127 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flux_1.post_processing.image_util import ImageUtil
+from flux_1.post_processing.image_writer import ImageWriter
+
+
+def image(value: int) -> Image.Image:
+    return Image.new("RGB", (4, 4), (value, value, value))
+
+
+def pixel(path) -> int:
+    return Image.open(path).getpixel((0, 0))[0]
+
+
+def no_hard_links(*args):
+    raise PermissionError(1, "Operation not permitted")
+
+
+@pytest.mark.parametrize("hard_links", [True, False])
+def test_write_image_numbers_existing_names(tmp_path, monkeypatch, hard_links):
+    if not hard_links:
+        monkeypatch.setattr(os, "link", no_hard_links)
+
+    paths = [ImageUtil.write_image(image(value), tmp_path / "image.png") for value in (10, 20, 30)]
+
+    assert [path.name for path in paths] == ["image.png", "image(1).png", "image(2).png"]
+    assert [pixel(path) for path in paths] == [10, 20, 30]
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == ["image(1).png", "image(2).png", "image.png"]
+
+
+@pytest.mark.parametrize("error", [PermissionError(1, "Operation not permitted"), NotImplementedError()])
+def test_write_image_without_hard_links_never_overwrites(tmp_path, monkeypatch, error):
+    def link(*args):
+        raise error
+
+    monkeypatch.setattr(os, "link", link)
+    ImageUtil.write_image(image(10), tmp_path / "image.png")
+
+    # A writer that thinks the name is free (e.g. another process) still gets the next one
+    path = ImageUtil.write_image(image(20), tmp_path / "image.png", counter=0)
+
+    assert path.name == "image(1).png"
+    assert pixel(tmp_path / "image.png") == 10
+
+
+def test_write_image_overwrite(tmp_path):
+    ImageUtil.write_image(image(10), tmp_path / "image.png")
+    path = ImageUtil.write_image(image(20), tmp_path / "image.png", overwrite=True)
+
+    assert path == tmp_path / "image.png"
+    assert pixel(path) == 20
+    assert os.listdir(tmp_path) == ["image.png"]
+
+
+def test_writer_numbers_in_submission_order_after_existing_files(tmp_path):
+    image(1).save(tmp_path / "image.png")
+    image(2).save(tmp_path / "image(2).png")
+
+    with ImageWriter(num_workers=3) as writer:
+        futures = [writer.submit(image(value), tmp_path / "image.png") for value in (10, 20, 30)]
+    paths = [future.result() for future in futures]
+
+    assert [path.name for path in paths] == ["image(3).png", "image(4).png", "image(5).png"]
+    assert [pixel(path) for path in paths] == [10, 20, 30]
+    assert pixel(tmp_path / "image.png") == 1
+
+
+def test_writer_overwrite_keeps_one_file(tmp_path):
+    with ImageWriter(num_workers=1, overwrite=True) as writer:
+        writer.submit(image(10), tmp_path / "image.png")
+        writer.submit(np.full((4, 4, 3), 20 / 255, dtype=np.float32), tmp_path / "image.png")
+
+    assert os.listdir(tmp_path) == ["image.png"]
+    assert pixel(tmp_path / "image.png") == 20
+    assert writer.stats()["images"] == 2
+
+
+def test_flush_raises_the_write_error_once(tmp_path):
+    # The parent of the output is a file, so the directory cannot be created
+    (tmp_path / "file").write_text("")
+    writer = ImageWriter(num_workers=1)
+    writer.submit(image(10), tmp_path / "file" / "image.png")
+
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.submit(image(20), tmp_path / "image.png")
+    writer.close()
+
+    assert writer.stats()["images"] == 1
+    assert (tmp_path / "image.png").exists()
+
+
+def test_submit_blocks_while_max_pending_images_wait(tmp_path, monkeypatch):
+    release = threading.Event()
+    write_image = ImageUtil.write_image
+
+    def slow_write_image(*args, **kwargs):
+        release.wait()
+        return write_image(*args, **kwargs)
+
+    monkeypatch.setattr(ImageUtil, "write_image", slow_write_image)
+    writer = ImageWriter(num_workers=1, max_pending=1)
+    writer.submit(image(10), tmp_path / "image.png")
+
+    submitted = threading.Event()
+
+    def submit():
+        writer.submit(image(20), tmp_path / "image.png")
+        submitted.set()
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    assert not submitted.wait(timeout=0.5)
+    assert writer.stats()["pending"] == 1
+
+    release.set()
+    assert submitted.wait(timeout=5)
+    thread.join()
+    writer.close()
+    assert writer.stats()["images"] == 2
+    assert writer.stats()["pending"] == 0
@@ -0,0 +1,57 @@
+import mlx.core as mx
+import numpy as np
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.models.vae.latent_previewer import LatentPreviewer
+
+
+def test_decode_keeps_the_latent_resolution_and_the_vae_range():
+    mx.random.seed(0)
+    latents = mx.random.normal((2, 16, 12, 8)).astype(mx.bfloat16)
+
+    rgb = LatentPreviewer().decode(latents)
+
+    assert rgb.shape == (2, 3, 12, 8)
+    assert rgb.dtype == mx.float32
+    # Like the VAE output, the preview of latents of the scale of the initial noise lies (almost all) in [-1, 1]
+    assert (mx.abs(rgb) <= 1).mean().item() > 0.99
+    assert mx.allclose(LatentPreviewer().decode(mx.zeros((1, 16, 2, 2)))[0, :, 0, 0], mx.array(LatentPreviewer.latent_rgb_bias)).item()
+
+
+def test_fit_recovers_a_linear_map():
+    # Images made from the latents by a known linear map and bias, at 8 times the resolution of the latents
+    mx.random.seed(0)
+    weight = mx.random.normal((16, 3)) * 0.1
+    bias = mx.array([0.1, -0.2, 0.3])
+    latents = mx.random.normal((2, 16, 6, 4))
+    images = LatentPreviewer(weight=weight, bias=bias).decode(latents)
+    images = mx.repeat(mx.repeat(images, 8, axis=2), 8, axis=3)
+
+    fitted = LatentPreviewer.fit(latents, images)
+
+    np.testing.assert_allclose(np.array(fitted.weight), np.array(weight), atol=1e-4)
+    np.testing.assert_allclose(np.array(fitted.bias), np.array(bias), atol=1e-4)
+
+
+def test_fitted_previewer_is_saved_and_loaded(tmp_path):
+    previewer = LatentPreviewer(weight=mx.arange(48, dtype=mx.float32).reshape(16, 3), bias=mx.array([1.0, 2.0, 3.0]))
+    previewer.save(str(tmp_path / "previewer" / "weights.safetensors"))
+
+    loaded = LatentPreviewer.from_file(str(tmp_path / "previewer" / "weights.safetensors"))
+
+    assert mx.array_equal(loaded.weight, previewer.weight).item()
+    assert mx.array_equal(loaded.bias, previewer.bias).item()
+
+
+def test_streamed_previews_are_images_at_the_latent_resolution(tiny_flux):
+    config = Config(num_inference_steps=2, width=64, height=128)
+
+    steps = list(tiny_flux.generate_steps(seeds=[1], prompts=PROMPTS[:1], config=config, preview=True))
+
+    previews = [step for step in steps if not step.is_final]
+    assert len(previews) == 2
+    for step in previews:
+        assert step.preview_latents.shape == (1, 16, 16, 8)
+        [image] = step.preview_images
+        assert (image.mode, image.size) == ("RGB", (8, 16))
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from flux_1.config.offload_policy import OffloadPolicy
+from flux_1.flux import Flux1
+from flux_1.tokenizer.tokenizer_handler import TokenizerHandler
+from flux_1.weights.model_resolver import ModelResolver
+from flux_1.weights.weight_handler import WeightHandler
+
+REPO_ID = "black-forest-labs/FLUX.1-schnell"
+ALIAS = "schnell"
+
+
+@pytest.fixture
+def hub_cache(tmp_path, monkeypatch):
+    # An empty Hugging Face cache, online, and a download that fails the test unless a test replaces it
+    cache = tmp_path / "hub"
+    monkeypatch.setenv("HF_HUB_CACHE", str(cache))
+    monkeypatch.delenv("HF_HUB_OFFLINE", raising=False)
+    monkeypatch.delenv(ModelResolver.MANIFEST_ENV, raising=False)
+    monkeypatch.setattr(ModelResolver, "download", lambda repo_id: pytest.fail(f"'{repo_id}' was downloaded"))
+    return cache
+
+
+def cache_snapshot(cache, files: list[str]):
+    # The layout snapshot_download writes
+    repo_path = cache / f"models--{REPO_ID.replace('/', '--')}"
+    (repo_path / "refs").mkdir(parents=True)
+    (repo_path / "refs" / "main").write_text("abc123\n")
+    snapshot = repo_path / "snapshots" / "abc123"
+    for file in files:
+        (snapshot / file).parent.mkdir(parents=True, exist_ok=True)
+        (snapshot / file).write_bytes(b"")
+    return snapshot
+
+
+def all_files() -> list[str]:
+    return TokenizerHandler.FILES + [file for files in WeightHandler.FILES.values() for file in files]
+
+
+def write_manifest(path, entries: dict):
+    path.write_text(json.dumps(entries))
+    return path
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path, hub_cache):
+    (tmp_path / "models" / "schnell").mkdir(parents=True)
+    manifest = write_manifest(tmp_path / "manifest.json", {ALIAS: "models/schnell"})
+
+    assert ModelResolver.resolve(REPO_ID, ALIAS, str(manifest)) == tmp_path / "models" / "schnell"
+    # Listed by repo id and with an absolute path works as well
+    write_manifest(manifest, {REPO_ID: str(tmp_path / "models" / "schnell")})
+    assert ModelResolver.resolve(REPO_ID, ALIAS, str(manifest)) == tmp_path / "models" / "schnell"
+
+
+def test_manifest_from_the_environment(tmp_path, hub_cache, monkeypatch):
+    (tmp_path / "schnell").mkdir()
+    monkeypatch.setenv(ModelResolver.MANIFEST_ENV, str(write_manifest(tmp_path / "manifest.json", {ALIAS: "schnell"})))
+
+    assert ModelResolver.resolve(REPO_ID, ALIAS) == tmp_path / "schnell"
+
+
+def test_manifest_entry_that_is_not_a_directory_is_an_error(tmp_path, hub_cache):
+    manifest = write_manifest(tmp_path / "manifest.json", {ALIAS: "missing"})
+
+    with pytest.raises(FileNotFoundError, match="not a directory"):
+        ModelResolver.resolve(REPO_ID, ALIAS, str(manifest))
+
+
+def test_complete_cached_snapshot_is_used_without_the_hub(tmp_path, hub_cache):
+    snapshot = cache_snapshot(hub_cache, all_files())
+    # A model missing from the manifest falls through to the cache
+    manifest = write_manifest(tmp_path / "manifest.json", {"dev": "dev"})
+
+    assert ModelResolver.resolve(REPO_ID, ALIAS, str(manifest)) == snapshot
+    assert ModelResolver.resolve(REPO_ID, ALIAS, offline=True) == snapshot
+
+
+def test_incomplete_snapshot_is_downloaded_when_online(tmp_path, hub_cache, monkeypatch):
+    # e.g. only the tokenizers, or an interrupted download
+    cache_snapshot(hub_cache, TokenizerHandler.FILES)
+    downloads = []
+    monkeypatch.setattr(ModelResolver, "download", lambda repo_id: downloads.append(repo_id) or tmp_path / "downloaded")
+
+    assert ModelResolver.cached_snapshot(REPO_ID) is None
+    assert ModelResolver.resolve(REPO_ID, ALIAS) == tmp_path / "downloaded"
+    assert downloads == [REPO_ID]
+
+
+@pytest.mark.parametrize("offline_env", [False, True])
+def test_offline_without_a_local_model_fails_without_downloading(hub_cache, monkeypatch, offline_env):
+    cache_snapshot(hub_cache, TokenizerHandler.FILES)
+    if offline_env:
+        monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+
+    with pytest.raises(FileNotFoundError, match="downloading is disabled"):
+        ModelResolver.resolve(REPO_ID, ALIAS, offline=not offline_env)
+
+
+def test_local_path_is_not_resolved(tiny_flux_path, monkeypatch):
+    monkeypatch.setattr(ModelResolver, "resolve", lambda *args: pytest.fail("the local model was resolved"))
+
+    flux = Flux1.from_saved_model(str(tiny_flux_path), offload_policy=OffloadPolicy.SEQUENTIAL_OFFLOAD)
+
+    assert flux.model_config.alias == ALIAS
+    assert flux.component_loader.weight_handler.root_path == tiny_flux_path
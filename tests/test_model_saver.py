@@ -0,0 +1,57 @@
+import json
+
+import mlx.core as mx
+import pytest
+from mlx import nn
+from mlx.utils import tree_flatten
+
+from conftest import PROMPTS
+from flux_1.config.offload_policy import OffloadPolicy
+from flux_1.flux import Flux1
+from flux_1.weights.quantization_util import QuantizationUtil
+from flux_1.weights.saved_model_metadata import SavedModelMetadata
+from flux_1.weights.weight_handler import WeightHandler
+
+
+@pytest.mark.parametrize("quantize", [None, 8])
+def test_saved_model_loads_back_with_the_same_weights(tiny_flux_path, tmp_path, quantize):
+    # Components are only loaded when used, so that the two models can be compared one component at a time
+    flux = Flux1.from_saved_model(str(tiny_flux_path), quantize=quantize, offload_policy=OffloadPolicy.SEQUENTIAL_OFFLOAD)
+    flux.save_model(str(tmp_path))
+
+    metadata = SavedModelMetadata.read(tmp_path)
+    group_size = None if quantize is None else QuantizationUtil.DEFAULT_GROUP_SIZE
+    assert (metadata.model_name, metadata.quantize, metadata.quantize_group_size) == (flux.model_config.model_name, quantize, group_size)
+
+    loaded = Flux1.from_saved_model(str(tmp_path), offload_policy=OffloadPolicy.SEQUENTIAL_OFFLOAD)
+    assert (loaded.quantize, loaded.quantize_group_size) == (flux.quantize, flux.quantize_group_size)
+    assert loaded.t5_tokenizer.token_ids(PROMPTS) == flux.t5_tokenizer.token_ids(PROMPTS)
+    assert loaded.clip_tokenizer.token_ids(PROMPTS) == flux.clip_tokenizer.token_ids(PROMPTS)
+
+    for component in Flux1.COMPONENTS:
+        original = tree_flatten(flux._component(component).parameters())
+        reloaded = tree_flatten(loaded._component(component).parameters())
+        # The same weights with the same dtypes, e.g. bfloat16 weights and the uint32 and scales of quantized ones
+        assert [(name, value.dtype, value.shape) for name, value in reloaded] == [(name, value.dtype, value.shape) for name, value in original]
+        assert all(mx.array_equal(value, original_value).item() for (_, value), (_, original_value) in zip(reloaded, original))
+
+        # Only the transformer and T5 are quantized, and they are loaded as quantized models again
+        quantized = any(isinstance(module, nn.QuantizedLinear) for _, module in loaded._component(component).named_modules())
+        assert quantized == (quantize is not None and component in (WeightHandler.TRANSFORMER, WeightHandler.T5_ENCODER))
+
+        flux.release(component)
+        loaded.release(component)
+
+
+def test_unsupported_metadata_is_rejected(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SavedModelMetadata.read(tmp_path)
+
+    SavedModelMetadata(model_name="black-forest-labs/FLUX.1-schnell", quantize=4, quantize_group_size=32).write(tmp_path)
+    metadata = SavedModelMetadata.read(tmp_path)
+    assert (metadata.quantize, metadata.quantize_group_size) == (4, 32)
+
+    with open(tmp_path / SavedModelMetadata.FILE, "w") as f:
+        json.dump({"format_version": SavedModelMetadata.FORMAT_VERSION + 1, "model_name": metadata.model_name}, f)
+    with pytest.raises(ValueError):
+        SavedModelMetadata.read(tmp_path)
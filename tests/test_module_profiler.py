@@ -0,0 +1,87 @@
+import json
+import threading
+
+import mlx.core as mx
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.models.vae.vae import VAE
+from flux_1.profiling.module_profiler import ModuleProfiler
+
+
+def test_profiled_calls_run_uncompiled():
+    # The compiled option is overridden per call, so a compiled call made while profiling never reaches mx.compile
+    vae = VAE({})
+    latents = mx.zeros((1, 16, 2, 2))
+
+    with ModuleProfiler(roots={"vae": vae}) as profiler:
+        vae.decode(latents, compiled=True)
+    assert vae.compiled_decode.report() == {}
+    assert any(event["name"] == "vae" and event["method"] == "decode" for event in profiler.events)
+
+    mx.eval(vae.decode(latents, compiled=True))
+    assert len(vae.compiled_decode.report()) == 1
+
+
+def test_only_the_calls_of_the_profiled_context_are_recorded():
+    # Two profilers at once, each in its own thread, and an unprofiled thread next to them
+    vae = VAE({})
+    decode = VAE.decode
+    latents = mx.zeros((1, 16, 2, 2))
+    # Evaluated here, lazy arrays can only be evaluated from the thread that created them
+    mx.eval(vae.parameters(), latents)
+    barrier = threading.Barrier(3)
+    profilers = {}
+    outputs = []
+
+    def run(name: str, profiled: bool):
+        if not profiled:
+            barrier.wait()
+            outputs.append(vae.decode(latents))
+            mx.eval(outputs[-1])
+            barrier.wait()
+            return
+        with ModuleProfiler(roots={name: vae}) as profiler:
+            barrier.wait()
+            mx.eval(vae.decode(latents))
+            barrier.wait()
+        profilers[name] = profiler
+
+    threads = [threading.Thread(target=run, args=(name, name != "unprofiled")) for name in ["first", "second", "unprofiled"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outputs) == 1 and sorted(profilers) == ["first", "second"]
+    for name, profiler in profilers.items():
+        decodes = [event for event in profiler.events if event["class"] == "VAE"]
+        assert [event["name"] for event in decodes] == [name]
+        assert {event["thread"] for event in profiler.events} == {decodes[0]["thread"]}
+    # The classes are restored once the last profiler is disabled
+    assert VAE.decode is decode
+
+
+def test_steps_and_chrome_trace(tiny_flux, tmp_path):
+    with ModuleProfiler.for_flux(tiny_flux) as profiler:
+        tiny_flux.generate_image(seed=1, prompt=PROMPTS[0], config=Config(num_inference_steps=2, width=64, height=64))
+    profiler.save_chrome_trace(str(tmp_path / "trace.json"))
+
+    predicts = [event for event in profiler.events if event["method"] == "predict"]
+    assert [event["step"] for event in predicts] == [0, 1]
+    for predict in predicts:
+        # Everything run inside a step is recorded under it, with the fused attention and the AdaLN modulation
+        inner = [event for event in profiler.events if event["depth"] > predict["depth"] and event["step"] == predict["step"]]
+        assert {"SingleBlockAttention.attend", "AdaLayerNormZero.modulate", "AdaLayerNormZeroSingle.modulate", "AdaLayerNormContinuous.modulate"} <= {f"{event['class']}.{event['method']}" for event in inner}
+        assert all(predict["start"] <= event["start"] and event["start"] + event["wall_time"] <= predict["start"] + predict["wall_time"] for event in inner)
+    assert {event["step"] for event in profiler.events if event["class"] == "VAE"} == {None}
+    assert profiler.summary()["Transformer.predict"]["calls"] == 2
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert len(trace["traceEvents"]) == len(profiler.events)
+    for trace_event, event in zip(trace["traceEvents"], profiler.events):
+        assert trace_event["ph"] == "X"
+        assert trace_event["name"] == event["name"]
+        assert trace_event["args"]["step"] == event["step"]
+        assert trace_event["ts"] == event["start"] * 1e6 and trace_event["dur"] == event["wall_time"] * 1e6
+    assert [event["name"] for event in trace["traceEvents"] if event["args"]["method"] == "predict"] == ["transformer", "transformer"]
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.generation.pipeline_executor import PipelineExecutor
+from flux_1.generation.pipeline_job import PipelineJob
+
+CONFIG = Config(num_inference_steps=2, width=64, height=64)
+
+
+def pipeline_jobs(tmp_path) -> list[PipelineJob]:
+    return [
+        PipelineJob(seeds=[seed], prompts=[prompt], config=CONFIG, output_paths=[str(tmp_path / f"{seed}.png")])
+        for seed, prompt in enumerate(PROMPTS)
+    ]
+
+
+def test_pipeline_matches_sequential_generation(tiny_flux, tmp_path):
+    stats = PipelineExecutor(tiny_flux).run(pipeline_jobs(tmp_path))
+
+    assert stats["jobs"] == 2
+    assert stats["images"] == 2
+    assert set(stats["stage_times"]) == {"tokenize", "encode", "denoise", "decode", "write"}
+    for seed, prompt in enumerate(PROMPTS):
+        expected = tiny_flux.generate_images(seeds=[seed], prompts=[prompt], config=CONFIG)[0]
+        assert Image.open(tmp_path / f"{seed}.png").tobytes() == expected.tobytes()
+
+
+def test_all_mlx_work_runs_on_the_calling_thread(tiny_flux, tmp_path, monkeypatch):
+    # Only the tokenization and the writing may run on other threads
+    threads = {}
+
+    def record(obj, name: str):
+        method = getattr(obj, name)
+
+        def wrapper(*args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return method(*args, **kwargs)
+        monkeypatch.setattr(obj, name, wrapper)
+
+    for name in ("encode_prompts", "denoise", "decode_latents"):
+        record(tiny_flux, name)
+    record(tiny_flux.t5_tokenizer, "token_ids")
+
+    PipelineExecutor(tiny_flux).run(pipeline_jobs(tmp_path))
+
+    caller = threading.get_ident()
+    assert threads["encode_prompts"] == threads["denoise"] == threads["decode_latents"] == {caller}
+    # Tokenized ahead on the tokenizer thread
+    assert threads["token_ids"] - {caller}
+
+
+def test_failing_job_stops_the_pipeline(tiny_flux, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(tiny_flux, "denoise", fail)
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        PipelineExecutor(tiny_flux, queue_size=1).run(pipeline_jobs(tmp_path) * 4)
+    assert not list(tmp_path.glob("*.png"))
@@ -0,0 +1,32 @@
+import mlx.core as mx
+import pytest
+
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.models.transformer.transformer import Transformer
+
+TOLERANCE = 1e-3
+
+
+@pytest.mark.parametrize("model_config", [ModelConfig.FLUX1_SCHNELL, ModelConfig.FLUX1_DEV])
+def test_precomputed_modulations_match_per_step_modulations(model_config):
+    # A transformer of one block of each kind with random weights, dev also has the guidance embedder
+    mx.random.seed(0)
+    time_text_embed = {"guidance_embedder": {}} if model_config == ModelConfig.FLUX1_DEV else {}
+    transformer = Transformer({"time_text_embed": time_text_embed}, num_transformer_blocks=1, num_single_transformer_blocks=1)
+    config = RuntimeConfig(Config(num_inference_steps=3, width=64, height=64, guidance=3.5), model_config)
+    prompt_embeds = mx.random.normal((2, 8, 4096))
+    pooled_prompt_embeds = mx.random.normal((2, 768))
+    hidden_states = mx.random.normal((2, 16, 64))
+
+    modulations = transformer.precompute_modulations(pooled_prompt_embeds, config)
+    for t in range(config.num_inference_steps):
+        expected = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config)
+        actual = transformer.predict(t, prompt_embeds, pooled_prompt_embeds, hidden_states, config, modulations=modulations)
+
+        assert actual.shape == expected.shape == (2, 16, 64)
+        assert mx.abs(actual - expected).max().item() < TOLERANCE * mx.abs(expected).max().item()
+
+    # Each image of the batch gets the modulations of its own prompt
+    assert mx.abs(modulations["norm_out"][0, 0] - modulations["norm_out"][0, 1]).max().item() > 0
@@ -0,0 +1,85 @@
+import mlx.core as mx
+
+from conftest import PROMPTS
+from flux_1.cache.prompt_cache import PromptCache
+from flux_1.config.model_config import ModelConfig
+
+# 160 bytes per entry
+PROMPT_EMBEDS_SHAPE = (1, 4, 8)
+POOLED_PROMPT_EMBEDS_SHAPE = (1, 8)
+
+
+def entry(value: float) -> tuple[mx.array, mx.array]:
+    return mx.full(PROMPT_EMBEDS_SHAPE, value), mx.full(POOLED_PROMPT_EMBEDS_SHAPE, value)
+
+
+def test_least_recently_used_entries_are_evicted_over_the_byte_budget():
+    prompt_cache = PromptCache(max_bytes=2 * 160)
+    prompt_cache.put("a", *entry(1))
+    prompt_cache.put("b", *entry(2))
+    assert prompt_cache.get("a") is not None
+
+    prompt_cache.put("c", *entry(3))
+
+    assert prompt_cache.get("b") is None
+    assert prompt_cache.get("a")[0][0, 0, 0].item() == 1
+    assert prompt_cache.get("c")[1][0, 0].item() == 3
+    assert prompt_cache._size == 2 * 160
+
+
+def test_entries_are_counted_by_their_own_bytes():
+    prompt_cache = PromptCache(max_bytes=160)
+    # A slice of a larger batch is copied, replacing a key does not count it twice
+    prompt_cache.put("a", mx.zeros((16, 4, 8))[:1], mx.zeros((16, 8))[:1])
+    prompt_cache.put("a", *entry(1))
+    assert prompt_cache._size == 160
+
+    # An entry over the whole budget is not kept
+    prompt_cache.put("b", mx.zeros((2, 4, 8)), mx.zeros((2, 8)))
+    assert prompt_cache.get("b") is None
+    assert prompt_cache.get("a") is not None
+
+
+def test_disk_round_trip(tmp_path):
+    PromptCache(path=str(tmp_path)).put("a", *entry(1))
+
+    prompt_cache = PromptCache(path=str(tmp_path))
+    prompt_embeds, pooled_prompt_embeds = prompt_cache.get("a")
+
+    assert mx.array_equal(prompt_embeds, entry(1)[0])
+    assert mx.array_equal(pooled_prompt_embeds, entry(1)[1])
+    assert (prompt_cache.hits, prompt_cache.misses) == (1, 0)
+    assert [path.name for path in tmp_path.iterdir()] == ["a.safetensors"]
+    # Loaded once, then kept in memory
+    (tmp_path / "a.safetensors").unlink()
+    assert prompt_cache.get("a") is not None
+
+
+def test_unreadable_disk_entries_are_misses(tmp_path):
+    (tmp_path / "a.safetensors").write_bytes(b"not a safetensors file")
+    prompt_cache = PromptCache(path=str(tmp_path))
+
+    assert prompt_cache.get("a") is None
+    assert prompt_cache.get("b") is None
+    assert (prompt_cache.hits, prompt_cache.misses) == (0, 2)
+
+
+def test_keys_separate_models_sequence_lengths_and_prompts():
+    keys = {
+        PromptCache.key(model_alias=model_alias, max_sequence_length=max_sequence_length, prompt=prompt)
+        for model_alias in [ModelConfig.FLUX1_SCHNELL.alias, ModelConfig.FLUX1_DEV.alias]
+        for max_sequence_length in [64, 256, 512]
+        for prompt in PROMPTS
+    }
+    assert len(keys) == 2 * 3 * len(PROMPTS)
+
+
+def test_quantized_models_use_their_own_keys(tiny_flux, monkeypatch):
+    keys = set()
+    for quantize in [None, 4, 8]:
+        monkeypatch.setattr(tiny_flux, "quantize", quantize)
+        keys.add(tiny_flux._prompt_cache_key(PROMPTS[0], 256))
+
+    assert len(keys) == 3
+    # The unquantized key is the one of PromptCache.key with the plain model alias
+    assert PromptCache.key(model_alias=tiny_flux.model_config.alias, max_sequence_length=256, prompt=PROMPTS[0]) in keys
@@ -0,0 +1,39 @@
+from mlx import nn
+
+from flux_1.models.text_encoder.t5_encoder.t5_encoder import T5Encoder
+from flux_1.models.transformer.transformer import Transformer
+from flux_1.weights.quantization_util import QuantizationUtil
+
+
+def quantized_paths(module: nn.Module) -> set[str]:
+    return {path for path, m in module.named_modules() if isinstance(m, nn.QuantizedLinear)}
+
+
+def linear_paths(module: nn.Module) -> set[str]:
+    return {path for path, m in module.named_modules() if type(m) is nn.Linear}
+
+
+def test_only_block_projections_are_quantized():
+    transformer = Transformer({"time_text_embed": {}}, num_transformer_blocks=1, num_single_transformer_blocks=1)
+    QuantizationUtil.quantize(transformer, bits=8)
+
+    assert "transformer_blocks.0.attn.to_q" in quantized_paths(transformer)
+    assert "transformer_blocks.0.ff.linear1" in quantized_paths(transformer)
+    assert "single_transformer_blocks.0.proj_mlp" in quantized_paths(transformer)
+    assert linear_paths(transformer) == {
+        "x_embedder",
+        "context_embedder",
+        "time_text_embed.timestep_embedder.linear_1",
+        "time_text_embed.timestep_embedder.linear_2",
+        "time_text_embed.text_embedder.linear_1",
+        "time_text_embed.text_embedder.linear_2",
+        "transformer_blocks.0.norm1.linear",
+        "transformer_blocks.0.norm1_context.linear",
+        "single_transformer_blocks.0.norm.linear",
+        "norm_out.linear",
+        "proj_out",
+    }
+
+    t5 = T5Encoder({}, quantize=4, num_blocks=1)
+    assert linear_paths(t5) == set()
+    assert len(quantized_paths(t5)) > 0
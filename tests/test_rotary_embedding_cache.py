@@ -0,0 +1,62 @@
+import mlx.core as mx
+
+from flux_1.cache.rotary_embedding_cache import RotaryEmbeddingCache
+from flux_1.config.config import Config
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.models.transformer.embed_nd import EmbedND
+from flux_1.models.transformer.transformer import Transformer
+
+
+def fresh_rotary_embeddings(height: int, width: int, seq_len: int) -> mx.array:
+    # Computed from scratch, without the transformer or its cache
+    ids = mx.concatenate([Transformer._prepare_text_ids(seq_len=seq_len), Transformer._prepare_latent_image_ids(height, width)], axis=1)
+    return EmbedND().forward(ids)
+
+
+def test_cached_embeddings_match_fresh_ones_for_each_resolution_and_length(tiny_flux):
+    transformer = tiny_flux.transformer
+    transformer.rotary_embedding_cache.clear()
+    mx.random.seed(0)
+
+    # Two resolutions with the same number of latent tokens, and two prompt lengths
+    shapes = [(64, 64, 8), (128, 32, 8), (64, 64, 16), (64, 64, 8)]
+    for height, width, seq_len in shapes:
+        config = RuntimeConfig(Config(num_inference_steps=1, width=width, height=height), tiny_flux.model_config)
+        # Config swaps the two when storing them, the key holds them the way the transformer uses them
+        assert (config.height, config.width) == (width, height)
+        transformer.predict(
+            t=0,
+            prompt_embeds=mx.random.normal((1, seq_len, 4096)),
+            pooled_prompt_embeds=mx.random.normal((1, 768)),
+            hidden_states=mx.random.normal((1, (height // 16) * (width // 16), 64)),
+            config=config,
+        )
+
+    # One entry per distinct shape, the repeated one is served from the cache
+    entries = transformer.rotary_embedding_cache._entries
+    assert list(entries) == [(32, 128, 8), (64, 64, 16), (64, 64, 8)]
+    for (height, width, seq_len), cached in entries.items():
+        fresh = fresh_rotary_embeddings(height, width, seq_len)
+        assert cached.shape == fresh.shape
+        assert mx.allclose(cached, fresh, atol=1e-6).item()
+
+    # Same number of tokens but a different layout of the image, the embeddings differ
+    assert not mx.allclose(entries[(64, 64, 8)], entries[(32, 128, 8)]).item()
+    transformer.rotary_embedding_cache.clear()
+
+
+def test_cache_only_creates_missing_entries_and_evicts_the_least_recently_used():
+    cache = RotaryEmbeddingCache(max_entries=2)
+    created = []
+
+    def get(key):
+        return cache.get(key, lambda: created.append(key) or mx.array(key))
+
+    get((64, 64, 8))
+    get((64, 64, 16))
+    assert mx.array_equal(get((64, 64, 8)), mx.array((64, 64, 8))).item()
+    get((128, 128, 8))
+
+    # (64, 64, 16) was used least recently, so it is computed again
+    get((64, 64, 16))
+    assert created == [(64, 64, 8), (64, 64, 16), (128, 128, 8), (64, 64, 16)]
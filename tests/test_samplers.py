@@ -0,0 +1,95 @@
+import mlx.core as mx
+import numpy as np
+import pytest
+
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.sampling.samplers import Samplers
+from flux_1.sampling.sigma_schedule import SigmaSchedule
+
+TOLERANCE = 1e-5
+
+
+def straight_path(sigmas: list[float]):
+    # The flow of a single image: the latents at sigma are (1 - sigma) * image + sigma * noise, with a constant velocity
+    mx.random.seed(0)
+    image = mx.random.normal((1, 16, 64))
+    noise = mx.random.normal((1, 16, 64))
+    return image, noise, (lambda sigma: (1 - sigma) * image + sigma * noise), noise - image
+
+
+def run(sampler_name: str, sigmas: list[float], latents: mx.array, velocity: mx.array) -> list[mx.array]:
+    sampler = Samplers.from_name(sampler_name)
+    steps = []
+    for t in range(len(sigmas) - 1):
+        latents = sampler.step(t=t, latents=latents, noise=velocity, sigmas=sigmas, predict=lambda step, step_latents: velocity)
+        steps.append(latents)
+    return steps
+
+
+@pytest.mark.parametrize("sampler_name", ["euler", "heun", "dpm++2m"])
+@pytest.mark.parametrize("schedule", SigmaSchedule.SCHEDULES)
+def test_samplers_follow_the_closed_form_of_a_straight_path(sampler_name, schedule):
+    sigmas = RuntimeConfig(Config(num_inference_steps=6, sigma_schedule=schedule), ModelConfig.FLUX1_SCHNELL).sigma_values
+    image, noise, latents_at, velocity = straight_path(sigmas)
+
+    steps = run(sampler_name, sigmas, latents_at(sigmas[0]), velocity)
+
+    for t, latents in enumerate(steps):
+        assert mx.abs(latents - latents_at(sigmas[t + 1])).max().item() < TOLERANCE
+    assert mx.abs(steps[-1] - image).max().item() < TOLERANCE
+
+
+@pytest.mark.parametrize("sigmas", [[1.0, 0.75, 0.5, 0.0], [0.8, 0.6, 0.3, 0.0]])
+def test_first_dpm_solver_step_is_an_euler_step(sigmas):
+    # Without a previous prediction DPM-Solver++(2M) is first order, also when starting from pure noise (log SNR -inf)
+    mx.random.seed(0)
+    latents = mx.random.normal((1, 16, 64))
+    velocity = mx.random.normal((1, 16, 64))
+
+    euler = run("euler", sigmas, latents, velocity)
+    dpm_solver = run("dpm++2m", sigmas, latents, velocity)
+
+    assert mx.abs(dpm_solver[0] - euler[0]).max().item() < TOLERANCE
+
+
+def test_sigmas_are_also_kept_on_the_host():
+    config = RuntimeConfig(Config(num_inference_steps=4, width=512, height=512), ModelConfig.FLUX1_DEV)
+
+    assert isinstance(config.sigma_values, list) and all(isinstance(sigma, float) for sigma in config.sigma_values)
+    assert np.array_equal(np.array(config.sigmas), np.array(config.sigma_values, dtype=np.float32))
+    assert config.sigma_values[0] == 1.0 and config.sigma_values[-1] == 0.0
+
+
+@pytest.mark.parametrize("schedule", SigmaSchedule.SCHEDULES)
+@pytest.mark.parametrize("num_inference_steps", [1, 2, 4, 28])
+def test_schedules_are_decreasing_and_keep_their_endpoints(schedule, num_inference_steps):
+    sigmas = SigmaSchedule.create(schedule, num_inference_steps)
+
+    assert len(sigmas) == num_inference_steps
+    assert sigmas[0] == pytest.approx(1.0)
+    assert sigmas[-1] == pytest.approx(1 / num_inference_steps)
+    assert np.all(np.diff(sigmas) < 0)
+    SigmaSchedule.validate(sigmas.tolist())
+
+
+def test_unknown_schedule():
+    with pytest.raises(ValueError):
+        SigmaSchedule.create("cosine", 4)
+    with pytest.raises(ValueError):
+        Config(sigma_schedule="cosine")
+
+
+@pytest.mark.parametrize("sigmas", [[], [1.5, 0.5], [1.0, 0.5, 0.0], [1.0, -0.5], [0.5, 0.8], [1.0, 0.5, 0.5]])
+def test_invalid_custom_sigmas(sigmas):
+    with pytest.raises(ValueError):
+        Config(sigmas=sigmas)
+
+
+def test_custom_sigmas_replace_the_schedule():
+    config = RuntimeConfig(Config(num_inference_steps=28, sigmas=[1.0, 0.6, 0.2]), ModelConfig.FLUX1_DEV)
+
+    # One step per sigma, used as given (without the shift of dev) and ending at 0
+    assert config.num_inference_steps == 3
+    assert config.sigma_values == pytest.approx([1.0, 0.6, 0.2, 0.0])
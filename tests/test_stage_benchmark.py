@@ -0,0 +1,53 @@
+import mlx.core as mx
+import mlx.nn as nn
+import pytest
+from mlx.utils import tree_flatten
+
+from flux_1.benchmark.stage_benchmark import StageBenchmark
+from flux_1.config.config import Config
+from flux_1.config.model_config import ModelConfig
+
+
+def small_benchmark() -> StageBenchmark:
+    # Small stand-ins for the models in bfloat16, one of them quantized, the grid only casts their weights
+    mx.random.seed(0)
+    models = [nn.Linear(8, 8), nn.Linear(8, 8), nn.QuantizedLinear(64, 64, group_size=64, bits=4), nn.Linear(8, 8)]
+    for model in models:
+        model.set_dtype(mx.bfloat16)
+    return StageBenchmark(ModelConfig.FLUX1_SCHNELL, *models)
+
+
+def weights(benchmark: StageBenchmark) -> list[tuple[str, mx.array]]:
+    return [(name, value) for model in benchmark._models() for name, value in tree_flatten(model.parameters())]
+
+
+def floating_dtypes(benchmark: StageBenchmark) -> set:
+    return {value.dtype for _, value in weights(benchmark) if mx.issubdtype(value.dtype, mx.floating)}
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_grid_restores_the_weights_and_precision(monkeypatch, fail):
+    benchmark = small_benchmark()
+    original = weights(benchmark)
+    precisions = []
+
+    def run(*args):
+        precisions.append((Config.precision, floating_dtypes(benchmark)))
+        if fail:
+            raise RuntimeError("out of memory")
+        return {}
+
+    monkeypatch.setattr(benchmark, "run", run)
+    try:
+        benchmark.run_grid(resolutions=[64], steps=[1], batch_sizes=[1], precisions=["float32", "float16"])
+    except RuntimeError:
+        assert fail
+
+    # Each precision is used for both the weights and the activations, until the grid ends or fails
+    expected = [(mx.float32, {mx.float32}), (mx.float16, {mx.float16})]
+    assert precisions == (expected[:1] if fail else expected)
+    assert Config.precision == mx.bfloat16
+    # The quantized weights are left as they are, the others are bfloat16 again, with the values they had
+    restored = weights(benchmark)
+    assert [(name, value.dtype) for name, value in restored] == [(name, value.dtype) for name, value in original]
+    assert all(mx.array_equal(value, original_value) for (_, value), (_, original_value) in zip(restored, original))
@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import PROMPTS, tiny_t5_tokenizer
+from flux_1.benchmark.stage_benchmark import StageBenchmark
+from flux_1.cache.prompt_cache import PromptCache
+from flux_1.config.config import Config
+from flux_1.config.runtime_config import RuntimeConfig
+from flux_1.tokenizer.t5_tokenizer import TokenizerT5
+
+
+def prompt(num_words: int) -> str:
+    # One token per word, plus the end token
+    return " ".join(["red"] * num_words)
+
+
+@pytest.mark.parametrize("max_length, num_words, expected", [
+    (256, 3, 64),
+    (256, 63, 64),
+    (256, 64, 128),
+    (256, 150, 256),
+    (256, 400, 256),
+    (512, 200, 256),
+    (512, 300, 512),
+])
+def test_bucket_length(max_length, num_words, expected):
+    tokenizer = TokenizerT5(tiny_t5_tokenizer(), max_length=max_length)
+    assert tokenizer.bucket_length([prompt(num_words)]) == expected
+
+
+def test_batch_uses_the_bucket_of_its_longest_prompt():
+    tokenizer = TokenizerT5(tiny_t5_tokenizer(), max_length=512)
+    assert tokenizer.bucket_length([prompt(3), prompt(100), prompt(10)]) == 128
+    assert TokenizerT5.LENGTH_BUCKETS == [64, 128, 256, 512]
+
+
+def test_padded_length_is_part_of_the_prompt_cache_key(tiny_flux):
+    # The fixture has the embeddings of the full length cached, trimming encodes the prompt again at 64 tokens
+    model_config = tiny_flux.model_config
+    trimmed_key = PromptCache.key(model_alias=model_config.alias, max_sequence_length=64, prompt=PROMPTS[0])
+    assert tiny_flux.prompt_cache.get(trimmed_key) is None
+
+    trimmed = RuntimeConfig(Config(width=64, height=64, trim_t5_padding=True), model_config)
+    full = RuntimeConfig(Config(width=64, height=64), model_config)
+    trimmed_embeds, _ = tiny_flux.encode_prompts([PROMPTS[0]], trimmed)
+    full_embeds, _ = tiny_flux.encode_prompts([PROMPTS[0]], full)
+
+    assert trimmed_embeds.shape == (1, 64, 4096)
+    assert tiny_flux.prompt_cache.get(trimmed_key)[0].shape == (1, 64, 4096)
+    # The cached embeddings of the full length are still the ones of the fixture
+    assert full_embeds.shape == (1, 8, 4096)
+
+
+def test_compare_t5_padding_reports_each_trimmed_bucket(tiny_flux):
+    benchmark = StageBenchmark.from_flux(tiny_flux)
+    token_ids, _ = benchmark._prompt_token_ids(16)
+    assert len(token_ids) == 16
+    assert token_ids[-1] == tiny_flux.t5_tokenizer.tokenizer.eos_token_id
+
+    # A prompt of 300 tokens needs the full length of schnell (256), so there is nothing to compare for it
+    report = benchmark.compare_t5_padding(resolutions=[64], steps=[1], prompt_lengths=[16, 300])
+
+    [result] = report["results"]
+    assert (result["prompt_tokens"], result["t5_length"], result["full_length"]) == (16, 64, 256)
+    # Without an attention mask, the padding changes the embeddings of the prompt tokens, and the image with them
+    assert result["embedding_error"] > 0
+    assert 0 < result["psnr"] < float("inf")
+    assert result["trimmed_time"] > 0 and result["full_time"] > 0
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from conftest import tiny_clip_tokenizer, tiny_t5_tokenizer
+from flux_1.tokenizer.clip_tokenizer import TokenizerCLIP
+from flux_1.tokenizer.t5_tokenizer import TokenizerT5
+
+PROMPTS = ["a red cube", "a blue sphere on a red cube", "a red cube", "sphere", "a blue cube on a red sphere on a blue cube"]
+
+
+class CountingTokenizer:
+    # Records the prompts each call of the wrapped tokenizer gets
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.pad_token_id = tokenizer.pad_token_id
+        self.calls = []
+
+    def __call__(self, prompts, **kwargs):
+        self.calls.append(prompts)
+        return self.tokenizer(prompts, **kwargs)
+
+
+def tokenizers():
+    return [TokenizerT5(tiny_t5_tokenizer(), max_length=16), TokenizerCLIP(tiny_clip_tokenizer())]
+
+
+@pytest.mark.parametrize("tokenizer", tokenizers(), ids=["t5", "clip"])
+@pytest.mark.parametrize("length", [None, 5])
+def test_tokenize_matches_a_direct_tokenizer_call(tokenizer, length):
+    max_length = tokenizer.max_length if length is None else length
+    expected = tokenizer.tokenizer(PROMPTS, padding="max_length", max_length=max_length, truncation=True, return_tensors="np")
+
+    # Once tokenizing every prompt, once from the cache
+    for _ in range(2):
+        tokens, lengths = tokenizer.tokenize(PROMPTS, length)
+        assert np.array_equal(np.array(tokens), expected.input_ids)
+        assert np.array_equal(np.array(lengths), expected.attention_mask.sum(axis=1))
+    assert tokenizer.misses == 4
+
+
+@pytest.mark.parametrize("tokenizer", tokenizers(), ids=["t5", "clip"])
+def test_truncation_keeps_the_end_token(tokenizer):
+    end_token_id = tokenizer.tokenizer.eos_token_id
+    tokens, lengths = tokenizer.tokenize(PROMPTS, length=4)
+    tokens, lengths = np.array(tokens), np.array(lengths)
+
+    assert tokens.shape == (len(PROMPTS), 4)
+    assert lengths.tolist() == [min(4, len(token_ids)) for token_ids in tokenizer.token_ids(PROMPTS)]
+    assert all(tokens[i, length - 1] == end_token_id for i, length in enumerate(lengths))
+    # The cached ids are only truncated to max_length, so a longer length later still gets the whole prompt
+    assert len(tokenizer.token_ids(PROMPTS[1:2])[0]) > 4
+
+
+def test_duplicate_prompts_are_tokenized_once():
+    tokenizer = TokenizerT5(CountingTokenizer(tiny_t5_tokenizer()), max_length=16)
+    tokens, _ = tokenizer.tokenize(["a red cube", "sphere", "a red cube"])
+
+    assert tokenizer.tokenizer.calls == [["a red cube", "sphere"]]
+    assert np.array_equal(np.array(tokens[0]), np.array(tokens[2]))
+    assert (tokenizer.hits, tokenizer.misses) == (1, 2)
+
+
+def test_least_recently_used_prompts_are_evicted():
+    tokenizer = TokenizerT5(tiny_t5_tokenizer(), max_length=16, cache_size=2)
+    tokenizer.token_ids(["a"])
+    tokenizer.token_ids(["red"])
+    tokenizer.token_ids(["a"])
+    tokenizer.token_ids(["blue"])
+
+    assert list(tokenizer._token_ids) == ["a", "blue"]
+    tokenizer.token_ids(["red"])
+    assert (tokenizer.hits, tokenizer.misses) == (1, 4)
@@ -0,0 +1,98 @@
+import mlx.core as mx
+import numpy as np
+import PIL.Image
+import pytest
+
+from conftest import PROMPTS
+from flux_1.config.config import Config
+from flux_1.models.vae.vae import VAE
+from flux_1.models.vae.vae_tiler import VAETiler
+from flux_1.post_processing.image_util import ImageUtil
+
+# Mean pointwise error of the tiled against the untiled output, relative to the mean magnitude of the untiled output.
+# With random weights the receptive field of the VAE and the mid-block attention, which only sees its own tile, leave a
+# sizeable error even when blending correctly (0.23 decoding, 0.31 encoding), but averaging the overlap with equal
+# weights instead of the ramps is clearly worse (0.31 and 0.36). The same goes for an image to image generation encoded
+# and decoded in tiles, 24.4dB against the untiled one when blending correctly and 22.5dB with equal weights
+DECODE_ERROR = 0.25
+ENCODE_ERROR = 0.33
+IMAGE_TO_IMAGE_PSNR = 23.5
+
+# A seam is a jump between neighbouring pixels that the untiled decode does not have. The largest extra jump across
+# any row or column border has to stay below this fraction of the mean jump between neighbouring pixels of the untiled decode
+SEAM_THRESHOLD = 0.2
+
+
+def seam(image: mx.array, expected: mx.array) -> float:
+    # Mean over the other axis and the channels, for every border between two columns (and two rows)
+    excess_x = mx.abs(mx.diff(image, axis=3)).mean(axis=(0, 1, 2)) - mx.abs(mx.diff(expected, axis=3)).mean(axis=(0, 1, 2))
+    excess_y = mx.abs(mx.diff(image, axis=2)).mean(axis=(0, 1, 3)) - mx.abs(mx.diff(expected, axis=2)).mean(axis=(0, 1, 3))
+    return max(excess_x.max().item(), excess_y.max().item()) / mx.abs(mx.diff(expected, axis=3)).mean().item()
+
+
+def test_tiled_decode_matches_untiled_decode():
+    # The real decoder with random weights on 96x96 pixels, decoded as 2x2 tiles of 64 pixels
+    mx.random.seed(0)
+    vae = VAE({})
+    latents = mx.random.normal((1, 16, 12, 12))
+
+    expected = vae.decode(latents).astype(mx.float32)
+    blended = VAETiler.decode(vae.decode, latents, tile_size=64, tile_overlap=32)
+    unblended = VAETiler.decode(vae.decode, latents, tile_size=64, tile_overlap=0)
+
+    assert blended.shape == expected.shape
+    error = mx.abs(blended - expected)
+    assert error.mean().item() < DECODE_ERROR * mx.abs(expected).mean().item()
+    assert seam(blended, expected) < SEAM_THRESHOLD
+
+    # Tiles put next to each other without feathering do show a seam
+    assert seam(unblended, expected) > SEAM_THRESHOLD
+
+
+@pytest.mark.parametrize("shape, axis", [((1, 16, 4, 12), 3), ((1, 16, 12, 4), 2)])
+def test_overlapping_tiles_are_cross_faded_linearly(shape, axis):
+    # Each tile decodes to its own constant, so the output is exactly the blend of the tiles. Two tiles of 64 pixels
+    # overlapping by 32: the first tile alone, a linear cross-fade over the 32 overlapping pixels, the second tile alone
+    values = iter([1.0, 2.0])
+
+    def decode(tile: mx.array) -> mx.array:
+        return mx.full((1, 3, tile.shape[2] * 8, tile.shape[3] * 8), next(values))
+
+    output = VAETiler.decode(decode, mx.zeros(shape), tile_size=64, tile_overlap=32)
+
+    profile = np.array(output[0, 0, 0] if axis == 3 else output[0, 0, :, 0])
+    expected = np.concatenate([np.full(32, 1.0), 1 + np.arange(1, 33) / 33, np.full(32, 2.0)])
+    np.testing.assert_allclose(profile, expected, atol=1e-6)
+    # Constant along the other axis
+    assert mx.all(output == (output[:, :, :1] if axis == 3 else output[:, :, :, :1])).item()
+
+
+def test_tiled_encode_matches_untiled_encode():
+    # The real encoder with random weights on 96x96 pixels, encoded as 2x2 tiles of 64 pixels. The moments are stitched
+    mx.random.seed(0)
+    vae = VAE({})
+    pixels = mx.random.uniform(-1, 1, (1, 3, 96, 96))
+
+    expected = vae.encoder.encode(pixels).astype(mx.float32)
+    tiled = VAETiler.encode(vae.encoder.encode, pixels, tile_size=64, tile_overlap=32)
+
+    assert tiled.shape == expected.shape == (1, 32, 12, 12)
+    assert mx.abs(tiled - expected).mean().item() < ENCODE_ERROR * mx.abs(expected).mean().item()
+
+
+def test_image_to_image_encodes_and_decodes_in_tiles(tiny_flux, tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    image_path = tmp_path / "init.png"
+    PIL.Image.fromarray(rng.integers(0, 256, (96, 96, 3), dtype=np.uint8)).save(image_path)
+    tiles = []
+    for name in ("encode", "decode"):
+        method = getattr(VAETiler, name)
+        monkeypatch.setattr(VAETiler, name, lambda *args, name=name, method=method, **kwargs: tiles.append(name) or method(*args, **kwargs))
+
+    config = Config(num_inference_steps=2, vae_tiling=True, vae_tile_size=64, vae_tile_overlap=32)
+    tiled = tiny_flux.generate_image_from_image(seed=1, prompt=PROMPTS[0], image_path=str(image_path), strength=0.5, config=config)
+    untiled = tiny_flux.generate_image_from_image(seed=1, prompt=PROMPTS[0], image_path=str(image_path), strength=0.5, config=Config(num_inference_steps=2))
+
+    assert tiles == ["encode", "decode"]
+    assert tiled.size == untiled.size == (96, 96)
+    assert ImageUtil.psnr(tiled, untiled) > IMAGE_TO_IMAGE_PSNR